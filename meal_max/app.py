@@ -1,23 +1,61 @@
+import itertools
+import time
+
 from dotenv import load_dotenv
-from flask import Flask, jsonify, make_response, Response, request
+from flask import Flask, g, jsonify, make_response, Response, request
+from flask.logging import default_handler
 # from flask_cors import CORS
 
-from meal_max.models import kitchen_model
-from meal_max.models.battle_model import BattleModel
-from meal_max.utils.sql_utils import check_database_connection, check_table_exists
+from meal_max.models import history_model, kitchen_model, matchup_model
+from meal_max.models.arena_model import ArenaConflictError, ArenaNotFoundError, ArenaRegistry, DEFAULT_ARENA
+from meal_max.models.history_model import HistoryIncompleteError
+from meal_max.models.tournament_model import FORMATS, TournamentModel
+from meal_max.utils.http_cache import conditional
+from meal_max.utils.import_utils import IMPORT_CONTENT_TYPES, IMPORT_FORMATS, iter_import_records
+from meal_max.utils.json_utils import FastJSONProvider, array_response, dumps
+from meal_max.utils.random_utils import get_random_pool_stats
+from meal_max.utils.sql_utils import check_database_connection, check_table_exists, get_pool_stats
+from meal_max.utils.logger import configure_logger
+from meal_max.utils.metrics import increment, observe, render_metrics
 
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
+# jsonify encodes with orjson when it is installed
+app.json = FastJSONProvider(app)
+# Route logs go through the same background writer as the models
+app.logger.removeHandler(default_handler)
+configure_logger(app.logger)
 # This bypasses standard security stuff we'll talk about later
 # If you get errors that use words like cross origin or flight,
 # uncomment this
 # CORS(app)
 
-# Initialize the BattleModel
-battle_model = BattleModel()
+# Initialize the arenas; the original battle routes use the default arena
+arena_registry = ArenaRegistry()
+
+# Initialize the TournamentModel
+tournament_model = TournamentModel()
+
+# Build the leaderboard cache before the first request; it is built lazily if the database is not ready
+kitchen_model.rebuild_leaderboard_cache()
+
+# Time every request for /api/metrics
+@app.before_request
+def start_request_timer() -> None:
+    """Notes when the request started so its latency can be recorded."""
+    g.request_start = time.perf_counter_ns()
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Records the request latency and status under its route pattern rather than the raw path."""
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    observe("http_request_duration_seconds", time.perf_counter_ns() - g.request_start, method=request.method, route=route)
+    increment("http_requests_total", method=request.method, route=route, status=response.status_code)
+    return response
+
 
 ####################################################
 #
@@ -58,6 +96,121 @@ def db_check() -> Response:
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 404)
 
+@app.route('/api/db-pool-stats', methods=['GET'])
+def db_pool_stats() -> Response:
+    """
+    Route to report database connection pool usage, including checkout wait times.
+
+    Returns:
+        JSON response with the pool statistics.
+    """
+    try:
+        app.logger.info("Retrieving database pool statistics")
+        return make_response(jsonify({'status': 'success', 'pool': get_pool_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving database pool statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/random-pool-stats', methods=['GET'])
+def random_pool_stats() -> Response:
+    """
+    Route to report the random number pool's depth, hit rate and refill latency.
+
+    Returns:
+        JSON response with the random pool statistics.
+    """
+    try:
+        app.logger.info("Retrieving random pool statistics")
+        return make_response(jsonify({'status': 'success', 'random_pool': get_random_pool_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving random pool statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/leaderboard-cache-stats', methods=['GET'])
+def leaderboard_cache_stats() -> Response:
+    """
+    Route to report the leaderboard cache's hits, misses and rebuilds.
+
+    Returns:
+        JSON response with the leaderboard cache statistics.
+    """
+    try:
+        app.logger.info("Retrieving leaderboard cache statistics")
+        return make_response(jsonify({'status': 'success', 'leaderboard_cache': kitchen_model.get_leaderboard_cache_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving leaderboard cache statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/meal-cache-stats', methods=['GET'])
+def meal_cache_stats() -> Response:
+    """
+    Route to report the meal lookup cache's hits, misses and evictions.
+
+    Returns:
+        JSON response with the meal cache statistics.
+    """
+    try:
+        app.logger.info("Retrieving meal cache statistics")
+        return make_response(jsonify({'status': 'success', 'meal_cache': kitchen_model.get_meal_cache_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving meal cache statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/arena-stats', methods=['GET'])
+def arena_stats() -> Response:
+    """
+    Route to report how many arenas exist and how many were created, evicted and fought in.
+
+    Returns:
+        JSON response with the arena statistics.
+    """
+    try:
+        app.logger.info("Retrieving arena statistics")
+        return make_response(jsonify({'status': 'success', 'arenas': arena_registry.stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving arena statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/write-behind-stats', methods=['GET'])
+def write_behind_stats() -> Response:
+    """
+    Route to report whether meal stats are written behind, and how many are pending and written.
+
+    Returns:
+        JSON response with the write-behind statistics.
+    """
+    try:
+        app.logger.info("Retrieving write-behind statistics")
+        return make_response(jsonify({'status': 'success', 'write_behind': kitchen_model.get_meal_stats_counter_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving write-behind statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/battle-log-stats', methods=['GET'])
+def battle_log_stats() -> Response:
+    """
+    Route to report how many battles the history log has queued, written and dropped.
+
+    Returns:
+        JSON response with the battle log statistics.
+    """
+    try:
+        app.logger.info("Retrieving battle log statistics")
+        return make_response(jsonify({'status': 'success', 'battle_log': history_model.get_battle_log_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving battle log statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics() -> Response:
+    """
+    Route to export request, query and random number latencies in the Prometheus text format.
+
+    Returns:
+        Text response with the p50, p95 and p99 latency of every route and query.
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 
 ##########################################################
 #
@@ -115,6 +268,41 @@ def add_meal() -> Response:
         app.logger.error("Failed to add combatant: %s", str(e))
         return make_response(jsonify({'error': str(e)}), 500)
 
+@app.route('/api/import-meals', methods=['POST'])
+def import_meals() -> Response:
+    """
+    Route to bulk load meals from a streamed CSV or NDJSON body.
+
+    The body is parsed while it is read and written in chunked transactions,
+    so memory use does not grow with the size of the upload.
+
+    Expected Input:
+        - A CSV body with a header row (Content-Type: text/csv), or one JSON object
+          per line (Content-Type: application/x-ndjson), each with meal, cuisine,
+          price and difficulty.
+
+    Query Parameters:
+        - format (str): 'csv' or 'ndjson', overriding the Content-Type. Optional.
+
+    Returns:
+        JSON response with the number of meals imported and the errors of the rows that were skipped.
+    Raises:
+        415 error if the body format is not recognized.
+        500 error if there is an issue writing to the database.
+    """
+    import_format = request.args.get('format') or IMPORT_CONTENT_TYPES.get(request.mimetype)
+    if import_format not in IMPORT_FORMATS:
+        return make_response(jsonify({'error': 'Send text/csv or application/x-ndjson, or pass format=csv|ndjson'}), 415)
+
+    try:
+        app.logger.info("Importing meals from a %s upload", import_format)
+        summary = kitchen_model.import_meals(iter_import_records(request.stream, import_format))
+        app.logger.info("Imported %d meals, %d rows failed", summary['imported'], summary['failed'])
+        return make_response(jsonify({'status': 'success', **summary}), 200)
+    except Exception as e:
+        app.logger.error("Failed to import meals: %s", str(e))
+        return make_response(jsonify({'error': str(e)}), 500)
+
 @app.route('/api/clear-meals', methods=['DELETE'])
 def clear_catalog() -> Response:
     """
@@ -195,6 +383,47 @@ def get_meal_by_name(meal_name: str) -> Response:
         return make_response(jsonify({'error': str(e)}), 500)
 
 
+@app.route('/api/search-meals', methods=['GET'])
+def search_meals() -> Response:
+    """
+    Route to search meals by the words in their name and cuisine.
+
+    Query Parameters:
+        - q (str): The words to search for.
+        - mode (str): 'search' to rank the best matches first, or 'prefix' to autocomplete the
+          last word, with matches in id order. Default is 'search'.
+        - limit (int): How many meals to return. Default is 20.
+        - offset (int): How many of the leading matches to skip. Default is 0.
+
+    Returns:
+        JSON response with the matching meals and the offset of the next page.
+    Raises:
+        400 error if the query has no words, the mode is unknown, or limit or offset is invalid.
+        500 error if there is an issue searching the meals.
+    """
+    try:
+        query = request.args.get('q', '')
+        mode = request.args.get('mode', 'search')
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', type=int)
+        if ('limit' in request.args and limit is None) or ('offset' in request.args and offset is None):
+            return make_response(jsonify({'error': 'limit and offset must be non-negative integers'}), 400)
+        limit = 20 if limit is None else limit
+        offset = offset or 0
+        if mode not in ('search', 'prefix'):
+            return make_response(jsonify({'error': "mode must be 'search' or 'prefix'"}), 400)
+        app.logger.info("Searching meals for %r in %s mode", query, mode)
+
+        meals = kitchen_model.search_meals(query, limit, offset, prefix=mode == 'prefix')
+        next_offset = offset + limit if limit and len(meals) == limit else None
+        return make_response(jsonify({'status': 'success', 'meals': meals, 'next_offset': next_offset}), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error(f"Error searching meals: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
 ############################################################
 #
 # Battle
@@ -210,14 +439,17 @@ def battle() -> Response:
     Returns:
         JSON response indicating the result of the battle and the winner.
     Raises:
+        409 error if the combatants changed during the request; it can be retried.
         500 error if there is an issue during the battle.
     """
     try:
         app.logger.info('Two meals enter, one meal leaves!')
 
-        winner = battle_model.battle()
+        winner = arena_registry.battle(DEFAULT_ARENA)
 
         return make_response(jsonify({'status': 'success', 'winner': winner}), 200)
+    except ArenaConflictError as e:
+        return make_response(jsonify({'error': str(e)}), 409)
     except Exception as e:
         app.logger.error(f"Battle error: {e}")
         return make_response(jsonify({'error': str(e)}), 500)
@@ -234,7 +466,7 @@ def clear_combatants() -> Response:
     """
     try:
         app.logger.info('Clearing all combatants...')
-        battle_model.clear_combatants()
+        arena_registry.clear_combatants(DEFAULT_ARENA)
         app.logger.info('Combatants cleared.')
         return make_response(jsonify({'status': 'success'}), 200)
     except Exception as e:
@@ -251,7 +483,7 @@ def get_combatants() -> Response:
     """
     try:
         app.logger.info('Getting combatants...')
-        combatants = battle_model.get_combatants()
+        combatants = arena_registry.get_combatants(DEFAULT_ARENA)
         return make_response(jsonify({'status': 'success', 'combatants': combatants}), 200)
     except Exception as e:
         app.logger.error("Failed to get combatants: %s", str(e))
@@ -280,8 +512,7 @@ def prep_combatant() -> Response:
 
         try:
             meal = kitchen_model.get_meal_by_name(meal)
-            battle_model.prep_combatant(meal)
-            combatants = battle_model.get_combatants()
+            combatants = arena_registry.prep_combatant(DEFAULT_ARENA, meal)
         except Exception as e:
             app.logger.error("Failed to prepare combatant: %s", str(e))
             return make_response(jsonify({'error': str(e)}), 500)
@@ -292,6 +523,240 @@ def prep_combatant() -> Response:
         return make_response(jsonify({'error': str(e)}), 500)
 
 
+############################################################
+#
+# Arenas
+#
+############################################################
+
+
+@app.route('/api/arenas', methods=['POST'])
+def create_arena() -> Response:
+    """
+    Route to create an arena with its own two combatant slots, so battles don't share one global pair.
+
+    Returns:
+        JSON response with the new arena's id.
+    Raises:
+        500 error if there is an issue creating the arena.
+    """
+    try:
+        arena_id = arena_registry.create_arena()
+        return make_response(jsonify({'status': 'success', 'arena_id': arena_id}), 201)
+    except Exception as e:
+        app.logger.error("Failed to create arena: %s", str(e))
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/arenas/<string:arena_id>', methods=['DELETE'])
+def delete_arena(arena_id: str) -> Response:
+    """
+    Route to delete an arena.
+
+    Path Parameter:
+        - arena_id (str): The ID of the arena to delete.
+
+    Returns:
+        JSON response indicating success of the operation.
+    Raises:
+        404 error if the arena does not exist.
+        500 error if there is an issue deleting the arena.
+    """
+    try:
+        app.logger.info("Deleting arena %s", arena_id)
+        arena_registry.delete_arena(arena_id)
+        return make_response(jsonify({'status': 'success'}), 200)
+    except ArenaNotFoundError as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+    except Exception as e:
+        app.logger.error("Failed to delete arena: %s", str(e))
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/arenas/<string:arena_id>/battle', methods=['GET'])
+def arena_battle(arena_id: str) -> Response:
+    """
+    Route to battle the two meals prepared in an arena.
+
+    Path Parameter:
+        - arena_id (str): The ID of the arena.
+
+    Returns:
+        JSON response with the winner, who stays in the arena.
+    Raises:
+        400 error if fewer than two meals are prepared.
+        404 error if the arena does not exist.
+        409 error if the arena changed during the request; it can be retried.
+        500 error if there is an issue during the battle.
+    """
+    try:
+        winner = arena_registry.battle(arena_id)
+        return make_response(jsonify({'status': 'success', 'winner': winner}), 200)
+    except ArenaNotFoundError as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+    except ArenaConflictError as e:
+        return make_response(jsonify({'error': str(e)}), 409)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error(f"Battle error in arena {arena_id}: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/arenas/<string:arena_id>/clear-combatants', methods=['POST'])
+def arena_clear_combatants(arena_id: str) -> Response:
+    """
+    Route to clear the combatants of an arena.
+
+    Path Parameter:
+        - arena_id (str): The ID of the arena.
+
+    Returns:
+        JSON response indicating success of the operation.
+    Raises:
+        404 error if the arena does not exist.
+        409 error if the arena changed during the request; it can be retried.
+        500 error if there is an issue clearing combatants.
+    """
+    try:
+        arena_registry.clear_combatants(arena_id)
+        return make_response(jsonify({'status': 'success'}), 200)
+    except ArenaNotFoundError as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+    except ArenaConflictError as e:
+        return make_response(jsonify({'error': str(e)}), 409)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error("Failed to clear combatants in arena %s: %s", arena_id, str(e))
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/arenas/<string:arena_id>/combatants', methods=['GET'])
+def arena_get_combatants(arena_id: str) -> Response:
+    """
+    Route to get the combatants of an arena.
+
+    Path Parameter:
+        - arena_id (str): The ID of the arena.
+
+    Returns:
+        JSON response with the list of combatants.
+    Raises:
+        404 error if the arena does not exist.
+    """
+    try:
+        combatants = arena_registry.get_combatants(arena_id)
+        return make_response(jsonify({'status': 'success', 'combatants': combatants}), 200)
+    except ArenaNotFoundError as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+    except Exception as e:
+        app.logger.error("Failed to get combatants in arena %s: %s", arena_id, str(e))
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/arenas/<string:arena_id>/prep-combatant', methods=['POST'])
+def arena_prep_combatant(arena_id: str) -> Response:
+    """
+    Route to prepare a meal as a combatant in an arena.
+
+    Path Parameter:
+        - arena_id (str): The ID of the arena.
+
+    Expected JSON Input:
+        - meal (str): The name of the meal
+
+    Returns:
+        JSON response with the arena's combatants.
+    Raises:
+        400 error if no meal is named, the meal doesn't exist, or the arena is full.
+        404 error if the arena does not exist.
+        409 error if the arena changed during the request; it can be retried.
+        500 error if there is an issue preparing the combatant.
+    """
+    try:
+        meal = (request.get_json(silent=True) or {}).get('meal')
+        if not meal:
+            return make_response(jsonify({'error': 'You must name a combatant'}), 400)
+
+        app.logger.info("Preparing combatant %s in arena %s", meal, arena_id)
+        combatants = arena_registry.prep_combatant(arena_id, kitchen_model.get_meal_by_name(meal))
+        return make_response(jsonify({'status': 'success', 'combatants': combatants}), 200)
+    except ArenaNotFoundError as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+    except ArenaConflictError as e:
+        return make_response(jsonify({'error': str(e)}), 409)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error("Failed to prepare combatant in arena %s: %s", arena_id, str(e))
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+############################################################
+#
+# Tournament
+#
+############################################################
+
+
+@app.route('/api/tournament', methods=['POST'])
+def run_tournament() -> Response:
+    """
+    Route to run a whole tournament in one request.
+
+    Expected JSON Input:
+        - meal_ids (List[int]): The IDs of the entrants, in seeding order.
+        - format (str): 'single_elimination', 'double_elimination' or 'round_robin'.
+          Default is 'single_elimination'.
+
+    Returns:
+        JSON response with the bracket, standings and champion.
+    Raises:
+        400 error if the input is invalid or an entrant does not exist.
+        500 error if there is an issue running the tournament.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        meal_ids = data.get('meal_ids')
+        tournament_format = data.get('format', 'single_elimination')
+        app.logger.info("Running %s tournament for meals %s", tournament_format, meal_ids)
+
+        if not isinstance(meal_ids, list) or not all(isinstance(meal_id, int) for meal_id in meal_ids):
+            return make_response(jsonify({'error': 'meal_ids must be a list of integer IDs'}), 400)
+        if tournament_format not in FORMATS:
+            return make_response(jsonify({'error': f"format must be one of {', '.join(FORMATS)}"}), 400)
+
+        try:
+            tournament = tournament_model.run_tournament(meal_ids, tournament_format)
+        except ValueError as e:
+            app.logger.error("Invalid tournament: %s", str(e))
+            return make_response(jsonify({'error': str(e)}), 400)
+
+        return make_response(jsonify({'status': 'success', 'tournament': tournament}), 201)
+    except Exception as e:
+        app.logger.error(f"Tournament error: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/tournament/<int:tournament_id>', methods=['GET'])
+def get_tournament(tournament_id: int) -> Response:
+    """
+    Route to get the results of a finished tournament.
+
+    Path Parameter:
+        - tournament_id (int): The ID returned when the tournament was run.
+
+    Returns:
+        JSON response with the tournament results.
+    Raises:
+        404 error if the tournament is not known.
+    """
+    try:
+        app.logger.info(f"Retrieving tournament by ID: {tournament_id}")
+        tournament = tournament_model.get_tournament(tournament_id)
+        return make_response(jsonify({'status': 'success', 'tournament': tournament}), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+    except Exception as e:
+        app.logger.error(f"Error retrieving tournament by ID: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
 ############################################################
 #
 # Leaderboard
@@ -299,28 +764,245 @@ def prep_combatant() -> Response:
 ############################################################
 
 
+def _leaderboard_format() -> str:
+    """Returns 'ndjson' if the leaderboard was asked for as NDJSON, by format or Accept, else 'json'."""
+    if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    return 'json'
+
 @app.route('/api/leaderboard', methods=['GET'])
+@conditional(kitchen_model.get_meals_version, representation=_leaderboard_format)
 def get_leaderboard() -> Response:
     """
-    Route to get the leaderboard of meals sorted by wins, battles, or win percentage.
+    Route to get the leaderboard of meals sorted by wins, win percentage or Elo rating.
 
     Query Parameters:
-        - sort (str): The field to sort by ('wins', 'battles', or 'win_pct'). Default is 'wins'.
+        - sort (str): The field to sort by ('wins', 'win_pct' or 'rating'). Default is 'wins'.
+        - limit (int): How many meals to return. Default is all of them.
+        - offset (int): How many of the leading meals to skip. Default is 0.
+        - after (str): Keyset cursor '<wins>,<id>' (or '<win ratio>,<id>' for win_pct, '<rating>,<id>' for rating) to
+          continue after, as returned in next_cursor. Optional.
+        - format (str): 'ndjson' to stream the meals as one JSON object per line, by the same
+          sort, limit, offset and after. Also chosen by an Accept header of application/x-ndjson.
 
     Returns:
-        JSON response with a sorted leaderboard of meals.
+        JSON response with a sorted leaderboard of meals and the cursor of the next page,
+        or a streamed NDJSON response with the same meals.
     Raises:
+        400 error if the sort field is invalid, limit or offset is not a non-negative integer
+            or the cursor is malformed.
         500 error if there is an issue generating the leaderboard.
     """
     try:
         sort_by = request.args.get('sort', 'wins')  # Default sort by wins
+        if sort_by not in kitchen_model.SORT_KEYS:
+            app.logger.error("Invalid leaderboard sort: %s", sort_by)
+            return make_response(jsonify({'error': f"Invalid sort parameter: {sort_by}. "
+                                                   f"Must be one of {', '.join(kitchen_model.SORT_KEYS)}."}), 400)
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if ('limit' in request.args and limit is None) or (limit is not None and limit < 0) or offset < 0:
+            return make_response(jsonify({'error': 'limit and offset must be non-negative integers'}), 400)
+        after = None
+        if request.args.get('after'):
+            try:
+                after = kitchen_model.parse_leaderboard_cursor(sort_by, request.args['after'])
+            except ValueError as e:
+                return make_response(jsonify({'error': str(e)}), 400)
         app.logger.info("Generating leaderboard sorted by %s", sort_by)
 
-        leaderboard_data = kitchen_model.get_leaderboard(sort_by)
+        if _leaderboard_format() == 'ndjson':
+            rows = kitchen_model.iter_leaderboard(sort_by, after, limit, offset)
+            # Pull the first meal now so errors are reported before the response starts
+            first = list(itertools.islice(rows, 1))
+            lines = (dumps(row) + b"\n" for row in itertools.chain(first, rows))
+            return Response(lines, status=200, mimetype='application/x-ndjson')
+
+        leaderboard_data = kitchen_model.get_leaderboard(sort_by, limit, offset, after)
+        next_cursor = None
+        if limit and len(leaderboard_data) == limit:
+            next_cursor = kitchen_model.format_leaderboard_cursor(
+                kitchen_model.leaderboard_cursor(sort_by, leaderboard_data[-1]))
+
+        # The whole leaderboard is streamed in chunks instead of encoded into one body
+        return make_response(array_response('leaderboard', leaderboard_data, status='success', next_cursor=next_cursor), 200)
+    except Exception as e:
+        app.logger.error(f"Error generating leaderboard: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/leaderboard/cuisines', methods=['GET'])
+@conditional(kitchen_model.get_meals_version)
+def get_cuisine_leaderboard() -> Response:
+    """
+    Route to get the leaderboard of cuisines, with each cuisine's totals and top meal.
+
+    Query Parameters:
+        - sort (str): The field to sort by ('wins', 'win_pct' or 'rating'). Default is 'wins'.
+
+    Returns:
+        JSON response with the sorted cuisines.
+    Raises:
+        400 error if the sort field is invalid.
+        500 error if there is an issue generating the leaderboard.
+    """
+    return _group_leaderboard("cuisine")
+
 
+@app.route('/api/leaderboard/difficulty', methods=['GET'])
+@conditional(kitchen_model.get_meals_version)
+def get_difficulty_leaderboard() -> Response:
+    """
+    Route to get the leaderboard of difficulty levels, with each level's totals and top meal.
+
+    Query Parameters:
+        - sort (str): The field to sort by ('wins', 'win_pct' or 'rating'). Default is 'wins'.
+
+    Returns:
+        JSON response with the sorted difficulty levels.
+    Raises:
+        400 error if the sort field is invalid.
+        500 error if there is an issue generating the leaderboard.
+    """
+    return _group_leaderboard("difficulty")
+
+
+def _group_leaderboard(group_by: str) -> Response:
+    try:
+        sort_by = request.args.get('sort', 'wins')
+        app.logger.info("Generating %s leaderboard sorted by %s", group_by, sort_by)
+        leaderboard_data = kitchen_model.get_group_leaderboard(group_by, sort_by)
         return make_response(jsonify({'status': 'success', 'leaderboard': leaderboard_data}), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
-        app.logger.error(f"Error generating leaderboard: {e}")
+        app.logger.error(f"Error generating {group_by} leaderboard: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/meal-matchups', methods=['GET'])
+def get_meal_matchups() -> Response:
+    """
+    Route to get the expected win rates of every meal and a simulated leaderboard,
+    computed in memory without recording any battles.
+
+    Query Parameters:
+        - battles (int): How many virtual battles to simulate. Default is 10000.
+        - seed (int): A seed for a reproducible simulation. Optional.
+        - ids (str): Comma-separated meal IDs whose pairwise win-probability matrix to include. Optional.
+
+    Returns:
+        JSON response with the matchup analysis.
+    Raises:
+        400 error if a parameter is invalid or there are not enough meals.
+        500 error if there is an issue computing the matchups.
+    """
+    try:
+        try:
+            battles = request.args.get('battles', 10000, type=int)
+            seed = request.args.get('seed', type=int)
+            ids = request.args.get('ids')
+            meal_ids = [int(meal_id) for meal_id in ids.split(',')] if ids else None
+        except ValueError:
+            return make_response(jsonify({'error': 'ids must be a comma-separated list of integer IDs'}), 400)
+        if battles is None:
+            return make_response(jsonify({'error': 'battles must be an integer'}), 400)
+        app.logger.info("Computing meal matchups with %d simulated battles", battles)
+
+        try:
+            matchups = matchup_model.get_meal_matchups(battles, seed, meal_ids)
+        except ValueError as e:
+            app.logger.error("Invalid matchup request: %s", str(e))
+            return make_response(jsonify({'error': str(e)}), 400)
+
+        return make_response(jsonify({'status': 'success', **matchups}), 200)
+    except Exception as e:
+        app.logger.error(f"Error computing meal matchups: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+############################################################
+#
+# Battle History
+#
+############################################################
+
+
+@app.route('/api/battle-history/<int:meal_id>', methods=['GET'])
+def get_battle_history(meal_id: int) -> Response:
+    """
+    Route to get the battles a meal fought, newest first.
+
+    Path Parameter:
+        - meal_id (int): The ID of the meal.
+
+    Query Parameters:
+        - limit (int): How many battles to return. Default is 50.
+        - before (int): Battle ID cursor; only older battles are returned, as given in next_cursor. Optional.
+
+    Returns:
+        JSON response with the battles and the cursor of the next page.
+    Raises:
+        400 error if limit or before is not a non-negative integer.
+        500 error if there is an issue reading the history.
+    """
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        before = request.args.get('before', type=int)
+        if limit is None or limit < 0 or ('before' in request.args and before is None):
+            return make_response(jsonify({'error': 'limit and before must be non-negative integers'}), 400)
+        app.logger.info("Retrieving battle history of meal %d", meal_id)
+
+        battles = history_model.get_meal_battles(meal_id, limit, before)
+        next_cursor = battles[-1]['id'] if limit and len(battles) == limit else None
+        return make_response(jsonify({'status': 'success', 'battles': battles, 'next_cursor': next_cursor}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving battle history: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/head-to-head/<int:meal_1_id>/<int:meal_2_id>', methods=['GET'])
+def get_head_to_head(meal_1_id: int, meal_2_id: int) -> Response:
+    """
+    Route to get the record of two meals against each other.
+
+    Path Parameters:
+        - meal_1_id (int): The ID of the first meal.
+        - meal_2_id (int): The ID of the second meal.
+
+    Returns:
+        JSON response with how many times they met and how many each won.
+    Raises:
+        500 error if there is an issue reading the history.
+    """
+    try:
+        app.logger.info("Retrieving head-to-head record of meals %d and %d", meal_1_id, meal_2_id)
+        head_to_head = history_model.get_head_to_head(meal_1_id, meal_2_id)
+        return make_response(jsonify({'status': 'success', 'head_to_head': head_to_head}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving head-to-head record: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/recompute-ratings', methods=['POST'])
+def recompute_ratings() -> Response:
+    """
+    Route to recompute every meal's rating by replaying the battle history.
+
+    Returns:
+        JSON response with how many meals were rated.
+    Raises:
+        409 error if battles were dropped, or compacted without their results, since
+            replaying the rest would rewind every rating to a partial history.
+        500 error if there is an issue replaying the history.
+    """
+    try:
+        app.logger.info("Recomputing ratings from the battle history")
+        history_model.check_history_complete()
+        rated = kitchen_model.recompute_ratings(history_model.iter_battle_results())
+        return make_response(jsonify({'status': 'success', 'rated': rated}), 200)
+    except HistoryIncompleteError as e:
+        return make_response(jsonify({'error': str(e)}), 409)
+    except Exception as e:
+        app.logger.error(f"Error recomputing ratings: {e}")
         return make_response(jsonify({'error': str(e)}), 500)
 
 
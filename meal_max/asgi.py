@@ -0,0 +1,193 @@
+"""ASGI entry point that keeps battles from holding a worker thread.
+
+Run with ``uvicorn asgi:application --port 5000``. GET /api/battle and
+GET /api/arenas/<arena_id>/battle are served on the event loop: the random
+draw is awaited, and the database work runs on a bounded thread pool, so one
+process can keep hundreds of battles in flight while random.org answers.
+Every other route is passed through to the Flask app on its own thread pool.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import io
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app import app as flask_app, arena_registry
+from meal_max.models.arena_model import ArenaConflictError, ArenaNotFoundError, DEFAULT_ARENA
+from meal_max.utils.json_utils import dumps
+from meal_max.utils.metrics import increment, observe
+from meal_max.utils.random_utils import get_random_async
+from meal_max.utils.sql_utils import DB_POOL_SIZE
+
+
+# threads for the database work of async battles; more than the connection pool would only wait on it
+ASYNC_DB_WORKERS = int(os.getenv("ASYNC_DB_WORKERS", str(DB_POOL_SIZE)))
+
+# threads running the Flask app for every other route
+ASGI_WSGI_WORKERS = int(os.getenv("ASGI_WSGI_WORKERS", "16"))
+
+db_executor = ThreadPoolExecutor(max_workers=ASYNC_DB_WORKERS, thread_name_prefix="battle-db")
+wsgi_executor = ThreadPoolExecutor(max_workers=ASGI_WSGI_WORKERS, thread_name_prefix="wsgi")
+
+# (method, path pattern, route label matching the Flask rule) of the routes served asynchronously
+BATTLE_ROUTES = (
+    ("GET", re.compile(r"/api/battle"), "/api/battle"),
+    ("GET", re.compile(r"/api/arenas/(?P<arena_id>[^/]+)/battle"), "/api/arenas/<string:arena_id>/battle"),
+)
+
+# {arena id: [lock, battles holding or waiting for it]}; an entry is dropped once no battle needs it
+_arena_locks: Dict[str, List] = {}
+
+
+@asynccontextmanager
+async def arena_lock(arena_id: str):
+    """Serializes the battles of one arena on the event loop, as the Flask route does with the arena's lock.
+
+    Without it, a battle reading the arena while another awaits its draw would
+    be refused with 409 on finishing, where the Flask route would have waited.
+    """
+    entry = _arena_locks.setdefault(arena_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _arena_locks[arena_id]
+
+async def battle(arena_id: Optional[str]) -> Tuple[int, dict]:
+    """Battles the two combatants of an arena, awaiting the random draw and the database.
+
+    Args:
+        arena_id (str, optional): The arena, or None for the default arena of /api/battle.
+
+    Returns:
+        Tuple[int, dict]: The status code and JSON body, as the matching Flask route would answer.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        async with arena_lock(arena_id or DEFAULT_ARENA):
+            combatant_1, combatant_2, version = await loop.run_in_executor(
+                db_executor, arena_registry.prepare_battle, arena_id or DEFAULT_ARENA)
+            random_number = await get_random_async()
+            winner = await loop.run_in_executor(
+                db_executor, arena_registry.finish_battle, arena_id or DEFAULT_ARENA, combatant_1, combatant_2, version,
+                random_number)
+        return 200, {'status': 'success', 'winner': winner}
+    except ArenaNotFoundError as e:
+        return (404 if arena_id else 500), {'error': str(e)}
+    except ArenaConflictError as e:
+        return 409, {'error': str(e)}
+    except ValueError as e:
+        return (400 if arena_id else 500), {'error': str(e)}
+    except Exception as e:
+        flask_app.logger.error(f"Battle error: {e}")
+        return 500, {'error': str(e)}
+
+async def send_json(send, status: int, body: dict) -> None:
+    payload = dumps(body)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+def wsgi_environ(scope: dict, body: bytes) -> dict:
+    """Builds the WSGI environ of an ASGI HTTP request."""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+async def call_wsgi(scope: dict, receive, send) -> None:
+    """Serves a request with the Flask app on the WSGI thread pool, streaming its response."""
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+
+    loop = asyncio.get_running_loop()
+    response = {}
+    written = []
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return written.append
+
+    iterable = await loop.run_in_executor(wsgi_executor, flask_app, wsgi_environ(scope, bytes(body)), start_response)
+    try:
+        iterator = iter(iterable)
+        # Pull the first chunk before answering, since a streaming app may only call start_response then
+        chunk = await loop.run_in_executor(wsgi_executor, next, iterator, None)
+        await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+        for data in written:
+            await send({"type": "http.response.body", "body": data, "more_body": True})
+        while chunk is not None:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await loop.run_in_executor(wsgi_executor, next, iterator, None)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(iterable, "close"):
+            await loop.run_in_executor(wsgi_executor, iterable.close)
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            db_executor.shutdown()
+            wsgi_executor.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope: dict, receive, send) -> None:
+    """The ASGI application: battles on the event loop, everything else through Flask."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    for method, pattern, route in BATTLE_ROUTES:
+        match = pattern.fullmatch(scope["path"])
+        if match and scope["method"] == method:
+            start = time.perf_counter_ns()
+            status, body = await battle(match.groupdict().get("arena_id"))
+            await send_json(send, status, body)
+            observe("http_request_duration_seconds", time.perf_counter_ns() - start, method=method, route=route)
+            increment("http_requests_total", method=method, route=route, status=status)
+            return
+
+    await call_wsgi(scope, receive, send)
@@ -0,0 +1,113 @@
+"""Compares the memory and build rate of meals hydrated from database rows.
+
+The legacy path is the previous Meal, a frozen dataclass with a __dict__ that
+re-validated every row. Each path reads every meal of a generated database,
+so the rates include the query. Run from the meal_max directory:
+
+    python -m benchmarks.bench_hydration --sizes 1000000
+"""
+import argparse
+from dataclasses import dataclass
+import gc
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.datagen import populate
+from meal_max.models.kitchen_model import Meal, meal_from_row, meal_row_factory
+
+
+SELECT_MEALS = "SELECT id, meal, cuisine, price, difficulty FROM meals"
+
+
+@dataclass(frozen=True)
+class LegacyMeal:
+    """The previous implementation: one __dict__ per meal, validated on every build."""
+    id: int
+    meal: str
+    cuisine: str
+    price: float
+    difficulty: str
+
+    def __post_init__(self):
+        if self.price < 0:
+            raise ValueError("Price must be a positive value.")
+        if self.difficulty not in ['LOW', 'MED', 'HIGH']:
+            raise ValueError("Difficulty must be 'LOW', 'MED', or 'HIGH'.")
+
+def legacy(conn: sqlite3.Connection) -> list:
+    return [LegacyMeal(id=row[0], meal=row[1], cuisine=row[2], price=row[3], difficulty=row[4])
+            for row in conn.execute(SELECT_MEALS).fetchall()]
+
+def validated(conn: sqlite3.Connection) -> list:
+    return [Meal(id=row[0], meal=row[1], cuisine=row[2], price=row[3], difficulty=row[4])
+            for row in conn.execute(SELECT_MEALS).fetchall()]
+
+def from_row(conn: sqlite3.Connection) -> list:
+    return [meal_from_row(row) for row in conn.execute(SELECT_MEALS).fetchall()]
+
+def row_factory(conn: sqlite3.Connection) -> list:
+    cursor = conn.cursor()
+    cursor.row_factory = meal_row_factory
+    return cursor.execute(SELECT_MEALS).fetchall()
+
+def tuples(conn: sqlite3.Connection) -> list:
+    return conn.execute(SELECT_MEALS).fetchall()
+
+PATHS = [
+    ("tuples (no objects)", tuples),
+    ("legacy dataclass", legacy),
+    ("Meal() validated", validated),
+    ("meal_from_row", from_row),
+    ("meal_row_factory", row_factory),
+]
+
+def retained_bytes(build, conn: sqlite3.Connection) -> int:
+    """Returns how many bytes the built list keeps alive after the query is done, field values included.
+
+    Measured with tracemalloc rather than sys.getsizeof, since Python 3.11+
+    only allocates an instance __dict__ once something asks for it.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        built = build(conn)
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del built
+    return size
+
+def run(sizes: list, repeat: int) -> None:
+    print(f"{'meals':>10} {'path':<22} {'bytes/row':>10} {'best s':>8} {'rows/s':>12}")
+    for num_meals in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "meal_max.db")
+            populate(db_path, num_meals)
+            conn = sqlite3.connect(db_path)
+            try:
+                for name, build in PATHS:
+                    best = float("inf")
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        built = build(conn)
+                        best = min(best, time.perf_counter() - start)
+                    del built
+                    per_row = retained_bytes(build, conn) / num_meals
+                    print(f"{num_meals:>10} {name:<22} {per_row:>10.0f} {best:>8.3f} {num_meals / best:>12,.0f}")
+            finally:
+                conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark hydrating meals from database rows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path; the best one is reported")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    run(args.sizes, args.repeat)
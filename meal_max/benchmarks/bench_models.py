@@ -0,0 +1,154 @@
+"""Micro-benchmarks for every kitchen_model and BattleModel operation.
+
+Each size gets a fresh generated database behind the real connection pool,
+and random numbers come from a local random.org stub, so nothing leaves the
+machine. Run from the meal_max directory:
+
+    python -m benchmarks.bench_models --sizes 10000 100000 1000000 --output results.json
+    python -m benchmarks.bench_models --baseline results.json
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+import tempfile
+
+from benchmarks.common import load_baseline, measure, print_table, regressions, save_results
+from benchmarks.datagen import populate
+from meal_max.models import history_model, kitchen_model
+from meal_max.models.battle_model import BattleModel
+from meal_max.utils import random_utils, sql_utils
+from meal_max.utils.leaderboard_cache import LeaderboardCache
+from meal_max.utils.lru_cache import VersionedLRUCache
+from meal_max.utils.random_stub import RandomOrgStub
+
+
+def live_ids(rng: random.Random, num_meals: int):
+    """Yields random ids of generated meals that are not soft deleted."""
+    while True:
+        meal_id = rng.randrange(1, num_meals + 1)
+        if meal_id % 10:
+            yield meal_id
+
+def benchmarks(num_meals: int, rng: random.Random) -> list:
+    """Returns (name, func, setup, iterations) for every operation, in the order they are run.
+
+    clear_meals runs last because it empties the database.
+    """
+    ids = live_ids(rng, num_meals)
+    names = (f"Bench meal {i}" for i in itertools.count())
+    battle_model = BattleModel()
+    pasta, sushi = kitchen_model.get_meal_by_id(next(ids)), kitchen_model.get_meal_by_id(next(ids))
+
+    def create_meal() -> str:
+        name = next(names)
+        kitchen_model.create_meal(name, "Italian", 12.5, "MED")
+        return name
+
+    def prep_delete():
+        # The id of a fresh live meal for the timed delete_meal call
+        prep_delete.meal_id = kitchen_model.get_meal_by_name(create_meal()).id
+
+    def import_records():
+        return iter([(row, {"meal": next(names), "cuisine": "Thai", "price": 9.5, "difficulty": "LOW"})
+                     for row in range(1, 1001)])
+
+    def prep_battle():
+        battle_model.clear_combatants()
+        battle_model.prep_combatant(pasta)
+        battle_model.prep_combatant(sushi)
+
+    def queue_battles():
+        # Battles waiting in the battle log for the timed flush
+        for _ in range(100):
+            prep_battle()
+            battle_model.battle()
+
+    cursor = kitchen_model.leaderboard_cursor("wins", kitchen_model.get_leaderboard("wins", limit=1)[0])
+    history = [(next(ids), next(ids)) for _ in range(100_000)]
+
+    return [
+        ("kitchen.create_meal", create_meal, None, 1000),
+        ("kitchen.get_meal_by_id", lambda: kitchen_model.get_meal_by_id(next(ids)), None, 10000),
+        ("kitchen.get_meal_by_id (same meal)", lambda: kitchen_model.get_meal_by_id(pasta.id), None, 10000),
+        ("kitchen.get_meal_by_name", lambda: kitchen_model.get_meal_by_name(f"Meal {next(ids)}"), None, 10000),
+        ("kitchen.search_meals name", lambda: kitchen_model.search_meals(f"Meal {next(ids)}"), None, 10000),
+        ("kitchen.search_meals cuisine top 20", lambda: kitchen_model.search_meals("Thai"), None, 1000),
+        ("kitchen.search_meals prefix", lambda: kitchen_model.search_meals(f"Meal {next(ids) // 100}", prefix=True), None, 10000),
+        ("kitchen.search_meals prefix 1 char", lambda: kitchen_model.search_meals("M", prefix=True), None, 10000),
+        ("kitchen.get_meals_by_ids (100)", lambda: kitchen_model.get_meals_by_ids([next(ids) for _ in range(100)]), None, 1000),
+        ("kitchen.update_meal_stats", lambda: kitchen_model.update_meal_stats(next(ids), "win"), None, 1000),
+        ("kitchen.settle_battle", lambda: kitchen_model.settle_battle(next(ids), next(ids)), None, 1000),
+        ("kitchen.settle_battles (100)", lambda: kitchen_model.settle_battles([(next(ids), next(ids)) for _ in range(100)]), None, 200),
+        ("kitchen.get_leaderboard wins top 10", lambda: kitchen_model.get_leaderboard("wins", limit=10), None, 10000),
+        ("kitchen.get_leaderboard win_pct top 10", lambda: kitchen_model.get_leaderboard("win_pct", limit=10), None, 10000),
+        ("kitchen.get_leaderboard rating top 10", lambda: kitchen_model.get_leaderboard("rating", limit=10), None, 10000),
+        ("kitchen.get_leaderboard after cursor", lambda: kitchen_model.get_leaderboard("wins", limit=10, after=cursor), None, 10000),
+        ("kitchen.get_group_leaderboard cuisine", lambda: kitchen_model.get_group_leaderboard("cuisine", "win_pct"), None, 10000),
+        ("kitchen.get_group_leaderboard difficulty", lambda: kitchen_model.get_group_leaderboard("difficulty"), None, 10000),
+        ("kitchen.get_leaderboard wins (all)", lambda: kitchen_model.get_leaderboard("wins"), None, 20),
+        ("kitchen.iter_leaderboard first 1000", lambda: list(itertools.islice(kitchen_model.iter_leaderboard("wins"), 1000)), None, 1000),
+        ("kitchen.rebuild_leaderboard_cache", kitchen_model.rebuild_leaderboard_cache, None, 10),
+        ("kitchen.recompute_ratings (100000 battles)", lambda: kitchen_model.recompute_ratings(history), None, 5),
+        ("kitchen.delete_meal", lambda: kitchen_model.delete_meal(prep_delete.meal_id), prep_delete, 1000),
+        ("kitchen.import_meals (1000)", lambda: kitchen_model.import_meals(import_records()), None, 20),
+        ("battle.get_battle_score", lambda: battle_model.get_battle_score(pasta), None, 100000),
+        ("battle.decide", lambda: battle_model.decide(pasta, sushi), None, 100000),
+        ("battle.prep_combatant", lambda: battle_model.prep_combatant(pasta), battle_model.clear_combatants, 10000),
+        ("battle.get_combatants", battle_model.get_combatants, prep_battle, 10000),
+        ("battle.battle", battle_model.battle, prep_battle, 1000),
+        ("battle.clear_combatants", battle_model.clear_combatants, prep_battle, 10000),
+        ("history.flush_battle_log (100 battles)", history_model.flush_battle_log, queue_battles, 20),
+        ("history.get_meal_battles 50", lambda: history_model.get_meal_battles(pasta.id), None, 10000),
+        ("history.get_head_to_head", lambda: history_model.get_head_to_head(pasta.id, sushi.id), None, 10000),
+        ("kitchen.clear_meals", kitchen_model.clear_meals, None, 1),
+    ]
+
+def run(sizes: list, budget: float, seed: int, only: str = None) -> dict:
+    results = {}
+    stub = RandomOrgStub(seed=seed).start()
+    random_utils._pool = random_utils.RandomPool(base_url=stub.url, batch_size=1000, low_water=200)
+    os.environ.setdefault("SQL_CREATE_TABLE_PATH", os.path.join(os.path.dirname(__file__), "..", "sql", "create_meal_table.sql"))
+    try:
+        for num_meals in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                sql_utils.DB_PATH = os.path.join(tmp, "meal_max.db")
+                populate(sql_utils.DB_PATH, num_meals, seed)
+                kitchen_model._leaderboard = LeaderboardCache()
+                kitchen_model._meal_cache = VersionedLRUCache(kitchen_model.MEAL_CACHE_SIZE, kitchen_model.MEAL_CACHE_TTL)
+                # Battles are written only when a benchmark flushes them, never by a writer thread mid-measurement
+                history_model._log = history_model.BattleLog(batch_size=1000, flush_interval=0, retention=0)
+                kitchen_model.rebuild_leaderboard_cache()
+
+                for name, func, setup, iterations in benchmarks(num_meals, random.Random(seed)):
+                    if only and only not in name:
+                        continue
+                    results[f"{name} [{num_meals}]"] = measure(func, iterations, budget, setup)
+                sql_utils.close_pool()
+    finally:
+        stub.stop()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the kitchen model and battle model operations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000], help="numbers of meals to generate")
+    parser.add_argument("--budget", type=float, default=2.0, help="most seconds to spend timing each operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="run only the benchmarks whose name contains this text")
+    parser.add_argument("--output", help="save the results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    baseline = load_baseline(args.baseline)
+    results = run(args.sizes, args.budget, args.seed, args.only)
+    print_table(results, baseline)
+    if args.output:
+        save_results(args.output, results, vars(args))
+    slower = regressions(results, baseline)
+    if slower:
+        print(f"{len(slower)} benchmarks regressed against the baseline: {', '.join(slower)}")
+        sys.exit(1)
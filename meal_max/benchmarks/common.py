@@ -0,0 +1,110 @@
+"""Timing, reporting and baseline comparison shared by the benchmarks."""
+import json
+import platform
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+
+# a benchmark is reported as a regression when its p50 grows by more than this factor,
+# and by more than REGRESSION_MIN_MS so timer noise on sub-microsecond operations is ignored
+REGRESSION_THRESHOLD = 1.10
+REGRESSION_MIN_MS = 0.005
+
+
+def percentile(samples: List[float], quantile: float) -> float:
+    """Returns the nearest-rank quantile of the samples, which must be sorted."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(quantile * len(samples)) - 1))
+    return samples[index]
+
+def summarize(samples_ms: List[float], elapsed: Optional[float] = None) -> Dict[str, float]:
+    """Summarizes per-call latencies in milliseconds.
+
+    Args:
+        samples_ms (list[float]): One latency per call.
+        elapsed (float, optional): Wall time of the whole run in seconds, for throughput.
+
+    Returns:
+        dict: Count, mean, p50, p95, p99 and max latency, and calls per second.
+    """
+    samples = sorted(samples_ms)
+    if elapsed is None:
+        elapsed = sum(samples) / 1000
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) if samples else 0.0,
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": samples[-1] if samples else 0.0,
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0,
+    }
+
+def measure(func: Callable[[], object], iterations: int, budget: float,
+            setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Times func one call at a time, until it has run iterations times or budget seconds have passed.
+
+    Args:
+        func (Callable): The operation to time.
+        iterations (int): The most calls to make.
+        budget (float): The most seconds to spend, not counting setup.
+        setup (Callable, optional): Called untimed before every call.
+
+    Returns:
+        dict: The summary of the call latencies.
+    """
+    samples = []
+    spent = 0.0
+    while len(samples) < iterations and (not samples or spent < budget):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        took = time.perf_counter() - start
+        spent += took
+        samples.append(took * 1000)
+    return summarize(samples)
+
+def _regressed(summary: dict, base: Optional[dict]) -> bool:
+    if not base or not base["p50_ms"]:
+        return False
+    return (summary["p50_ms"] / base["p50_ms"] > REGRESSION_THRESHOLD
+            and summary["p50_ms"] - base["p50_ms"] > REGRESSION_MIN_MS)
+
+def print_table(results: Dict[str, Dict[str, float]], baseline: Optional[dict] = None) -> None:
+    """Prints one row per benchmark, with the p50 change against a baseline if one is given."""
+    print(f"{'benchmark':<48} {'calls':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>11} {'vs base':>8}")
+    for name, summary in results.items():
+        change = ""
+        base = (baseline or {}).get(name)
+        if base and base["p50_ms"]:
+            ratio = summary["p50_ms"] / base["p50_ms"]
+            change = f"{ratio:.2f}x" + (" !" if _regressed(summary, base) else "")
+        print(f"{name:<48} {summary['count']:>8} {summary['p50_ms']:>10.3f} {summary['p95_ms']:>10.3f} "
+              f"{summary['p99_ms']:>10.3f} {summary['ops_per_sec']:>11.1f} {change:>8}")
+
+def save_results(path: str, results: Dict[str, Dict[str, float]], params: dict) -> None:
+    """Writes the results, with the parameters and machine they were taken on, as JSON."""
+    document = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w") as fh:
+        json.dump(document, fh, indent=2, sort_keys=True)
+    print(f"Results saved to {path}")
+
+def load_baseline(path: Optional[str]) -> Optional[dict]:
+    """Returns the results of an earlier run saved by save_results, or None if no path is given."""
+    if not path:
+        return None
+    with open(path) as fh:
+        return json.load(fh)["results"]
+
+def regressions(results: Dict[str, Dict[str, float]], baseline: Optional[dict]) -> List[str]:
+    """Returns the names of benchmarks whose p50 grew past REGRESSION_THRESHOLD against the baseline."""
+    return [name for name, summary in results.items() if _regressed(summary, (baseline or {}).get(name))]
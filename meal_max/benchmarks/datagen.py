@@ -0,0 +1,69 @@
+"""Generates a meals database for the benchmarks.
+
+Run from the meal_max directory:
+
+    python -m benchmarks.datagen --meals 100000 --db /tmp/meal_max.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+
+
+SQL_CREATE_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "create_meal_table.sql")
+
+CUISINES = ("Italian", "Japanese", "Mexican", "Indian", "French", "Thai", "Greek", "Korean", "Ethiopian", "Peruvian")
+DIFFICULTIES = ("LOW", "MED", "HIGH")
+
+# rows inserted per executemany call
+INSERT_BATCH_SIZE = 10_000
+
+
+def generate_meals(num_meals: int, seed: int = 0, deleted_every: int = 10):
+    """Yields (meal, cuisine, price, difficulty, battles, wins, deleted, rating) rows.
+
+    Names are unique, about half the meals have battled, ratings spread out
+    with the win record, and every deleted_every-th meal is soft deleted.
+    The same seed gives the same rows.
+    """
+    rng = random.Random(seed)
+    for i in range(1, num_meals + 1):
+        battles = rng.randrange(50) if rng.random() < 0.5 else 0
+        wins = rng.randint(0, battles)
+        yield (
+            f"Meal {i}",
+            rng.choice(CUISINES),
+            round(rng.uniform(1, 50), 2),
+            rng.choice(DIFFICULTIES),
+            battles,
+            wins,
+            bool(deleted_every) and i % deleted_every == 0,
+            round(1500 + 16 * (2 * wins - battles) + rng.uniform(-8, 8), 2),
+        )
+
+def populate(db_path: str, num_meals: int, seed: int = 0) -> None:
+    """Creates the meals table at db_path, replacing any existing one, and fills it with num_meals meals."""
+    conn = sqlite3.connect(db_path)
+    with open(SQL_CREATE_TABLE_PATH) as fh:
+        conn.executescript(fh.read())
+    rows = generate_meals(num_meals, seed)
+    insert = ("INSERT INTO meals (meal, cuisine, price, difficulty, battles, wins, deleted, rating)"
+              " VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+    while True:
+        batch = [row for _, row in zip(range(INSERT_BATCH_SIZE), rows)]
+        if not batch:
+            break
+        conn.executemany(insert, batch)
+    conn.commit()
+    conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a meals database for benchmarking.")
+    parser.add_argument("--meals", type=int, default=10_000)
+    parser.add_argument("--db", required=True, help="path of the database file to create")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    populate(args.db, args.meals, args.seed)
+    print(f"Created {args.meals} meals in {args.db}")
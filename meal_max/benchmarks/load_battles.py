@@ -0,0 +1,156 @@
+"""Battle throughput of the async battle path against the sync one, with a slow random.org.
+
+Serves the ASGI app under uvicorn on a generated database, with random
+numbers from a local random.org stub that sleeps before every answer and a
+random pool that asks it for every draw. Each client battles in its own arena.
+In "sync" mode every request, battles included, runs through Flask on the
+same bounded worker pool that serves the other routes in "async" mode. Run
+from the meal_max directory:
+
+    python -m benchmarks.load_battles --latency 0.2 --clients 200 --duration 20 --output battles.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+from benchmarks.common import load_baseline, print_table, regressions, save_results, summarize
+from benchmarks.datagen import populate
+
+
+def client(base_url: str, num_meals: int, deadline: float, seed: int, samples: dict, statuses: Counter,
+           lock: threading.Lock) -> None:
+    """Preps a random meal into its own arena and battles, until the deadline."""
+    rng = random.Random(seed)
+    latencies = []
+    local_statuses = Counter()
+    with requests.Session() as session:
+        arena_id = session.post(f"{base_url}/api/arenas", timeout=30).json()["arena_id"]
+        arena = f"{base_url}/api/arenas/{arena_id}"
+        session.post(f"{arena}/prep-combatant", json={"meal": f"Meal {rng.randrange(1, num_meals // 10) * 10 + 1}"},
+                     timeout=30)
+        while time.perf_counter() < deadline:
+            meal = f"Meal {rng.randrange(1, num_meals // 10) * 10 + 1}"
+            session.post(f"{arena}/prep-combatant", json={"meal": meal}, timeout=30)
+            start = time.perf_counter()
+            try:
+                status = session.get(f"{arena}/battle", timeout=60).status_code
+            except requests.RequestException:
+                status = "error"
+            latencies.append((time.perf_counter() - start) * 1000)
+            local_statuses[status] += 1
+    with lock:
+        samples["GET /api/arenas/<id>/battle"].extend(latencies)
+        statuses.update(local_statuses)
+
+def run_battles(base_url: str, num_meals: int, clients: int, duration: float, seed: int) -> dict:
+    samples = defaultdict(list)
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(base_url, num_meals, deadline, seed + i, samples, statuses, lock))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print("Status codes: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    return {name: summarize(latencies, elapsed) for name, latencies in samples.items()}
+
+def serve(mode: str, num_meals: int, latency: float, workers: int, seed: int):
+    """Serves the app under uvicorn in a background thread; returns (base url, shutdown)."""
+    from meal_max.utils.random_stub import RandomOrgStub
+
+    tmp = tempfile.TemporaryDirectory()
+    stub = RandomOrgStub(latency=latency, seed=seed).start()
+    os.environ["DB_PATH"] = os.path.join(tmp.name, "meal_max.db")
+    os.environ["ASGI_WSGI_WORKERS"] = str(workers)
+    os.environ.setdefault("SQL_CREATE_TABLE_PATH", os.path.join(os.path.dirname(__file__), "..", "sql", "create_meal_table.sql"))
+    populate(os.environ["DB_PATH"], num_meals, seed)
+
+    # Imported only now so the app picks up the settings above
+    import uvicorn
+    import asgi
+    from meal_max.utils import random_utils
+
+    # One random.org round trip per draw, as with a cold pool
+    random_utils._pool = random_utils.RandomPool(batch_size=1, low_water=0, fallback="none", base_url=stub.url)
+
+    async def sync_only(scope, receive, send):
+        if scope["type"] == "lifespan":
+            await asgi.lifespan(receive, send)
+        else:
+            await asgi.call_wsgi(scope, receive, send)
+
+    app = asgi.application if mode == "async" else sync_only
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    def shutdown():
+        server.should_exit = True
+        thread.join()
+        stub.stop()
+        tmp.cleanup()
+
+    return f"http://127.0.0.1:{port}", shutdown
+
+def run_in_subprocess(mode: str, args: argparse.Namespace) -> dict:
+    """Runs one mode in a fresh process, since the app reads its settings once at import."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "results.json")
+        command = [sys.executable, "-m", "benchmarks.load_battles", "--modes", mode, "--output", output]
+        for option in ("meals", "latency", "clients", "workers", "duration", "seed"):
+            command += [f"--{option}", str(getattr(args, option))]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        with open(output) as fh:
+            return json.load(fh)["results"]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare battle throughput of the async and sync paths.")
+    parser.add_argument("--modes", nargs="+", choices=("async", "sync"), default=["async", "sync"])
+    parser.add_argument("--meals", type=int, default=10_000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds the random.org stub takes to answer")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent clients, each in its own arena")
+    parser.add_argument("--workers", type=int, default=16, help="threads running the Flask app")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to battle for")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    baseline = load_baseline(args.baseline)
+    results = {}
+    for mode in args.modes:
+        if len(args.modes) > 1:
+            results.update(run_in_subprocess(mode, args))
+            continue
+        base_url, shutdown = serve(mode, args.meals, args.latency, args.workers, args.seed)
+        try:
+            for name, summary in run_battles(base_url, args.meals, args.clients, args.duration, args.seed).items():
+                results[f"{name} [{mode}]"] = summary
+        finally:
+            shutdown()
+    print_table(results, baseline)
+    if args.output:
+        save_results(args.output, results, vars(args))
+    slower = regressions(results, baseline)
+    if slower:
+        print(f"{len(slower)} request types regressed against the baseline: {', '.join(slower)}")
+        sys.exit(1)
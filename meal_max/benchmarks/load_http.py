@@ -0,0 +1,150 @@
+"""End-to-end HTTP load driver for the meal_max service.
+
+Sends a weighted mix of lookups, leaderboard pages and tournaments from
+several concurrent clients and reports throughput and latency percentiles
+per request type. Without --url it serves the app in-process on a generated
+database, with random numbers from a local random.org stub. Run from the
+meal_max directory:
+
+    python -m benchmarks.load_http --meals 100000 --concurrency 8 --duration 30 --output load.json
+    python -m benchmarks.load_http --url http://localhost:5000 --baseline load.json
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+from benchmarks.common import load_baseline, print_table, regressions, save_results, summarize
+from benchmarks.datagen import populate
+
+
+def scenarios(num_meals: int) -> list:
+    """Returns (name, weight, make_request) for every request type in the mix.
+
+    make_request takes a random.Random and returns (method, path, json body).
+    """
+    def live_id(rng: random.Random) -> int:
+        meal_id = rng.randrange(1, num_meals + 1)
+        return meal_id if meal_id % 10 else meal_id - 1 or 1
+
+    return [
+        ("GET /api/get-meal-by-id", 40, lambda rng: ("GET", f"/api/get-meal-by-id/{live_id(rng)}", None)),
+        ("GET /api/get-meal-by-name", 15, lambda rng: ("GET", f"/api/get-meal-by-name/Meal {live_id(rng)}", None)),
+        ("GET /api/leaderboard wins", 25, lambda rng: ("GET", "/api/leaderboard?sort=wins&limit=10", None)),
+        ("GET /api/leaderboard win_pct", 10, lambda rng: ("GET", "/api/leaderboard?sort=win_pct&limit=10", None)),
+        ("GET /api/leaderboard rating", 5, lambda rng: ("GET", "/api/leaderboard?sort=rating&limit=10", None)),
+        ("GET /api/search-meals", 5, lambda rng: ("GET", f"/api/search-meals?q=Meal {live_id(rng)}", None)),
+        ("GET /api/search-meals prefix", 5, lambda rng: ("GET", f"/api/search-meals?q=Meal {live_id(rng) // 100}&mode=prefix&limit=10", None)),
+        ("GET /api/leaderboard/cuisines", 3, lambda rng: ("GET", "/api/leaderboard/cuisines?sort=win_pct", None)),
+        ("GET /api/leaderboard/difficulty", 2, lambda rng: ("GET", "/api/leaderboard/difficulty", None)),
+        ("POST /api/tournament", 10, lambda rng: ("POST", "/api/tournament",
+                                                  {"meal_ids": sorted({live_id(rng) for _ in range(4)})})),
+    ]
+
+def worker(base_url: str, mix: list, deadline: float, seed: int, samples: dict, statuses: Counter,
+           lock: threading.Lock) -> None:
+    """Sends requests until the deadline, recording each latency under its request type."""
+    rng = random.Random(seed)
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    makers = {name: make for name, _, make in mix}
+    local = defaultdict(list)
+    local_statuses = Counter()
+    with requests.Session() as session:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = makers[name](rng)
+            start = time.perf_counter()
+            try:
+                status = session.request(method, base_url + path, json=body, timeout=30).status_code
+            except requests.RequestException:
+                status = "error"
+            local[name].append((time.perf_counter() - start) * 1000)
+            local_statuses[status] += 1
+    with lock:
+        for name, latencies in local.items():
+            samples[name].extend(latencies)
+        statuses.update(local_statuses)
+
+def run_load(base_url: str, num_meals: int, concurrency: int, duration: float, seed: int) -> dict:
+    """Runs the request mix against base_url and returns a summary per request type and overall."""
+    mix = scenarios(num_meals)
+    samples = defaultdict(list)
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(base_url, mix, deadline, seed + i, samples, statuses, lock))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize(latencies, elapsed) for name, latencies in sorted(samples.items())}
+    results["all requests"] = summarize([ms for latencies in samples.values() for ms in latencies], elapsed)
+    print("Status codes: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    return results
+
+def serve_in_process(num_meals: int, seed: int):
+    """Serves the app on a free local port over a generated database; returns (base url, shutdown)."""
+    from meal_max.utils.random_stub import RandomOrgStub
+
+    tmp = tempfile.TemporaryDirectory()
+    stub = RandomOrgStub(seed=seed).start()
+    os.environ["DB_PATH"] = os.path.join(tmp.name, "meal_max.db")
+    os.environ["RANDOM_ORG_URL"] = stub.url
+    os.environ.setdefault("SQL_CREATE_TABLE_PATH", os.path.join(os.path.dirname(__file__), "..", "sql", "create_meal_table.sql"))
+    populate(os.environ["DB_PATH"], num_meals, seed)
+
+    # Imported only now so the app picks up the database and stub configured above
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def shutdown():
+        server.shutdown()
+        stub.stop()
+        tmp.cleanup()
+
+    return f"http://127.0.0.1:{server.server_port}", shutdown
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Drive HTTP load against the meal_max service.")
+    parser.add_argument("--url", help="base URL of a running service; by default one is served in-process")
+    parser.add_argument("--meals", type=int, default=10_000,
+                        help="meals to generate, or how many the running service holds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to send requests for")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    baseline = load_baseline(args.baseline)
+    base_url, shutdown = (args.url.rstrip("/"), None) if args.url else serve_in_process(args.meals, args.seed)
+    try:
+        results = run_load(base_url, args.meals, args.concurrency, args.duration, args.seed)
+    finally:
+        if shutdown:
+            shutdown()
+    print_table(results, baseline)
+    if args.output:
+        save_results(args.output, results, vars(args))
+    slower = regressions(results, baseline)
+    if slower:
+        print(f"{len(slower)} request types regressed against the baseline: {', '.join(slower)}")
+        sys.exit(1)
@@ -13,5 +13,9 @@ else
     echo "Skipping database creation."
 fi
 
-# Start the Python application
-exec python app.py
+# Start the Python application, under an ASGI server so battles don't hold a worker if ASGI is true
+if [ "$ASGI" = "true" ]; then
+    exec uvicorn asgi:application --host 0.0.0.0 --port 5000
+else
+    exec python app.py
+fi
@@ -0,0 +1,409 @@
+from collections import OrderedDict
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+import uuid
+
+from meal_max.models.battle_model import BattleModel
+from meal_max.models.history_model import record_battles
+from meal_max.models.kitchen_model import Meal, get_meals_by_ids, settle_battle
+from meal_max.utils.logger import configure_logger
+from meal_max.utils.sql_utils import get_db_connection
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# seconds an arena may go unused before it is evicted
+ARENA_IDLE_TIMEOUT = float(os.getenv("ARENA_IDLE_TIMEOUT", "1800"))
+
+# most arenas kept in memory; the least recently used is evicted first
+ARENA_MAX = int(os.getenv("ARENA_MAX", "10000"))
+
+# keep arenas in the database so every worker process sees the same ones; the arenas
+# table and its default row are created with the rest of the schema by create_meal_table.sql
+ARENA_PERSIST = os.getenv("ARENA_PERSIST", "false").lower() == "true"
+
+# the arena behind the original, arena-less battle routes; it is never evicted
+DEFAULT_ARENA = "default"
+
+
+class ArenaNotFoundError(ValueError):
+    """Raised when an arena id is unknown or the arena has been evicted."""
+
+
+class ArenaConflictError(ValueError):
+    """Raised when an arena changed between reading and writing it; the request can be retried."""
+
+
+class _Arena:
+    """One in-memory arena: its own BattleModel, a lock serializing its battles,
+    and a version bumped on every change to its combatants."""
+
+    def __init__(self):
+        self.battle_model = BattleModel()
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.version = 0
+
+
+class ArenaRegistry:
+    """Keeps many independent battle arenas, each with its own two combatant slots.
+
+    By default arenas live in this process, in least-recently-used order, and
+    are evicted once idle for idle_timeout seconds or when there are more than
+    max_arenas. With persist, arenas are rows of the arenas table instead, so
+    every worker process shares them. Each write then checks the version it
+    read, so two processes cannot settle the same battle twice.
+
+    Attributes:
+        idle_timeout (float): Seconds an arena may go unused before it is evicted.
+        max_arenas (int): The most arenas kept in memory.
+        persist (bool): Whether arenas are kept in the database.
+    """
+
+    def __init__(self, idle_timeout: float = ARENA_IDLE_TIMEOUT, max_arenas: int = ARENA_MAX,
+                 persist: bool = ARENA_PERSIST):
+        if max_arenas < 1:
+            raise ValueError(f"Invalid arena limit: {max_arenas}. Must be at least 1.")
+        self.idle_timeout = idle_timeout
+        self.max_arenas = max_arenas
+        self.persist = persist
+        self._arenas: "OrderedDict[str, _Arena]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "evicted": 0, "battles": 0, "conflicts": 0}
+
+    ##################################################
+    # Arena Management Functions
+    ##################################################
+
+    def create_arena(self) -> str:
+        """Creates an empty arena.
+
+        Returns:
+            str: The new arena's id.
+        """
+        arena_id = uuid.uuid4().hex
+        if self.persist:
+            self._insert_row(arena_id)
+            self._evict_idle_rows()
+        else:
+            with self._lock:
+                self._add(arena_id)
+        with self._lock:
+            self._stats["created"] += 1
+        logger.info("Created arena %s", arena_id)
+        return arena_id
+
+    def delete_arena(self, arena_id: str) -> None:
+        """Deletes an arena and drops its combatants.
+
+        Args:
+            arena_id (str): The arena to delete.
+
+        Raises:
+            ArenaNotFoundError: If the arena does not exist.
+        """
+        if self.persist:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM arenas WHERE id = ?", (arena_id,))
+                conn.commit()
+                deleted = cursor.rowcount > 0
+        else:
+            with self._lock:
+                deleted = self._arenas.pop(arena_id, None) is not None
+        if not deleted:
+            logger.info("Arena %s not found", arena_id)
+            raise ArenaNotFoundError(f"Arena {arena_id} not found")
+        logger.info("Deleted arena %s", arena_id)
+
+    def stats(self) -> dict:
+        """Returns how many arenas exist and how many were created, evicted and fought in.
+
+        Returns:
+            dict: The arena statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["arenas"] = len(self._arenas)
+        if self.persist:
+            with get_db_connection() as conn:
+                stats["arenas"] = conn.execute("SELECT COUNT(*) FROM arenas").fetchone()[0]
+        stats.update({"persist": self.persist, "idle_timeout": self.idle_timeout, "max_arenas": self.max_arenas})
+        return stats
+
+    ##################################################
+    # Battle Functions
+    ##################################################
+
+    def get_combatants(self, arena_id: str) -> List[Meal]:
+        """Retrieves the combatants prepped in an arena.
+
+        Args:
+            arena_id (str): The arena.
+
+        Returns:
+            List[Meal]: The arena's combatants.
+
+        Raises:
+            ArenaNotFoundError: If the arena does not exist.
+        """
+        if self.persist:
+            combatant_ids, _ = self._load_row(arena_id)
+            return get_meals_by_ids(combatant_ids)
+        arena = self._checkout(arena_id)
+        with arena.lock:
+            return list(arena.battle_model.get_combatants())
+
+    def prep_combatant(self, arena_id: str, meal: Meal) -> List[Meal]:
+        """Adds a combatant to an arena if it has fewer than two.
+
+        Args:
+            arena_id (str): The arena.
+            meal (Meal): The meal to prep.
+
+        Returns:
+            List[Meal]: The arena's combatants afterwards.
+
+        Raises:
+            ArenaNotFoundError: If the arena does not exist.
+            ValueError: If the arena already has two combatants.
+            ArenaConflictError: If the arena changed while this request ran.
+        """
+        if self.persist:
+            combatant_ids, version = self._load_row(arena_id)
+            battle_model = BattleModel()
+            battle_model.combatants = get_meals_by_ids(combatant_ids)
+            battle_model.prep_combatant(meal)
+            self._save_row(arena_id, [combatant.id for combatant in battle_model.combatants], version)
+            return battle_model.get_combatants()
+        arena = self._checkout(arena_id)
+        with arena.lock:
+            arena.battle_model.prep_combatant(meal)
+            arena.version += 1
+            return list(arena.battle_model.get_combatants())
+
+    def clear_combatants(self, arena_id: str) -> None:
+        """Clears the combatants of an arena.
+
+        Args:
+            arena_id (str): The arena.
+
+        Raises:
+            ArenaNotFoundError: If the arena does not exist.
+            ArenaConflictError: If the arena changed while this request ran.
+        """
+        if self.persist:
+            _, version = self._load_row(arena_id)
+            self._save_row(arena_id, [], version)
+            return
+        arena = self._checkout(arena_id)
+        with arena.lock:
+            arena.battle_model.clear_combatants()
+            arena.version += 1
+
+    def battle(self, arena_id: str) -> str:
+        """Fights the two combatants of an arena and records the result.
+
+        Args:
+            arena_id (str): The arena.
+
+        Returns:
+            str: The name of the winning meal, which stays in the arena.
+
+        Raises:
+            ArenaNotFoundError: If the arena does not exist.
+            ValueError: If fewer than two combatants are prepped.
+            ArenaConflictError: If the arena changed while this request ran.
+        """
+        if self.persist:
+            combatant_1, combatant_2, version = self.prepare_battle(arena_id)
+            return self.finish_battle(arena_id, combatant_1, combatant_2, version)
+        arena = self._checkout(arena_id)
+        with arena.lock:
+            result = arena.battle_model.battle()
+            arena.version += 1
+        with self._lock:
+            self._stats["battles"] += 1
+        return result
+
+    def prepare_battle(self, arena_id: str) -> Tuple[Meal, Meal, int]:
+        """Reads the two combatants of an arena, for a battle decided later by finish_battle.
+
+        Together the two let the random draw happen in between without holding the arena.
+
+        Args:
+            arena_id (str): The arena.
+
+        Returns:
+            Tuple[Meal, Meal, int]: The two combatants and the arena version they were read at.
+
+        Raises:
+            ArenaNotFoundError: If the arena does not exist.
+            ValueError: If fewer than two combatants are prepped.
+        """
+        if self.persist:
+            combatant_ids, version = self._load_row(arena_id)
+            combatants = get_meals_by_ids(combatant_ids[:2])
+        else:
+            arena = self._checkout(arena_id)
+            with arena.lock:
+                combatants, version = list(arena.battle_model.get_combatants()), arena.version
+        if len(combatants) < 2:
+            logger.error("Not enough combatants to start a battle in arena %s.", arena_id)
+            raise ValueError("Two combatants must be prepped for a battle.")
+        return combatants[0], combatants[1], version
+
+    def finish_battle(self, arena_id: str, combatant_1: Meal, combatant_2: Meal, version: int,
+                      random_number: Optional[float] = None) -> str:
+        """Fights two combatants read by prepare_battle and records the result.
+
+        Args:
+            arena_id (str): The arena.
+            combatant_1 (Meal): The first combatant.
+            combatant_2 (Meal): The second combatant.
+            version (int): The arena version the combatants were read at.
+            random_number (float, optional): A number already drawn. Drawn from random.org if omitted.
+
+        Returns:
+            str: The name of the winning meal, which stays in the arena.
+
+        Raises:
+            ArenaNotFoundError: If the arena no longer exists.
+            ArenaConflictError: If the arena changed since the combatants were read.
+        """
+        winner, loser, record = BattleModel().decide(combatant_1, combatant_2, random_number)
+        # The arena only changes once the result is recorded, so a failed settlement leaves the loser in place
+        if self.persist:
+            # Claim the battle in the transaction that records it, so a concurrent request cannot settle it too
+            settle_battle(winner.id, loser.id,
+                          claim=lambda cursor: self._update_row(cursor, arena_id, [winner.id], version))
+        else:
+            arena = self._checkout(arena_id)
+            with arena.lock:
+                if arena.version != version:
+                    self._conflict(arena_id)
+                settle_battle(winner.id, loser.id)
+                arena.battle_model.combatants.remove(loser)
+                arena.version += 1
+        record_battles([record])
+        with self._lock:
+            self._stats["battles"] += 1
+        return winner.meal
+
+    ##################################################
+    # In-memory Arenas
+    ##################################################
+
+    def _add(self, arena_id: str) -> _Arena:
+        """Adds an arena, evicting idle and least recently used ones. Must hold the lock."""
+        self._evict_idle()
+        arena = self._arenas[arena_id] = _Arena()
+        while len(self._arenas) > self.max_arenas:
+            oldest = next(iter(self._arenas))
+            if oldest == DEFAULT_ARENA:
+                self._arenas.move_to_end(oldest)
+                oldest = next(iter(self._arenas))
+            del self._arenas[oldest]
+            self._stats["evicted"] += 1
+        return arena
+
+    def _evict_idle(self) -> None:
+        """Evicts arenas unused for idle_timeout seconds, oldest first. Must hold the lock."""
+        cutoff = time.monotonic() - self.idle_timeout
+        for arena_id in list(self._arenas):
+            if self._arenas[arena_id].last_used >= cutoff:
+                break
+            if arena_id != DEFAULT_ARENA:
+                del self._arenas[arena_id]
+                self._stats["evicted"] += 1
+
+    def _checkout(self, arena_id: str) -> _Arena:
+        """Returns an arena and marks it as just used, creating the default arena on first use."""
+        with self._lock:
+            self._evict_idle()
+            arena = self._arenas.get(arena_id)
+            if arena is None:
+                if arena_id != DEFAULT_ARENA:
+                    logger.info("Arena %s not found", arena_id)
+                    raise ArenaNotFoundError(f"Arena {arena_id} not found")
+                arena = self._add(arena_id)
+            arena.last_used = time.monotonic()
+            self._arenas.move_to_end(arena_id)
+            return arena
+
+    ##################################################
+    # Persisted Arenas
+    ##################################################
+
+    def _insert_row(self, arena_id: str) -> None:
+        try:
+            with get_db_connection() as conn:
+                conn.execute("INSERT OR IGNORE INTO arenas (id, last_used) VALUES (?, ?)", (arena_id, time.time()))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", str(e))
+            raise e
+
+    def _evict_idle_rows(self) -> None:
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM arenas WHERE last_used < ? AND id != ?",
+                               (time.time() - self.idle_timeout, DEFAULT_ARENA))
+                conn.commit()
+                evicted = cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", str(e))
+            raise e
+        if evicted:
+            with self._lock:
+                self._stats["evicted"] += evicted
+            logger.info("Evicted %d idle arenas", evicted)
+
+    def _load_row(self, arena_id: str) -> Tuple[List[int], int]:
+        """Returns an arena's combatant ids and the version they were read at."""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT combatant_ids, version, last_used FROM arenas WHERE id = ?", (arena_id,))
+                row = cursor.fetchone()
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", str(e))
+            raise e
+
+        if row is None or (arena_id != DEFAULT_ARENA and row[2] < time.time() - self.idle_timeout):
+            logger.info("Arena %s not found", arena_id)
+            raise ArenaNotFoundError(f"Arena {arena_id} not found")
+        combatant_ids = [int(meal_id) for meal_id in row[0].split(",") if meal_id]
+        return combatant_ids, row[1]
+
+    def _save_row(self, arena_id: str, combatant_ids: List[int], version: int) -> None:
+        """Stores an arena's combatants if nobody else has changed it since it was read at version."""
+        try:
+            with get_db_connection() as conn:
+                self._update_row(conn.cursor(), arena_id, combatant_ids, version)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", str(e))
+            raise e
+
+    def _update_row(self, cursor: sqlite3.Cursor, arena_id: str, combatant_ids: List[int], version: int) -> None:
+        """Like _save_row, but leaves committing to the caller."""
+        cursor.execute(
+            "UPDATE arenas SET combatant_ids = ?, version = version + 1, last_used = ? WHERE id = ? AND version = ?",
+            (",".join(str(meal_id) for meal_id in combatant_ids), time.time(), arena_id, version)
+        )
+        if cursor.rowcount == 0:
+            self._conflict(arena_id)
+
+    def _conflict(self, arena_id: str) -> None:
+        with self._lock:
+            self._stats["conflicts"] += 1
+        logger.warning("Arena %s was changed by another request", arena_id)
+        raise ArenaConflictError(f"Arena {arena_id} was changed by another request; try again.")
@@ -1,7 +1,9 @@
 import logging
-from typing import List
+import time
+from typing import List, Optional, Tuple
 
-from meal_max.models.kitchen_model import Meal, update_meal_stats
+from meal_max.models.history_model import BattleRecord, record_battles
+from meal_max.models.kitchen_model import Meal, settle_battle
 from meal_max.utils.logger import configure_logger
 from meal_max.utils.random_utils import get_random
 
@@ -35,6 +37,31 @@ class BattleModel:
         combatant_1 = self.combatants[0]
         combatant_2 = self.combatants[1]
 
+        winner, loser, record = self.decide(combatant_1, combatant_2)
+
+        # Record the win and the loss in one transaction
+        settle_battle(winner.id, loser.id)
+
+        # Then queue the battle for the history log, which writes in batches
+        record_battles([record])
+
+        # Remove the losing combatant from combatants
+        self.combatants.remove(loser)
+
+        return winner.meal
+
+    def decide(self, combatant_1: Meal, combatant_2: Meal,
+               random_number: Optional[float] = None) -> Tuple[Meal, Meal, BattleRecord]:
+        """Decides a battle between two meals without recording it.
+
+        Args:
+            combatant_1 (Meal): The first combatant.
+            combatant_2 (Meal): The second combatant.
+            random_number (float, optional): A number already drawn, e.g. asynchronously. Drawn from random.org if omitted.
+
+        Returns:
+            Tuple[Meal, Meal, BattleRecord]: The winner, the loser and the record for the battle history.
+        """
         # Log the start of the battle
         logger.info("Battle started between %s and %s", combatant_1.meal, combatant_2.meal)
 
@@ -53,7 +80,8 @@ class BattleModel:
         logger.info("Delta between scores: %.3f", delta)
 
         # Get random number from random.org
-        random_number = get_random()
+        if random_number is None:
+            random_number = get_random()
 
         # Log the random number
         logger.info("Random number from random.org: %.3f", random_number)
@@ -69,14 +97,9 @@ class BattleModel:
         # Log the winner
         logger.info("The winner is: %s", winner.meal)
 
-        # Update stats for both combatants
-        update_meal_stats(winner.id, 'win')
-        update_meal_stats(loser.id, 'loss')
-
-        # Remove the losing combatant from combatants
-        self.combatants.remove(loser)
-
-        return winner.meal
+        record = BattleRecord(combatant_1.id, combatant_2.id, score_1, score_2, delta, random_number, winner.id,
+                              time.time())
+        return winner, loser, record
 
     def clear_combatants(self):
         """Clears the list of combatants."""
@@ -94,14 +117,14 @@ class BattleModel:
         difficulty_modifier = {"HIGH": 1, "MED": 2, "LOW": 3}
 
         # Log the calculation process
-        logger.info("Calculating battle score for %s: price=%.3f, cuisine=%s, difficulty=%s",
+        logger.debug("Calculating battle score for %s: price=%.3f, cuisine=%s, difficulty=%s",
                     combatant.meal, combatant.price, combatant.cuisine, combatant.difficulty)
 
         # Calculate score
         score = (combatant.price * len(combatant.cuisine)) - difficulty_modifier[combatant.difficulty]
 
         # Log the calculated score
-        logger.info("Battle score for %s: %.3f", combatant.meal, score)
+        logger.debug("Battle score for %s: %.3f", combatant.meal, score)
 
         return score
 
@@ -0,0 +1,475 @@
+import atexit
+from dataclasses import astuple, dataclass
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from meal_max.utils.logger import configure_logger
+from meal_max.utils.metrics import timed
+from meal_max.utils.sql_utils import get_db_connection
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# battles written per transaction, and the most seconds a battle waits in the buffer;
+# with an interval of 0 there is no writer thread and full batches are written by the battling thread
+BATTLE_LOG_BATCH_SIZE = int(os.getenv("BATTLE_LOG_BATCH_SIZE", "100"))
+BATTLE_LOG_FLUSH_INTERVAL = float(os.getenv("BATTLE_LOG_FLUSH_INTERVAL", "1"))
+
+# most battles held while the database cannot be written; the oldest are dropped beyond that
+BATTLE_LOG_MAX_PENDING = int(os.getenv("BATTLE_LOG_MAX_PENDING", "100000"))
+
+# days a battle is kept in full before it is folded into its pair's head-to-head totals and the
+# winner-and-loser replay record; 0 keeps every battle
+BATTLE_HISTORY_RETENTION_DAYS = float(os.getenv("BATTLE_HISTORY_RETENTION_DAYS", "90"))
+
+# seconds between retention passes, which run after a flush
+BATTLE_HISTORY_PRUNE_INTERVAL = float(os.getenv("BATTLE_HISTORY_PRUNE_INTERVAL", "3600"))
+
+# columns of the battles table, in BattleRecord order
+BATTLE_COLUMNS = "meal_1_id, meal_2_id, score_1, score_2, delta, random_number, winner_id, fought_at"
+
+
+class HistoryIncompleteError(ValueError):
+    """Raised when the battle history no longer holds every battle, so it cannot be replayed."""
+
+
+@dataclass(frozen=True)
+class BattleRecord:
+    """One battle as it was fought.
+
+    Attributes:
+        meal_1_id (int): The first combatant, who wins when the delta beats the draw.
+        meal_2_id (int): The second combatant.
+        score_1 (float): The first combatant's battle score.
+        score_2 (float): The second combatant's battle score.
+        delta (float): The normalized score difference.
+        random_number (float): The random draw the delta was compared to.
+        winner_id (int): The winning meal.
+        fought_at (float): Unix time of the battle.
+    """
+    meal_1_id: int
+    meal_2_id: int
+    score_1: float
+    score_2: float
+    delta: float
+    random_number: float
+    winner_id: int
+    fought_at: float
+
+    @property
+    def loser_id(self) -> int:
+        return self.meal_2_id if self.winner_id == self.meal_1_id else self.meal_1_id
+
+
+class BattleLog:
+    """Buffers battle records in memory and appends them to the battles table in batches.
+
+    Records are written in the order they were appended, one transaction per
+    batch, by a writer thread that wakes when a batch fills up or every
+    flush_interval seconds. When a write fails the records are put back and
+    retried with the next batch, up to max_pending of them.
+
+    Attributes:
+        batch_size (int): Records written per transaction.
+        flush_interval (float): Most seconds a record waits; 0 means no writer thread.
+        max_pending (int): Most records kept while writes fail.
+        retention (float): Seconds a battle is kept in full; 0 keeps every battle.
+        prune_interval (float): Seconds between retention passes.
+    """
+
+    def __init__(self, batch_size: int = BATTLE_LOG_BATCH_SIZE, flush_interval: float = BATTLE_LOG_FLUSH_INTERVAL,
+                 max_pending: int = BATTLE_LOG_MAX_PENDING, retention: float = BATTLE_HISTORY_RETENTION_DAYS * 86400,
+                 prune_interval: float = BATTLE_HISTORY_PRUNE_INTERVAL):
+        if batch_size < 1:
+            raise ValueError(f"Invalid batch size: {batch_size}. Must be at least 1.")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, batch_size)
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._pending: List[BattleRecord] = []
+        self._lock = threading.Condition()
+        # Serializes writes so batches reach the table in append order
+        self._flush_lock = threading.Lock()
+        self._writer = None
+        self._closed = False
+        self._last_prune = time.monotonic()
+        self._stats = {"appended": 0, "written": 0, "batches": 0, "failures": 0, "dropped": 0, "pruned": 0}
+
+    def append(self, records: Iterable[BattleRecord]) -> None:
+        """Queues records to be written.
+
+        Args:
+            records (Iterable[BattleRecord]): The battles, in the order they were fought.
+        """
+        with self._lock:
+            before = len(self._pending)
+            self._pending.extend(records)
+            self._stats["appended"] += len(self._pending) - before
+            self._drop_overflow()
+            full = len(self._pending) >= self.batch_size
+            if self.flush_interval > 0:
+                if self._writer is None and not self._closed:
+                    self._writer = threading.Thread(target=self._run, name="battle-log", daemon=True)
+                    self._writer.start()
+                if full:
+                    self._lock.notify()
+                return
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Writes every queued record now, then prunes old battles if a retention pass is due.
+
+        A failed write is logged and its records are kept for the next flush.
+
+        Returns:
+            int: How many records were written.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                if not batch:
+                    break
+                try:
+                    self._write(batch)
+                except sqlite3.Error as e:
+                    logger.error("Database error while writing %d battles: %s", len(batch), str(e))
+                    with self._lock:
+                        self._pending[:0] = batch
+                        self._stats["failures"] += 1
+                        self._drop_overflow()
+                    break
+                written += len(batch)
+                with self._lock:
+                    self._stats["written"] += len(batch)
+                    self._stats["batches"] += 1
+
+            if self.retention > 0 and time.monotonic() - self._last_prune >= self.prune_interval:
+                self._last_prune = time.monotonic()
+                try:
+                    self.prune(time.time() - self.retention)
+                except sqlite3.Error:
+                    # Already logged; the next pass will try again
+                    pass
+        return written
+
+    def prune(self, cutoff: float) -> int:
+        """Folds battles fought before cutoff into the head-to-head totals of their pairs and deletes them.
+
+        The winner and loser of each are kept in battle_results, in order, so
+        ratings can still be recomputed from the whole history.
+
+        Args:
+            cutoff (float): Unix time; earlier battles are compacted.
+
+        Returns:
+            int: How many battles were deleted.
+
+        Raises:
+            sqlite3.Error: If there is a database error.
+        """
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                # Battles are appended in time order, so the expired ones are a prefix of the table
+                cursor.execute("""
+                    SELECT COALESCE((SELECT id FROM battles WHERE fought_at >= ? ORDER BY id LIMIT 1),
+                                    (SELECT MAX(id) + 1 FROM battles))
+                """, (cutoff,))
+                boundary = cursor.fetchone()[0]
+                if boundary is None:
+                    conn.rollback()
+                    return 0
+                cursor.execute("""
+                    INSERT INTO battle_pairs (meal_low_id, meal_high_id, battles, low_wins)
+                    SELECT min(meal_1_id, meal_2_id), max(meal_1_id, meal_2_id), COUNT(*),
+                           SUM(winner_id = min(meal_1_id, meal_2_id))
+                    FROM battles NOT INDEXED WHERE id < ?
+                    GROUP BY 1, 2
+                    ON CONFLICT (meal_low_id, meal_high_id) DO UPDATE SET
+                        battles = battles + excluded.battles, low_wins = low_wins + excluded.low_wins
+                """, (boundary,))
+                cursor.execute("""
+                    INSERT INTO battle_results (id, winner_id, loser_id)
+                    SELECT id, winner_id, CASE WHEN winner_id = meal_1_id THEN meal_2_id ELSE meal_1_id END
+                    FROM battles WHERE id < ?
+                """, (boundary,))
+                cursor.execute("DELETE FROM battles WHERE id < ?", (boundary,))
+                pruned = cursor.rowcount
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Database error while pruning battles: %s", str(e))
+            raise e
+
+        with self._lock:
+            self._stats["pruned"] += pruned
+        if pruned:
+            logger.info("Compacted %d battles fought before %.0f", pruned, cutoff)
+        return pruned
+
+    def close(self) -> None:
+        """Stops the writer thread and writes whatever is still queued."""
+        with self._lock:
+            self._closed = True
+            writer, self._writer = self._writer, None
+            self._lock.notify()
+        if writer is not None:
+            writer.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        """Returns how many records were appended, written and dropped, and how many are queued.
+
+        Returns:
+            dict: The battle log statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats.update({"batch_size": self.batch_size, "flush_interval": self.flush_interval,
+                      "retention_days": self.retention / 86400})
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._pending) < self.batch_size and not self._closed:
+                    self._lock.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _drop_overflow(self) -> None:
+        """Drops the oldest queued records beyond max_pending. Must hold the lock."""
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self._stats["dropped"] += overflow
+            logger.warning("Battle log is full; dropped the %d oldest battles", overflow)
+
+    def _write(self, batch: List[BattleRecord]) -> None:
+        with get_db_connection() as conn:
+            conn.executemany(f"INSERT INTO battles ({BATTLE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             [astuple(record) for record in batch])
+            conn.commit()
+
+
+# The process-wide battle log
+_log = BattleLog()
+
+# Write out queued battles when the process exits
+atexit.register(lambda: _log.close())
+
+
+def record_battles(records: Iterable[BattleRecord]) -> None:
+    """Queues settled battles to be appended to the battle history.
+
+    Args:
+        records (Iterable[BattleRecord]): The battles, in the order they were fought.
+    """
+    _log.append(records)
+
+def flush_battle_log() -> int:
+    """Writes every queued battle to the battle history now.
+
+    Returns:
+        int: How many battles were written.
+    """
+    return _log.flush()
+
+def prune_battles(cutoff: float) -> int:
+    """Compacts battles fought before cutoff into head-to-head totals, whatever the retention setting.
+
+    Args:
+        cutoff (float): Unix time; earlier battles are compacted.
+
+    Returns:
+        int: How many battles were deleted.
+
+    Raises:
+        sqlite3.Error: If there is a database error.
+    """
+    _log.flush()
+    return _log.prune(cutoff)
+
+def get_battle_log_stats() -> dict:
+    """Returns the battle log's append, write and drop counters.
+
+    Returns:
+        dict: The battle log statistics.
+    """
+    return _log.stats()
+
+@timed("query_duration_seconds")
+def get_head_to_head(meal_1_id: int, meal_2_id: int) -> dict:
+    """Gets the record of two meals against each other, including battles already compacted.
+
+    Args:
+        meal_1_id (int): The first meal.
+        meal_2_id (int): The second meal.
+
+    Returns:
+        dict: How many times they met and how many each won.
+
+    Raises:
+        sqlite3.Error: If there is a database error.
+    """
+    _log.flush()
+    low_id, high_id = min(meal_1_id, meal_2_id), max(meal_1_id, meal_2_id)
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # Spelled like the expressions of idx_battles_pair so the index is used
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(winner_id = ?), 0) FROM battles
+                WHERE min(meal_1_id, meal_2_id) = ? AND max(meal_1_id, meal_2_id) = ?
+            """, (low_id, low_id, high_id))
+            battles, low_wins = cursor.fetchone()
+            cursor.execute("SELECT battles, low_wins FROM battle_pairs WHERE meal_low_id = ? AND meal_high_id = ?",
+                           (low_id, high_id))
+            compacted = cursor.fetchone()
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+    if compacted:
+        battles += compacted[0]
+        low_wins += compacted[1]
+    meal_1_wins = low_wins if meal_1_id == low_id else battles - low_wins
+    return {
+        'meal_1_id': meal_1_id,
+        'meal_2_id': meal_2_id,
+        'battles': battles,
+        'meal_1_wins': meal_1_wins,
+        'meal_2_wins': battles - meal_1_wins,
+    }
+
+@timed("query_duration_seconds")
+def get_meal_battles(meal_id: int, limit: int = 50, before: Optional[int] = None) -> List[dict]:
+    """Gets the battles a meal fought, newest first. Compacted battles are not included.
+
+    Args:
+        meal_id (int): The meal.
+        limit (int): The most battles to return.
+        before (int, optional): Keyset cursor; only battles with a smaller battle id.
+
+    Returns:
+        list[dict]: The battles.
+
+    Raises:
+        ValueError: If limit is negative.
+        sqlite3.Error: If there is a database error.
+    """
+    if limit < 0:
+        logger.error("Invalid limit: %s", limit)
+        raise ValueError(f"Invalid limit: {limit}. Must be a non-negative integer.")
+    _log.flush()
+    before = (1 << 63) - 1 if before is None else before
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # One ordered index range per side, merged by SQLite without sorting
+            cursor.execute(f"""
+                SELECT id, {BATTLE_COLUMNS} FROM battles WHERE meal_1_id = ? AND id < ?
+                UNION ALL
+                SELECT id, {BATTLE_COLUMNS} FROM battles WHERE meal_2_id = ? AND meal_1_id != ? AND id < ?
+                ORDER BY id DESC LIMIT ?
+            """, (meal_id, before, meal_id, meal_id, before, limit))
+            rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+    battles = []
+    for battle_id, *columns in rows:
+        record = BattleRecord(*columns)
+        battles.append({
+            'id': battle_id,
+            'meal_1_id': record.meal_1_id,
+            'meal_2_id': record.meal_2_id,
+            'score_1': record.score_1,
+            'score_2': record.score_2,
+            'delta': record.delta,
+            'random_number': record.random_number,
+            'winner_id': record.winner_id,
+            'loser_id': record.loser_id,
+            'fought_at': record.fought_at,
+        })
+    return battles
+
+def check_history_complete() -> None:
+    """Checks that the history still holds every battle, so replaying it gives the real ratings.
+
+    Battles this process dropped from a full log were never written, and
+    databases compacted before battle_results existed kept only head-to-head
+    totals, which have lost the order of their battles.
+
+    Raises:
+        HistoryIncompleteError: If any battle was dropped or compacted without its result.
+        sqlite3.Error: If there is a database error.
+    """
+    _log.flush()
+    dropped = _log.stats()["dropped"]
+    if dropped:
+        logger.error("The battle history is missing %d dropped battles", dropped)
+        raise HistoryIncompleteError(f"{dropped} battles were dropped before they were written; "
+                                     "the history cannot be replayed.")
+    try:
+        with get_db_connection() as conn:
+            compacted = conn.execute("SELECT COALESCE(SUM(battles), 0) FROM battle_pairs").fetchone()[0]
+            kept = conn.execute("SELECT COUNT(*) FROM battle_results").fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+    if compacted > kept:
+        logger.error("The battle history has %d compacted battles without results", compacted - kept)
+        raise HistoryIncompleteError(f"{compacted - kept} battles were compacted without their results; "
+                                     "the history cannot be replayed.")
+
+def iter_battle_results(batch_size: int = 10000) -> Iterator[Tuple[int, int]]:
+    """Yields (winner_id, loser_id) of every battle in the order they were fought, e.g. to
+    recompute ratings: the compacted ones from battle_results, then the kept ones from battles.
+
+    Args:
+        batch_size (int): Battles read per query.
+
+    Yields:
+        Tuple[int, int]: The winner and loser of each battle.
+
+    Raises:
+        sqlite3.Error: If there is a database error.
+    """
+    _log.flush()
+    # Compacted battles have lower ids than every kept one
+    queries = [
+        "SELECT id, winner_id, loser_id FROM battle_results WHERE id > ? ORDER BY id LIMIT ?",
+        """SELECT id, winner_id, CASE WHEN winner_id = meal_1_id THEN meal_2_id ELSE meal_1_id END
+           FROM battles WHERE id > ? ORDER BY id LIMIT ?""",
+    ]
+    last_id = 0
+    for query in queries:
+        while True:
+            try:
+                with get_db_connection() as conn:
+                    rows = conn.execute(query, (last_id, batch_size)).fetchall()
+            except sqlite3.Error as e:
+                logger.error("Database error: %s", str(e))
+                raise e
+            # Release the connection between batches rather than hold it while the caller works
+            for battle_id, winner_id, loser_id in rows:
+                yield winner_id, loser_id
+            if rows:
+                last_id = rows[-1][0]
+            if len(rows) < batch_size:
+                break
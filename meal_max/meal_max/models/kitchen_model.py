@@ -1,21 +1,65 @@
+import atexit
 from dataclasses import dataclass
 import logging
 import os
+import re
 import sqlite3
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union
 
-from meal_max.utils.sql_utils import get_db_connection
+from meal_max.utils.leaderboard_cache import GROUP_COLUMNS, SORT_KEYS, LeaderboardCache
+from meal_max.utils.lru_cache import VersionedLRUCache
+from meal_max.utils.ratings import INITIAL_RATING, rate_battles, replay_ratings
+from meal_max.utils.sql_utils import get_db_connection, get_meal_changes, read_meal_changes
 from meal_max.utils.logger import configure_logger
+from meal_max.utils.metrics import timed
+from meal_max.utils.write_behind import WriteBehindCounters
 
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-@dataclass
+# Max ids bound into a single "IN (...)" list
+SQL_IN_CHUNK_SIZE = 500
+
+# Rows written per bulk import transaction, and the most per-row errors reported back
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_MAX_ERRORS = 1000
+
+# Meals fetched per page while streaming the leaderboard
+LEADERBOARD_STREAM_BATCH_SIZE = 500
+
+# The columns the leaderboard cache is built from
+LEADERBOARD_COLUMNS = "id, meal, cuisine, price, difficulty, battles, wins, deleted, rating"
+
+# Most matches of a search that are ranked; a search matching more ranks only its first matches by id.
+# Ranking with bm25 instead would read every posting of a common word, such as a cuisine, each time.
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "1000"))
+
+# Bounds of the read-through meal lookup cache
+MEAL_CACHE_SIZE = int(os.getenv("MEAL_CACHE_SIZE", "1024"))
+MEAL_CACHE_TTL = float(os.getenv("MEAL_CACHE_TTL", "60"))
+
+# Write-behind mode for battle stats: the battle, win and rating increments of settle_battles and
+# update_meal_stats are kept in memory and written in one transaction every STATS_FLUSH_INTERVAL_MS
+# milliseconds or STATS_FLUSH_MAX_EVENTS events, so a crash can lose up to that window of stats
+STATS_WRITE_BEHIND = os.getenv("STATS_WRITE_BEHIND", "false").lower() == "true"
+STATS_FLUSH_INTERVAL_MS = float(os.getenv("STATS_FLUSH_INTERVAL_MS", "200"))
+STATS_FLUSH_MAX_EVENTS = int(os.getenv("STATS_FLUSH_MAX_EVENTS", "1000"))
+
+# Kept in step with every write made through this module
+_leaderboard = LeaderboardCache()
+
+# Meals keyed by ("id", meal_id) and ("name", meal_name)
+_meal_cache = VersionedLRUCache(MEAL_CACHE_SIZE, MEAL_CACHE_TTL)
+
+
+@dataclass(frozen=True)
 class Meal:
     '''
     Describe the information of the meals and what type of variables they are.
+    Meals are immutable so cached instances can be shared safely, and slotted
+    so they carry no per-instance __dict__.
     
     Attributes:
         id: id for the meals
@@ -24,6 +68,8 @@ class Meal:
         price: the price of the meal
         difficulty: difficulty level of the meal
     '''
+    __slots__ = ("id", "meal", "cuisine", "price", "difficulty")
+
     id: int
     meal: str
     cuisine: str
@@ -43,7 +89,58 @@ class Meal:
         if self.difficulty not in ['LOW', 'MED', 'HIGH']:
             raise ValueError("Difficulty must be 'LOW', 'MED', or 'HIGH'.")
 
+    def __getstate__(self):
+        return (self.id, self.meal, self.cuisine, self.price, self.difficulty)
+
+    def __setstate__(self, state):
+        # copy and pickle restore through here, since the frozen __setattr__ refuses them
+        _hydrate_meal(self, state)
+
+
+# Slot setters that skip the frozen __setattr__, for building meals from trusted rows
+_set_id, _set_meal, _set_cuisine, _set_price, _set_difficulty = (Meal.__dict__[name].__set__ for name in Meal.__slots__)
+_new_meal = object.__new__
 
+def _hydrate_meal(meal: Meal, row: tuple) -> Meal:
+    _set_id(meal, row[0])
+    _set_meal(meal, row[1])
+    _set_cuisine(meal, row[2])
+    _set_price(meal, row[3])
+    _set_difficulty(meal, row[4])
+    return meal
+
+def meal_from_row(row: tuple) -> Meal:
+    '''
+    Builds a meal from a database row without validating it again. Meals
+    are validated when they are created or imported, and the table's CHECK
+    constraint holds the difficulty, so this is only for rows read back from
+    the meals table; everything else goes through Meal() and its validation.
+
+    Args:
+        row: a row starting with id, meal, cuisine, price, difficulty
+
+    Returns:
+        Meal: the meal in the row
+    '''
+    return _hydrate_meal(_new_meal(Meal), row)
+
+def meal_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Meal:
+    '''
+    A sqlite3 row factory that turns each row of a "SELECT id, meal, cuisine,
+    price, difficulty ..." query straight into a meal, e.g.
+    cursor.row_factory = meal_row_factory.
+
+    Args:
+        cursor: the cursor the row was read from
+        row: the row
+
+    Returns:
+        Meal: the meal in the row
+    '''
+    return _hydrate_meal(_new_meal(Meal), row)
+
+
+@timed("query_duration_seconds")
 def create_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
     """
     This function adds a meal if the meal meets all the conditions 
@@ -71,14 +168,21 @@ def create_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            before = read_meal_changes(cursor)
             cursor.execute("""
                 INSERT INTO meals (meal, cuisine, price, difficulty)
                 VALUES (?, ?, ?, ?)
             """, (meal, cuisine, price, difficulty))
+            after = read_meal_changes(cursor)
             conn.commit()
 
             logger.info("Meal successfully added to the database: %s", meal)
 
+        # A new meal has no battles yet, so the leaderboard itself is unchanged
+        _leaderboard.apply(before, after)
+        _meal_cache.apply(before, after, keys=[("name", meal)])
+
     except sqlite3.IntegrityError:
         logger.error("Duplicate meal name: %s", meal)
         raise ValueError(f"Meal with name '{meal}' already exists")
@@ -87,6 +191,126 @@ def create_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
         logger.error("Database error: %s", str(e))
         raise e
 
+@timed("query_duration_seconds")
+def import_meals(records: Iterable[Tuple[int, Union[dict, ValueError]]], chunk_size: int = IMPORT_CHUNK_SIZE) -> dict[str, Any]:
+    '''
+    Bulk loads meals from a stream of records. The records are validated one by one
+    with the same rules as create_meal and written in chunks, each chunk with one
+    executemany and one commit. Invalid rows and duplicate names are reported
+    per row and skipped, so they never abort the rest of the import. Only one
+    chunk is held in memory at a time.
+
+    Args:
+        records: (record number, record) pairs, where a record is a dict with meal,
+            cuisine, price and difficulty, or a ValueError if it could not be parsed
+        chunk_size: how many rows to write per transaction
+
+    Return:
+        dict[str,Any]: how many meals were imported and failed, and the per-row errors
+
+    Raises:
+        sqlite3.Error: If there is database errors; chunks already written stay committed
+    '''
+    summary = {'imported': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+    chunk = []
+    try:
+        for row_number, record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                chunk.append((row_number, _parse_import_record(record)))
+            except ValueError as e:
+                _add_import_error(summary, row_number, str(e))
+            if len(chunk) >= chunk_size:
+                _insert_import_chunk(chunk, summary)
+                chunk = []
+        if chunk:
+            _insert_import_chunk(chunk, summary)
+
+    except sqlite3.Error as e:
+        logger.error("Database error during import after %d meals: %s", summary['imported'], str(e))
+        raise e
+
+    # Duplicates are only found when their chunk is written, so put the errors back in row order
+    summary['errors'].sort(key=lambda error: error['row'])
+    logger.info("Imported %d meals, %d rows failed", summary['imported'], summary['failed'])
+    return summary
+
+def _parse_import_record(record: dict) -> tuple:
+    meal = record.get('meal')
+    cuisine = record.get('cuisine')
+    price = record.get('price')
+    difficulty = record.get('difficulty')
+
+    if not isinstance(meal, str) or not meal.strip():
+        raise ValueError("Invalid meal: a non-empty name is required.")
+    if not isinstance(cuisine, str) or not cuisine.strip():
+        raise ValueError("Invalid cuisine: a non-empty cuisine is required.")
+    try:
+        if isinstance(price, bool):
+            raise ValueError
+        price = float(price)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid price: {price}. Price must be a positive number.")
+    if not price > 0:
+        raise ValueError(f"Invalid price: {price}. Price must be a positive number.")
+    if round(price, 2) != price:
+        raise ValueError(f"Invalid price: {price}. Price must have at most two decimal places.")
+    if difficulty not in ['LOW', 'MED', 'HIGH']:
+        raise ValueError(f"Invalid difficulty level: {difficulty}. Must be 'LOW', 'MED', or 'HIGH'.")
+    return meal, cuisine, price, difficulty
+
+def _add_import_error(summary: dict, row_number: int, error: str) -> None:
+    summary['failed'] += 1
+    if len(summary['errors']) < IMPORT_MAX_ERRORS:
+        summary['errors'].append({'row': row_number, 'error': error})
+    else:
+        summary['errors_truncated'] = True
+
+def _insert_import_chunk(chunk: list, summary: dict) -> None:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        before = read_meal_changes(cursor)
+        names = [values[0] for _, values in chunk]
+        taken = set()
+        for i in range(0, len(names), SQL_IN_CHUNK_SIZE):
+            part = names[i:i + SQL_IN_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(part))
+            cursor.execute(f"SELECT meal FROM meals WHERE meal IN ({placeholders})", part)
+            taken.update(row[0] for row in cursor.fetchall())
+
+        pending = []
+        for row_number, values in chunk:
+            if values[0] in taken:
+                _add_import_error(summary, row_number, f"Meal with name '{values[0]}' already exists")
+            else:
+                taken.add(values[0])
+                pending.append((row_number, values))
+
+        insert = "INSERT INTO meals (meal, cuisine, price, difficulty) VALUES (?, ?, ?, ?)"
+        try:
+            cursor.executemany(insert, [values for _, values in pending])
+            summary['imported'] += len(pending)
+        except sqlite3.IntegrityError:
+            # Should a name clash despite the check, find it row by row
+            conn.rollback()
+            cursor.execute("BEGIN IMMEDIATE")
+            before = read_meal_changes(cursor)
+            for row_number, values in pending:
+                try:
+                    cursor.execute(insert, values)
+                    summary['imported'] += 1
+                except sqlite3.IntegrityError:
+                    _add_import_error(summary, row_number, f"Meal with name '{values[0]}' already exists")
+        after = read_meal_changes(cursor)
+        conn.commit()
+
+    # New meals have no battles yet, so the leaderboard itself is unchanged
+    _leaderboard.apply(before, after)
+    _meal_cache.apply(before, after, keys=[("name", values[0]) for _, values in pending])
+
+@timed("query_duration_seconds")
 def clear_meals() -> None:
     """
     Recreates the meals table, effectively deleting all meals.
@@ -101,13 +325,20 @@ def clear_meals() -> None:
             cursor = conn.cursor()
             cursor.executescript(create_table_script)
             conn.commit()
+            # Pending stats belong to meals that no longer exist
+            _stat_counters.discard()
 
             logger.info("Meals cleared successfully.")
 
+        # The script commits statement by statement, so there is no single write to apply
+        _leaderboard.invalidate()
+        _meal_cache.apply(None, None, cleared=True)
+
     except sqlite3.Error as e:
         logger.error("Database error while clearing meals: %s", str(e))
         raise e
 
+@timed("query_duration_seconds")
 def delete_meal(meal_id: int) -> None:
     '''
     Checks the database for the meal_id. Then see if the meal has been deleted 
@@ -124,6 +355,8 @@ def delete_meal(meal_id: int) -> None:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            before = read_meal_changes(cursor)
             cursor.execute("SELECT deleted FROM meals WHERE id = ?", (meal_id,))
             try:
                 deleted = cursor.fetchone()[0]
@@ -135,45 +368,80 @@ def delete_meal(meal_id: int) -> None:
                 raise ValueError(f"Meal with ID {meal_id} not found")
 
             cursor.execute("UPDATE meals SET deleted = TRUE WHERE id = ?", (meal_id,))
+            after = read_meal_changes(cursor)
             conn.commit()
 
             logger.info("Meal with ID %s marked as deleted.", meal_id)
 
+        _leaderboard.apply(before, after, removed=[meal_id])
+        cached = _meal_cache.peek(("id", meal_id))
+        _meal_cache.apply(before, after, keys=[("id", meal_id)] + ([("name", cached.meal)] if cached else []))
+
     except sqlite3.Error as e:
         logger.error("Database error: %s", str(e))
         raise e
 
-def get_leaderboard(sort_by: str="wins") -> dict[str, Any]:
+@timed("query_duration_seconds")
+def get_leaderboard(sort_by: str="wins", limit: Optional[int]=None, offset: int=0,
+                    after: Optional[Tuple[float, int]]=None) -> dict[str, Any]:
     '''
     Gets the data of the meal (datas like wins and win percentage). 
     Then makes a leaderboard for the meals that have more than 0 battles and isn't deleted
-    into a leaderboard sorted by wins or win percentage
+    into a leaderboard sorted by wins, win percentage or Elo rating. Pages are served from the
+    in-process leaderboard cache, which is rebuilt when the database changes behind it.
+    Stats not written yet in write-behind mode are added in, but the order is that of the
+    written stats until they are flushed.
 
     Args:
-        sorted_by: what it is sorted by
+        sort_by: what it is sorted by, one of SORT_KEYS ('wins', 'win_pct' or 'rating')
+        limit: how many meals to return, or None for all of them
+        offset: how many of the leading meals to skip
+        after: keyset cursor; start after the meal with this (wins, win ratio or rating, id),
+            as returned by leaderboard_cursor
 
     Return:
         dict[str,Any]: a list of the leaderboard with the data (id,cuisine,and etc)of the meals
 
     Raises:
+        ValueError: If sort_by, limit or offset is invalid
         sqlite3.Error: If there is database errors'''
+    if sort_by not in SORT_KEYS:
+        logger.error("Invalid sort_by parameter: %s", sort_by)
+        raise ValueError("Invalid sort_by parameter: %s" % sort_by)
+    if limit is not None and limit < 0:
+        raise ValueError(f"Invalid limit: {limit}. Must be zero or more.")
+    if offset < 0:
+        raise ValueError(f"Invalid offset: {offset}. Must be zero or more.")
+
+    version = get_meal_changes()
+    if version is not None:
+        leaderboard = _leaderboard.get(sort_by, limit, offset, version, after)
+        if leaderboard is None:
+            _leaderboard.rebuild(_fetch_live_leaderboard_rows(), version)
+            leaderboard = _leaderboard.page(sort_by, limit, offset, after)
+        logger.info("Leaderboard retrieved successfully")
+        return _merge_pending_stats(leaderboard)
+
+    # Without a meal change count changes cannot be detected, so read straight from the table
+    # Spelled exactly like the WHERE clause of the partial leaderboard indexes so they can be used
     query = """
-        SELECT id, meal, cuisine, price, difficulty, battles, wins, (wins * 1.0 / battles) AS win_pct
-        FROM meals WHERE deleted = false AND battles > 0
+        SELECT id, meal, cuisine, price, difficulty, battles, wins, win_pct, rating
+        FROM meals WHERE deleted = FALSE AND battles > 0
     """
+    params = []
 
-    if sort_by == "win_pct":
-        query += " ORDER BY win_pct DESC"
-    elif sort_by == "wins":
-        query += " ORDER BY wins DESC"
-    else:
-        logger.error("Invalid sort_by parameter: %s", sort_by)
-        raise ValueError("Invalid sort_by parameter: %s" % sort_by)
+    # The sort column is one of three fixed names, never user input
+    if after is not None:
+        # The leading "<=" lets SQLite seek into the index instead of walking it from the top
+        query += f" AND {sort_by} <= ? AND ({sort_by} < ? OR id > ?)"
+        params += [after[0], after[0], after[1]]
+    query += f" ORDER BY {sort_by} DESC, id LIMIT ? OFFSET ?"
+    params += [-1 if limit is None else limit, offset]
 
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query)
+            cursor.execute(query, params)
             rows = cursor.fetchall()
 
         leaderboard = []
@@ -186,17 +454,213 @@ def get_leaderboard(sort_by: str="wins") -> dict[str, Any]:
                 'difficulty': row[4],
                 'battles': row[5],
                 'wins': row[6],
-                'win_pct': round(row[7] * 100, 1)  # Convert to percentage
+                'win_pct': round(row[7] * 100, 1),  # Convert to percentage
+                'rating': row[8]
             }
             leaderboard.append(meal)
 
         logger.info("Leaderboard retrieved successfully")
-        return leaderboard
+        return _merge_pending_stats(leaderboard)
 
     except sqlite3.Error as e:
         logger.error("Database error: %s", str(e))
         raise e
 
+def iter_leaderboard(sort_by: str="wins", after: Optional[Tuple[float, int]]=None, limit: Optional[int]=None,
+                     offset: int=0, batch_size: int=LEADERBOARD_STREAM_BATCH_SIZE) -> Iterator[dict[str, Any]]:
+    '''
+    Yields the leaderboard one meal at a time, for streaming responses.
+    Meals are fetched in keyset pages of batch_size, so memory use and the time to
+    the first meal stay the same however many meals there are, and no pooled
+    connection is held while a slow client reads.
+
+    Args:
+        sort_by: what it is sorted by
+        after: keyset cursor to start after, as returned by leaderboard_cursor
+        limit: how many meals to yield, or None for all of them
+        offset: how many of the leading meals to skip
+        batch_size: how many meals to fetch per page
+
+    Yields:
+        dict[str,Any]: the leaderboard entries in order
+
+    Raises:
+        ValueError: If sort_by, limit or offset is invalid
+        sqlite3.Error: If there is database errors'''
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        page = get_leaderboard(sort_by, size, offset, after)
+        yield from page
+        if len(page) < size:
+            return
+        if remaining is not None:
+            remaining -= len(page)
+        # The offset only applies to the first page; the cursor carries on from there
+        offset = 0
+        after = leaderboard_cursor(sort_by, page[-1])
+
+def leaderboard_cursor(sort_by: str, entry: dict[str, Any]) -> Tuple[float, int]:
+    '''
+    Gets the keyset cursor that continues the leaderboard after the given entry.
+    The unrounded win ratio is used so no meal is skipped or repeated.
+
+    Args:
+        sort_by: what the leaderboard is sorted by
+        entry: a leaderboard entry
+
+    Return:
+        Tuple[float,int]: the sort value and id of the entry
+    '''
+    if sort_by == "win_pct":
+        return entry['wins'] * 1.0 / entry['battles'], entry['id']
+    if sort_by == "rating":
+        return entry['rating'], entry['id']
+    return entry['wins'], entry['id']
+
+def format_leaderboard_cursor(cursor: Tuple[float, int]) -> str:
+    '''
+    Turns a keyset cursor into the "value,id" form used in URLs.
+
+    Args:
+        cursor: the sort value and id
+
+    Return:
+        str: the cursor text
+    '''
+    return f"{cursor[0]!r},{cursor[1]}"
+
+def parse_leaderboard_cursor(sort_by: str, text: str) -> Tuple[float, int]:
+    '''
+    Parses a "value,id" cursor such as "12,7" for wins, "0.75,7" for win_pct or "1516.0,7" for rating.
+
+    Args:
+        sort_by: what the leaderboard is sorted by
+        text: the cursor text
+
+    Return:
+        Tuple[float,int]: the sort value and id
+
+    Raises:
+        ValueError: If the cursor is malformed'''
+    try:
+        value, meal_id = text.split(",")
+        return (int(value) if sort_by == "wins" else float(value)), int(meal_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {text}. Expected '<{sort_by}>,<id>'.")
+
+@timed("query_duration_seconds")
+def get_group_leaderboard(group_by: str, sort_by: str="wins") -> list[dict[str, Any]]:
+    '''
+    Gets the leaderboard of cuisines or difficulty levels. Each group has the meals,
+    total battles and wins, win percentage and mean Elo rating of its live meals with
+    at least one battle, and its top meal by the same sort key. The groups are rolled
+    up in the leaderboard cache as meals change, so reading them does not depend on
+    how many meals there are. Stats not written yet in write-behind mode are left out
+    until they are flushed.
+
+    Args:
+        group_by: 'cuisine' or 'difficulty'
+        sort_by: what the groups and their top meals are sorted by, like get_leaderboard
+
+    Return:
+        list[dict[str,Any]]: the groups in order, each with its top meal
+
+    Raises:
+        ValueError: If group_by or sort_by is invalid
+        sqlite3.Error: If there is database errors'''
+    if group_by not in GROUP_COLUMNS:
+        logger.error("Invalid group_by parameter: %s", group_by)
+        raise ValueError("Invalid group_by parameter: %s" % group_by)
+    if sort_by not in SORT_KEYS:
+        logger.error("Invalid sort_by parameter: %s", sort_by)
+        raise ValueError("Invalid sort_by parameter: %s" % sort_by)
+
+    version = get_meal_changes()
+    if version is None:
+        # Without a meal change count the cache cannot be trusted, so roll up a fresh read of the table
+        board = LeaderboardCache()
+        board.rebuild(_fetch_live_leaderboard_rows(), 0)
+        groups = board.groups(group_by, sort_by)
+    else:
+        groups = _leaderboard.get_groups(group_by, sort_by, version)
+        if groups is None:
+            _leaderboard.rebuild(_fetch_live_leaderboard_rows(), version)
+            groups = _leaderboard.groups(group_by, sort_by)
+    logger.info("Leaderboard by %s retrieved successfully", group_by)
+    return groups
+
+@timed("query_duration_seconds")
+def rebuild_leaderboard_cache() -> bool:
+    '''
+    Builds the leaderboard cache from the database, e.g. when the service starts.
+
+    Return:
+        bool: whether the cache was built; False if the database is not available
+    '''
+    version = get_meal_changes()
+    if version is None:
+        return False
+    try:
+        _leaderboard.rebuild(_fetch_live_leaderboard_rows(), version)
+    except sqlite3.Error as e:
+        logger.warning("Could not build the leaderboard cache: %s", str(e))
+        return False
+    return True
+
+def get_leaderboard_cache_stats() -> dict[str, Any]:
+    '''
+    Gets the hit, miss and rebuild counters of the leaderboard cache.
+
+    Return:
+        dict[str,Any]: the cache statistics
+    '''
+    return _leaderboard.stats()
+
+def get_meals_version() -> Optional[Tuple[int, int]]:
+    '''
+    Gets a token that changes whenever meals or their stats may have changed, e.g. for
+    HTTP ETags. Stats queued in write-behind mode are counted too, since reads add
+    them in before they are written.
+
+    Return:
+        Tuple[int,int] or None: the meal change count and the number of queued stats ever,
+            or None if the database cannot be opened
+    '''
+    version = get_meal_changes()
+    if version is None:
+        return None
+    return version, _stat_counters.stats()["events"]
+
+def get_meal_cache_stats() -> dict[str, Any]:
+    '''
+    Gets the hit, miss and eviction counters of the meal lookup cache.
+
+    Return:
+        dict[str,Any]: the cache statistics
+    '''
+    return _meal_cache.stats()
+
+def _fetch_live_leaderboard_rows() -> list[tuple]:
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {LEADERBOARD_COLUMNS} FROM meals WHERE deleted = FALSE AND battles > 0")
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+def _fetch_leaderboard_rows(cursor: sqlite3.Cursor, meal_ids: list[int]) -> list[tuple]:
+    rows = []
+    for i in range(0, len(meal_ids), SQL_IN_CHUNK_SIZE):
+        chunk = meal_ids[i:i + SQL_IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(f"SELECT {LEADERBOARD_COLUMNS} FROM meals WHERE id IN ({placeholders})", chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+@timed("query_duration_seconds")
 def get_meal_by_id(meal_id: int) -> Meal:
     '''
     Gets the meal from the database by the meal_id. Retrieves the data of the meal and
@@ -212,6 +676,12 @@ def get_meal_by_id(meal_id: int) -> Meal:
         ValueError: if the meal has been deleted or the id don't exist
         sqlite3.Error: If there is database errors
     '''
+    version = get_meal_changes()
+    if version is not None:
+        meal = _meal_cache.get(("id", meal_id), version)
+        if meal is not None:
+            return meal
+
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -222,7 +692,10 @@ def get_meal_by_id(meal_id: int) -> Meal:
                 if row[5]:
                     logger.info("Meal with ID %s has been deleted", meal_id)
                     raise ValueError(f"Meal with ID {meal_id} has been deleted")
-                return Meal(id=row[0], meal=row[1], cuisine=row[2], price=row[3], difficulty=row[4])
+                meal = meal_from_row(row)
+                if version is not None:
+                    _meal_cache.put([("id", meal.id), ("name", meal.meal)], meal, version)
+                return meal
             else:
                 logger.info("Meal with ID %s not found", meal_id)
                 raise ValueError(f"Meal with ID {meal_id} not found")
@@ -232,6 +705,7 @@ def get_meal_by_id(meal_id: int) -> Meal:
         raise e
 
 
+@timed("query_duration_seconds")
 def get_meal_by_name(meal_name: str) -> Meal:
     '''
     Gets the meal from the database by the meal name. By searching the database for the name 
@@ -247,6 +721,12 @@ def get_meal_by_name(meal_name: str) -> Meal:
         ValueError: if the meal has been deleted or the id don't exist
         sqlite3.Error: If there is database errors
     '''
+    version = get_meal_changes()
+    if version is not None:
+        meal = _meal_cache.get(("name", meal_name), version)
+        if meal is not None:
+            return meal
+
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -257,7 +737,10 @@ def get_meal_by_name(meal_name: str) -> Meal:
                 if row[5]:
                     logger.info("Meal with name %s has been deleted", meal_name)
                     raise ValueError(f"Meal with name {meal_name} has been deleted")
-                return Meal(id=row[0], meal=row[1], cuisine=row[2], price=row[3], difficulty=row[4])
+                meal = meal_from_row(row)
+                if version is not None:
+                    _meal_cache.put([("id", meal.id), ("name", meal.meal)], meal, version)
+                return meal
             else:
                 logger.info("Meal with name %s not found", meal_name)
                 raise ValueError(f"Meal with name {meal_name} not found")
@@ -267,6 +750,7 @@ def get_meal_by_name(meal_name: str) -> Meal:
         raise e
 
 
+@timed("query_duration_seconds")
 def update_meal_stats(meal_id: int, result: str) -> None:
     '''
     Updates the meal stats based on the meal id and result. Increments the count to
@@ -276,13 +760,25 @@ def update_meal_stats(meal_id: int, result: str) -> None:
         meal_id: integer value of the meal id 
         result: result of the battle
 
+    In write-behind mode the meal is checked through the meal cache and the
+    increment is only queued, to be written with others by flush_meal_stats.
+
     Raises:
         ValueError: if the meal has been deleted or the id don't exist
         sqlite3.Error: If there is database errors
     '''
+    if STATS_WRITE_BEHIND:
+        get_meal_by_id(meal_id)
+        if result not in ('win', 'loss'):
+            raise ValueError(f"Invalid result: {result}. Expected 'win' or 'loss'.")
+        _stat_counters.add(meal_id, 1, 1 if result == 'win' else 0, 0.0)
+        return
+
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            before = read_meal_changes(cursor)
             cursor.execute("SELECT deleted FROM meals WHERE id = ?", (meal_id,))
             try:
                 deleted = cursor.fetchone()[0]
@@ -300,8 +796,367 @@ def update_meal_stats(meal_id: int, result: str) -> None:
             else:
                 raise ValueError(f"Invalid result: {result}. Expected 'win' or 'loss'.")
 
+            rows = _fetch_leaderboard_rows(cursor, [meal_id])
+            after = read_meal_changes(cursor)
             conn.commit()
 
+        # Battle stats are not part of Meal, so cached meals stay valid
+        _leaderboard.apply(before, after, rows=rows)
+        _meal_cache.apply(before, after)
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+def _write_meal_stats(deltas: dict[int, list[float]]) -> None:
+    '''
+    Writes queued battle, win and rating increments in one transaction and updates
+    the leaderboard cache with the new totals.
+
+    Args:
+        deltas: [battles, wins, rating change] increments by meal id
+    '''
+    meal_ids = list(deltas)
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            before = read_meal_changes(cursor)
+            cursor.executemany("UPDATE meals SET battles = battles + ?, wins = wins + ?, rating = rating + ? WHERE id = ?",
+                               [(battles, wins, rating, meal_id) for meal_id, (battles, wins, rating) in deltas.items()])
+            rows = _fetch_leaderboard_rows(cursor, meal_ids)
+            after = read_meal_changes(cursor)
+            conn.commit()
+
+        _leaderboard.apply(before, after, rows=rows)
+        _meal_cache.apply(before, after)
+        logger.info("Wrote queued stats of %d meals", len(meal_ids))
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+# Battle, win and rating increments queued by settle_battles and update_meal_stats in write-behind mode
+_stat_counters = WriteBehindCounters(_write_meal_stats, 3, STATS_FLUSH_INTERVAL_MS / 1000, STATS_FLUSH_MAX_EVENTS)
+
+# Write out queued stats when the process exits
+atexit.register(lambda: _stat_counters.close())
+
+def _merge_pending_stats(leaderboard: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    '''
+    Adds stats queued in write-behind mode to leaderboard entries, which are copies.
+    '''
+    pending = _stat_counters.snapshot()
+    if not pending:
+        return leaderboard
+    for meal in leaderboard:
+        if meal['id'] in pending:
+            battles, wins, rating = pending[meal['id']]
+            meal['battles'] += battles
+            meal['wins'] += wins
+            meal['rating'] += rating
+            meal['win_pct'] = round(meal['wins'] * 1.0 / meal['battles'] * 100, 1)
+    return leaderboard
+
+def flush_meal_stats() -> int:
+    '''
+    Writes every stat increment queued in write-behind mode now.
+
+    Return:
+        int: how many queued increments were written, one per meal per settlement or update_meal_stats call
+    '''
+    return _stat_counters.flush()
+
+def get_meal_stats_counter_stats() -> dict[str, Any]:
+    '''
+    Gets the pending, written and failed counters of write-behind stats.
+
+    Return:
+        dict[str,Any]: the write-behind statistics
+    '''
+    stats = _stat_counters.stats()
+    stats["enabled"] = STATS_WRITE_BEHIND
+    return stats
+
+@timed("query_duration_seconds")
+def get_meals_by_ids(meal_ids: list[int]) -> list[Meal]:
+    '''
+    Gets several meals from the database in one query, in the order of meal_ids.
+    Raises an error if any of them has been deleted or doesn't exist.
+
+    Args:
+        meal_ids: list of integer meal ids
+
+    Return:
+        list[Meal]: the meals in the same order as meal_ids
+
+    Raises:
+        ValueError: if a meal has been deleted or the id don't exist
+        sqlite3.Error: If there is database errors
+    '''
+    unique_ids = list(dict.fromkeys(meal_ids))
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            rows = []
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(unique_ids), SQL_IN_CHUNK_SIZE):
+                chunk = unique_ids[i:i + SQL_IN_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT id, meal, cuisine, price, difficulty, deleted FROM meals WHERE id IN ({placeholders})", chunk)
+                rows.extend(cursor.fetchall())
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+    rows_by_id = {row[0]: row for row in rows}
+    meals = {}
+    for meal_id in unique_ids:
+        row = rows_by_id.get(meal_id)
+        if row is None:
+            logger.info("Meal with ID %s not found", meal_id)
+            raise ValueError(f"Meal with ID {meal_id} not found")
+        if row[5]:
+            logger.info("Meal with ID %s has been deleted", meal_id)
+            raise ValueError(f"Meal with ID {meal_id} has been deleted")
+        meals[meal_id] = meal_from_row(row)
+
+    logger.info("Retrieved %d meals by id", len(meals))
+    return [meals[meal_id] for meal_id in meal_ids]
+
+
+@timed("query_duration_seconds")
+def search_meals(query: str, limit: int=20, offset: int=0, prefix: bool=False) -> list[Meal]:
+    '''
+    Searches the names and cuisines of live meals with the full-text index. Every word
+    of the query has to match. Meals whose names hold more of the words come first, then
+    those with shorter names, the closest matches; only the first SEARCH_RANK_WINDOW
+    matches by id are ranked, so a query matching most meals stays fast. In prefix mode,
+    for autocomplete, the last word only has to start a word and meals come in id order,
+    so a short prefix that matches many meals still stops after one page.
+
+    Args:
+        query: the words to search for; anything but letters and digits separates words
+        limit: how many meals to return
+        offset: how many of the leading matches to skip
+        prefix: whether the last word is a prefix
+
+    Return:
+        list[Meal]: the matching meals
+
+    Raises:
+        ValueError: If the query has no words, or limit or offset is negative
+        sqlite3.Error: If there is database errors'''
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        raise ValueError("Search query must contain at least one word.")
+    if limit < 0:
+        raise ValueError(f"Invalid limit: {limit}. Must be zero or more.")
+    if offset < 0:
+        raise ValueError(f"Invalid offset: {offset}. Must be zero or more.")
+
+    # Every word is quoted so FTS5 syntax typed by users is searched for as text
+    match = " ".join(f'"{word}"' for word in words) + ("*" if prefix else "")
+    # The FTS5 table yields matches in id order by itself, so LIMIT stops the search early
+    page = (limit, offset) if prefix else (SEARCH_RANK_WINDOW, 0)
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = meal_row_factory
+            cursor.execute("""
+                SELECT m.id, m.meal, m.cuisine, m.price, m.difficulty
+                FROM meals_fts f JOIN meals m ON m.id = f.rowid
+                WHERE meals_fts MATCH ? AND m.deleted = FALSE
+                ORDER BY f.rowid LIMIT ? OFFSET ?
+            """, (match, *page))
+            meals = cursor.fetchall()
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+    if not prefix:
+        meals = sorted(meals, key=lambda meal: _search_rank(meal, words))[offset:offset + limit]
+    logger.info("Found %d meals matching %r", len(meals), query)
+    return meals
+
+def _search_rank(meal: Meal, words: list[str]) -> Tuple[int, int, int]:
+    name_words = re.findall(r"\w+", meal.meal.lower())
+    return -sum(word in name_words for word in words), len(name_words), meal.id
+
+@timed("query_duration_seconds")
+def settle_battle(winner_id: int, loser_id: int, claim: Optional[Callable[[sqlite3.Cursor], None]]=None) -> None:
+    '''
+    Records the result of a battle in a single transaction. Both combatants are
+    validated first, then the winner gets a battle and a win and the loser gets
+    a battle, so either both stats are recorded or neither is.
+
+    Args:
+        winner_id: integer value of the winning meal id
+        loser_id: integer value of the losing meal id
+        claim: optional write to make in the same transaction, as for settle_battles
+
+    Raises:
+        ValueError: if either meal has been deleted or the id don't exist
+        sqlite3.Error: If there is database errors
+    '''
+    settle_battles([(winner_id, loser_id)], claim)
+
+
+@timed("query_duration_seconds")
+def settle_battles(results: list[tuple[int, int]], claim: Optional[Callable[[sqlite3.Cursor], None]]=None) -> None:
+    '''
+    Records the results of many battles in a single transaction. Every combatant
+    is validated first, then the battle and win counts are added up per meal,
+    the Elo ratings are updated battle by battle in order, and both are written
+    with one UPDATE per meal, so either all results are recorded or none.
+    In write-behind mode the increments are queued instead; see _queue_battles.
+
+    Args:
+        results: list of (winner_id, loser_id) pairs in the order they were fought
+        claim: optional write to make in the same transaction once the meals are validated,
+            e.g. taking the battles from an arena; if it raises, no result is recorded
+
+    Raises:
+        ValueError: if any meal has been deleted or the id don't exist
+        sqlite3.Error: If there is database errors
+    '''
+    battles = {}
+    wins = {}
+    for winner_id, loser_id in results:
+        battles[winner_id] = battles.get(winner_id, 0) + 1
+        battles[loser_id] = battles.get(loser_id, 0) + 1
+        wins[winner_id] = wins.get(winner_id, 0) + 1
+    meal_ids = list(battles)
+
+    if STATS_WRITE_BEHIND:
+        _queue_battles(results, battles, wins, claim)
+        return
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # Take the write lock before reading the ratings, so no other settlement can rate from the same ones
+            cursor.execute("BEGIN IMMEDIATE")
+            before = read_meal_changes(cursor)
+            ratings = _read_combatant_ratings(cursor, meal_ids)
+
+            if claim is not None:
+                claim(cursor)
+            rate_battles(ratings, results)
+            cursor.executemany(
+                "UPDATE meals SET battles = battles + ?, wins = wins + ?, rating = ? WHERE id = ?",
+                [(battles[meal_id], wins.get(meal_id, 0), ratings[meal_id], meal_id) for meal_id in meal_ids]
+            )
+            # Read the new totals inside the write transaction so no other write can slip in
+            rows = _fetch_leaderboard_rows(cursor, meal_ids)
+            after = read_meal_changes(cursor)
+            conn.commit()
+
+            logger.info("Settled %d battles across %d meals", len(results), len(meal_ids))
+
+        # Battle stats are not part of Meal, so cached meals stay valid
+        _leaderboard.apply(before, after, rows=rows)
+        _meal_cache.apply(before, after)
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+def _queue_battles(results: list[tuple[int, int]], battles: dict[int, int], wins: dict[int, int],
+                   claim: Optional[Callable[[sqlite3.Cursor], None]]) -> None:
+    '''
+    The write-behind half of settle_battles. Flushes are held off while the
+    combatants are validated and rated, so their ratings are the written ones plus
+    the queued changes, and the battle, win and rating increments are then queued.
+    A claim is committed first, so a queued result is never left unclaimed.
+    Settlements in other processes are not serialized with these ones, so two
+    processes may rate a meal from the same rating until their stats are flushed.
+    '''
+    meal_ids = list(battles)
+    with _stat_counters.holding_flushes():
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                if claim is not None:
+                    cursor.execute("BEGIN IMMEDIATE")
+                ratings = _read_combatant_ratings(cursor, meal_ids)
+                if claim is not None:
+                    claim(cursor)
+                    conn.commit()
+
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", str(e))
+            raise e
+
+        for meal_id in meal_ids:
+            pending = _stat_counters.pending(meal_id)
+            if pending is not None:
+                ratings[meal_id] += pending[2]
+        start = dict(ratings)
+        rate_battles(ratings, results)
+        for meal_id in meal_ids:
+            _stat_counters.add(meal_id, battles[meal_id], wins.get(meal_id, 0), ratings[meal_id] - start[meal_id])
+    logger.info("Queued %d battles across %d meals", len(results), len(meal_ids))
+
+def _read_combatant_ratings(cursor: sqlite3.Cursor, meal_ids: list[int]) -> dict[int, float]:
+    '''
+    Reads the written ratings of battle combatants, raising ValueError if any of
+    them has been deleted or doesn't exist.
+    '''
+    deleted_by_id = {}
+    ratings = {}
+    for i in range(0, len(meal_ids), SQL_IN_CHUNK_SIZE):
+        chunk = meal_ids[i:i + SQL_IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(f"SELECT id, deleted, rating FROM meals WHERE id IN ({placeholders})", chunk)
+        for meal_id, deleted, rating in cursor.fetchall():
+            deleted_by_id[meal_id] = deleted
+            ratings[meal_id] = rating
+
+    for meal_id in meal_ids:
+        if meal_id not in deleted_by_id:
+            logger.info("Meal with ID %s not found", meal_id)
+            raise ValueError(f"Meal with ID {meal_id} not found")
+        if deleted_by_id[meal_id]:
+            logger.info("Meal with ID %s has been deleted", meal_id)
+            raise ValueError(f"Meal with ID {meal_id} has been deleted")
+    return ratings
+
+@timed("query_duration_seconds")
+def recompute_ratings(results: Iterable[Tuple[int, int]]) -> int:
+    '''
+    Recomputes every meal's Elo rating from scratch by replaying battle results,
+    e.g. after changing the K-factor. Meals that are not in the results go back
+    to the initial rating. All ratings are written in a single transaction.
+
+    Args:
+        results: (winner_id, loser_id) pairs of every battle, in the order they were fought
+
+    Return:
+        int: how many meals got a rating other than the initial one
+
+    Raises:
+        sqlite3.Error: If there is database errors
+    '''
+    ratings = replay_ratings(results)
+    # Queued rating changes were made from the old ratings, so write them before replacing those
+    _stat_counters.flush()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE meals SET rating = ? WHERE rating != ?", (INITIAL_RATING, INITIAL_RATING))
+            cursor.executemany("UPDATE meals SET rating = ? WHERE id = ?",
+                               [(rating, meal_id) for meal_id, rating in ratings.items()])
+            conn.commit()
+
+        logger.info("Recomputed the ratings of %d meals", len(ratings))
+
+        # Every rating may have moved, so rebuild the leaderboard instead of patching it
+        _leaderboard.invalidate()
+        return len(ratings)
+
     except sqlite3.Error as e:
         logger.error("Database error: %s", str(e))
         raise e
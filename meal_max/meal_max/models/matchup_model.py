@@ -0,0 +1,274 @@
+from dataclasses import dataclass
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, List
+
+import numpy as np
+
+from meal_max.utils.sql_utils import get_db_connection
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Same modifiers as BattleModel.get_battle_score
+DIFFICULTY_MODIFIER = {"HIGH": 1, "MED": 2, "LOW": 3}
+
+# Every value a battle can draw: random.org two-decimal fractions, or the same grid locally
+RANDOM_GRID = np.arange(100) / 100
+
+# Upper bound on the scratch arrays used while scanning the pairwise matrix
+MATCHUP_MEMORY_BUDGET_MB = int(os.getenv("MATCHUP_MEMORY_BUDGET_MB", "64"))
+
+# Virtual battles simulated per vectorized batch
+SIMULATION_BATCH_SIZE = 100_000
+
+# Largest subset whose full pairwise matrix is returned
+MAX_MATRIX_MEALS = 100
+
+
+@dataclass
+class MealArrays:
+    '''
+    Every non-deleted meal laid out as parallel NumPy arrays.
+
+    Attributes:
+        ids: meal ids, in ascending order
+        names: meal names
+        scores: battle scores, as BattleModel.get_battle_score computes them
+    '''
+    ids: np.ndarray
+    names: List[str]
+    scores: np.ndarray
+
+
+def battle_scores(prices: np.ndarray, cuisine_lengths: np.ndarray, modifiers: np.ndarray) -> np.ndarray:
+    '''
+    Computes the battle score of many meals at once.
+
+    Args:
+        prices: the meal prices
+        cuisine_lengths: the length of each meal's cuisine name
+        modifiers: the difficulty modifier of each meal
+
+    Return:
+        np.ndarray: the battle scores
+    '''
+    return prices * cuisine_lengths - modifiers
+
+
+def load_meal_arrays() -> MealArrays:
+    '''
+    Loads every non-deleted meal with one query and scores them.
+
+    Return:
+        MealArrays: the ids, names and battle scores of the meals
+
+    Raises:
+        sqlite3.Error: If there is database errors'''
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, meal, cuisine, price, difficulty FROM meals
+                WHERE deleted = FALSE ORDER BY id
+            """)
+            rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    prices = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+    cuisine_lengths = np.fromiter((len(row[2]) for row in rows), dtype=np.float64, count=len(rows))
+    modifiers = np.fromiter((DIFFICULTY_MODIFIER[row[4]] for row in rows), dtype=np.float64, count=len(rows))
+
+    logger.info("Loaded %d meals for matchup analysis", len(rows))
+    return MealArrays(ids=ids, names=[row[1] for row in rows], scores=battle_scores(prices, cuisine_lengths, modifiers))
+
+
+def first_seat_win_probability(scores_1: np.ndarray, scores_2: np.ndarray) -> np.ndarray:
+    '''
+    Computes the chance that combatant 1 wins, for every pair of scores.
+
+    BattleModel.decide gives the win to combatant 1 when the normalized delta
+    is larger than the random draw, so the chance is the share of the 100
+    possible draws that fall below the delta. The result has shape
+    (len(scores_1), len(scores_2)).
+
+    Args:
+        scores_1: battle scores of the meals prepped first
+        scores_2: battle scores of the meals prepped second
+
+    Return:
+        np.ndarray: the win probabilities of combatant 1
+    '''
+    delta = np.subtract.outer(scores_1, scores_2)
+    np.abs(delta, out=delta)
+    delta /= 100
+    return np.searchsorted(RANDOM_GRID, delta, side="left") / len(RANDOM_GRID)
+
+
+def rows_per_chunk(num_meals: int, memory_budget_mb: int = MATCHUP_MEMORY_BUDGET_MB) -> int:
+    '''
+    Works out how many matrix rows fit in the memory budget at once.
+
+    Each cell needs a float64 delta, an int64 draw count and a float64
+    probability while a chunk is scanned.
+
+    Args:
+        num_meals: the width of the matrix
+        memory_budget_mb: the budget in megabytes
+
+    Return:
+        int: the number of rows per chunk, at least one
+    '''
+    return max(1, (memory_budget_mb * 1024 * 1024) // (24 * max(num_meals, 1)))
+
+
+def expected_win_rates(scores: np.ndarray, memory_budget_mb: int = MATCHUP_MEMORY_BUDGET_MB) -> np.ndarray:
+    '''
+    Computes each meal's chance of winning when prepped first, averaged over every opponent.
+
+    The upper triangle of the pairwise matrix is scanned in row chunks, so
+    the memory used stays within the budget however many meals there are.
+
+    Args:
+        scores: the battle scores of all meals
+        memory_budget_mb: the budget for the scratch arrays in megabytes
+
+    Return:
+        np.ndarray: the expected win rate of each meal when prepped first
+    '''
+    num_meals = len(scores)
+    if num_meals < 2:
+        return np.zeros(num_meals)
+
+    chunk = rows_per_chunk(num_meals, memory_budget_mb)
+    totals = np.zeros(num_meals)
+    for start in range(0, num_meals, chunk):
+        end = min(start + chunk, num_meals)
+        # The matrix is symmetric, so each chunk only scans the columns from its own first row on
+        probabilities = first_seat_win_probability(scores[start:end], scores[start:])
+        # The diagonal has a delta of 0 and never wins, so it adds nothing to the sums
+        totals[start:end] += probabilities.sum(axis=1)
+        totals[end:] += probabilities[:, end - start:].sum(axis=0)
+    return totals / (num_meals - 1)
+
+
+def simulate_battles(scores: np.ndarray, battles: int, seed: int = None) -> tuple:
+    '''
+    Fights random pairings of meals in memory, with the same rule as BattleModel.decide.
+
+    Args:
+        scores: the battle scores of all meals
+        battles: how many virtual battles to fight
+        seed: a seed for a reproducible simulation
+
+    Return:
+        tuple: the wins and the battles of each meal, as arrays
+    '''
+    num_meals = len(scores)
+    rng = np.random.default_rng(seed)
+    wins = np.zeros(num_meals, dtype=np.int64)
+    played = np.zeros(num_meals, dtype=np.int64)
+
+    for start in range(0, battles, SIMULATION_BATCH_SIZE):
+        size = min(SIMULATION_BATCH_SIZE, battles - start)
+        first = rng.integers(num_meals, size=size)
+        # Draw the second meal from the others so nobody fights itself
+        second = rng.integers(num_meals - 1, size=size)
+        second += second >= first
+        draws = RANDOM_GRID[rng.integers(len(RANDOM_GRID), size=size)]
+
+        first_wins = np.abs(scores[first] - scores[second]) / 100 > draws
+        wins += np.bincount(np.where(first_wins, first, second), minlength=num_meals)
+        played += np.bincount(first, minlength=num_meals) + np.bincount(second, minlength=num_meals)
+
+    return wins, played
+
+
+def get_meal_matchups(battles: int = 10000, seed: int = None, meal_ids: List[int] = None) -> dict[str, Any]:
+    '''
+    Analyses every pairing of the non-deleted meals without touching their stats.
+
+    The outcome of a battle depends on the seating: combatant 1 wins with the
+    chance the delta gives it, combatant 2 with the rest. Each meal therefore
+    gets an expected win rate for both seats, and the simulation seats the
+    meals at random.
+
+    Args:
+        battles: how many virtual battles to simulate
+        seed: a seed for a reproducible simulation
+        meal_ids: meals whose full pairwise matrix should be returned
+
+    Return:
+        dict[str,Any]: the per-meal win rates, the simulated standings and the optional matrix
+
+    Raises:
+        ValueError: If there are fewer than two meals, or a requested meal is missing
+        sqlite3.Error: If there is database errors'''
+    if battles < 0:
+        raise ValueError(f"Invalid number of battles: {battles}. Must be zero or more.")
+    if meal_ids is not None and len(meal_ids) > MAX_MATRIX_MEALS:
+        raise ValueError(f"A matrix can hold at most {MAX_MATRIX_MEALS} meals.")
+
+    start = time.perf_counter()
+    meals = load_meal_arrays()
+    num_meals = len(meals.ids)
+    if num_meals < 2:
+        logger.error("Not enough meals for matchups: %d", num_meals)
+        raise ValueError("At least two meals are needed for matchups.")
+
+    rates = expected_win_rates(meals.scores)
+    matchups = [
+        {
+            'id': int(meals.ids[i]),
+            'meal': meals.names[i],
+            'score': float(meals.scores[i]),
+            'win_pct_as_first': round(float(rates[i]) * 100, 1),
+            'win_pct_as_second': round((1 - float(rates[i])) * 100, 1)
+        }
+        for i in np.argsort(-rates, kind="stable")
+    ]
+
+    wins, played = simulate_battles(meals.scores, battles, seed)
+    standings = []
+    for i in np.lexsort((-played, -wins)):
+        # Plain ints, so no NumPy scalar reaches the JSON encoder
+        meal_wins, meal_battles = int(wins[i]), int(played[i])
+        standings.append({
+            'id': int(meals.ids[i]),
+            'meal': meals.names[i],
+            'battles': meal_battles,
+            'wins': meal_wins,
+            'win_pct': round(meal_wins * 100 / meal_battles, 1) if meal_battles else 0.0
+        })
+
+    result = {
+        'meals': num_meals,
+        'pairs': num_meals * (num_meals - 1),
+        'chunk_rows': min(rows_per_chunk(num_meals), num_meals),
+        'matchups': matchups,
+        'simulation': {'battles': battles, 'seed': seed, 'standings': standings},
+    }
+
+    if meal_ids is not None:
+        positions = np.searchsorted(meals.ids, meal_ids)
+        for meal_id, position in zip(meal_ids, positions):
+            if position >= num_meals or meals.ids[position] != meal_id:
+                logger.info("Meal with ID %s not found", meal_id)
+                raise ValueError(f"Meal with ID {meal_id} not found")
+        subset = meals.scores[positions]
+        result['matrix'] = {
+            'meal_ids': list(meal_ids),
+            'win_probability': first_seat_win_probability(subset, subset).tolist()
+        }
+
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    logger.info("Matchups computed for %d meals in %.1f ms", num_meals, result['elapsed_ms'])
+    return result
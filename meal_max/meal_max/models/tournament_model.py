@@ -0,0 +1,233 @@
+from collections import OrderedDict
+import itertools
+import logging
+import threading
+import time
+from typing import List, Tuple
+
+from meal_max.models.battle_model import BattleModel
+from meal_max.models.history_model import record_battles
+from meal_max.models.kitchen_model import Meal, get_meals_by_ids, settle_battles
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+FORMATS = ("single_elimination", "double_elimination", "round_robin")
+
+
+class TournamentModel:
+    """Runs whole tournaments server-side on top of BattleModel.
+
+    Every meal is fetched with one query, every round is fought in memory, and
+    all stat updates are written with one batched transaction at the end.
+
+    Attributes:
+        battle_model (BattleModel): Decides the individual battles.
+        max_history (int): How many finished tournaments are kept for lookup.
+    """
+
+    def __init__(self, battle_model: BattleModel = None, max_history: int = 100):
+        """Initializes the TournamentModel with an empty tournament history."""
+        self.battle_model = battle_model or BattleModel()
+        self.max_history = max_history
+        self.tournaments: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def run_tournament(self, meal_ids: List[int], tournament_format: str = "single_elimination") -> dict:
+        """Runs a tournament between the given meals and records every battle.
+
+        Args:
+            meal_ids (List[int]): The ids of the entrants, in seeding order.
+            tournament_format (str): One of 'single_elimination', 'double_elimination' or 'round_robin'.
+
+        Returns:
+            dict: The tournament id, bracket rounds, standings, champion and timing.
+
+        Raises:
+            ValueError: If the format is unknown, there are fewer than two distinct
+                entrants, or an entrant is deleted or missing.
+        """
+        if tournament_format not in FORMATS:
+            logger.error("Invalid tournament format: %s", tournament_format)
+            raise ValueError(f"Invalid tournament format: {tournament_format}. Must be one of {', '.join(FORMATS)}.")
+        if len(set(meal_ids)) != len(meal_ids):
+            logger.error("Duplicate entrants in tournament: %s", meal_ids)
+            raise ValueError("Each meal can only enter a tournament once.")
+        if len(meal_ids) < 2:
+            logger.error("Not enough entrants for a tournament: %d", len(meal_ids))
+            raise ValueError("A tournament needs at least two meals.")
+
+        start = time.perf_counter()
+        logger.info("Starting %s tournament with %d meals", tournament_format, len(meal_ids))
+        entrants = get_meals_by_ids(meal_ids)
+        records = []
+
+        if tournament_format == "single_elimination":
+            rounds, standings = self._single_elimination(entrants, records)
+        elif tournament_format == "double_elimination":
+            rounds, standings = self._double_elimination(entrants, records)
+        else:
+            rounds, standings = self._round_robin(entrants, records)
+
+        results = [(match["winner"], match["loser"]) for matches in rounds for match in matches]
+        settle_battles(results)
+        record_battles(records)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            tournament_id = next(self._next_id)
+            tournament = {
+                "id": tournament_id,
+                "format": tournament_format,
+                "meal_ids": list(meal_ids),
+                "champion": standings[0],
+                "standings": standings,
+                "rounds": rounds,
+                "battles": len(results),
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "rounds_per_second": round(len(rounds) / elapsed, 1) if elapsed else None,
+            }
+            self.tournaments[tournament_id] = tournament
+            while len(self.tournaments) > self.max_history:
+                self.tournaments.popitem(last=False)
+
+        logger.info("Tournament %d finished: %d rounds, %d battles, champion %s",
+                    tournament_id, len(rounds), len(results), standings[0]["meal"])
+        return tournament
+
+    def get_tournament(self, tournament_id: int) -> dict:
+        """Retrieves a finished tournament.
+
+        Args:
+            tournament_id (int): The id returned by run_tournament.
+
+        Returns:
+            dict: The tournament results.
+
+        Raises:
+            ValueError: If no tournament with that id is kept.
+        """
+        with self._lock:
+            tournament = self.tournaments.get(tournament_id)
+        if tournament is None:
+            logger.info("Tournament with ID %s not found", tournament_id)
+            raise ValueError(f"Tournament with ID {tournament_id} not found")
+        return tournament
+
+    ##################################################
+    # Formats
+    ##################################################
+
+    def _single_elimination(self, entrants: List[Meal], records: list) -> Tuple[list, list]:
+        alive = list(entrants)
+        eliminated = []
+        rounds = []
+        while len(alive) > 1:
+            matches, alive, losers = self._play_round(alive, len(rounds) + 1, "winners", records)
+            rounds.append(matches)
+            eliminated.append(losers)
+
+        return rounds, self._elimination_standings(alive, eliminated)
+
+    def _double_elimination(self, entrants: List[Meal], records: list) -> Tuple[list, list]:
+        winners = list(entrants)
+        losers = []
+        eliminated = []
+        rounds = []
+        bracket_reset = False
+        while len(winners) + len(losers) > 1:
+            round_number = len(rounds) + 1
+            if len(winners) == 1 and len(losers) == 1:
+                # Grand final; the losers bracket champion has to win it twice
+                matches, advancing, beaten = self._play_round(winners + losers, round_number, "final", records)
+                rounds.append(matches)
+                if advancing[0] is winners[0] or bracket_reset:
+                    winners, losers = advancing, []
+                    eliminated.append(beaten)
+                else:
+                    # Both finalists now have one loss, so the next final decides it
+                    winners, losers = advancing, beaten
+                    bracket_reset = True
+                continue
+
+            matches, round_losers = [], []
+            if len(winners) > 1:
+                bracket_matches, winners, dropped = self._play_round(winners, round_number, "winners", records)
+                matches.extend(bracket_matches)
+            else:
+                dropped = []
+            if len(losers) > 1:
+                bracket_matches, losers, round_losers = self._play_round(losers, round_number, "losers", records)
+                matches.extend(bracket_matches)
+            losers = losers + dropped
+            rounds.append(matches)
+            eliminated.append(round_losers)
+
+        return rounds, self._elimination_standings(winners or losers, eliminated)
+
+    def _round_robin(self, entrants: List[Meal], records: list) -> Tuple[list, list]:
+        # Circle method: fix the first seat and rotate the rest, padding odd fields with a bye
+        seats = list(entrants) + ([None] if len(entrants) % 2 else [])
+        half = len(seats) // 2
+        wins = {meal.id: 0 for meal in entrants}
+        rounds = []
+        for round_number in range(1, len(seats)):
+            matches = []
+            for meal_1, meal_2 in zip(seats[:half], reversed(seats[half:])):
+                if meal_1 is not None and meal_2 is not None:
+                    matches.append(self._match(meal_1, meal_2, round_number, "round_robin", records))
+                    wins[matches[-1]["winner"]] += 1
+            rounds.append(matches)
+            seats = [seats[0], seats[-1]] + seats[1:-1]
+
+        order = sorted(entrants, key=lambda meal: -wins[meal.id])
+        standings = [self._standing(rank, meal, wins=wins[meal.id], losses=len(entrants) - 1 - wins[meal.id])
+                     for rank, meal in enumerate(order, start=1)]
+        return rounds, standings
+
+    ##################################################
+    # Helpers
+    ##################################################
+
+    def _play_round(self, entrants: List[Meal], round_number: int, bracket: str,
+                    records: list) -> Tuple[list, list, list]:
+        """Pairs entrants in seeding order; an odd entrant out gets a bye."""
+        matches, advancing, losing = [], [], []
+        for meal_1, meal_2 in zip(entrants[0::2], entrants[1::2]):
+            match = self._match(meal_1, meal_2, round_number, bracket, records)
+            matches.append(match)
+            winner_is_first = match["winner"] == meal_1.id
+            advancing.append(meal_1 if winner_is_first else meal_2)
+            losing.append(meal_2 if winner_is_first else meal_1)
+        if len(entrants) % 2:
+            advancing.append(entrants[-1])
+        return matches, advancing, losing
+
+    def _match(self, meal_1: Meal, meal_2: Meal, round_number: int, bracket: str, records: list) -> dict:
+        """Fights one match, adding how it was decided to records for the battle history."""
+        winner, loser, record = self.battle_model.decide(meal_1, meal_2)
+        records.append(record)
+        return {
+            "round": round_number,
+            "bracket": bracket,
+            "meal_1": meal_1.id,
+            "meal_2": meal_2.id,
+            "winner": winner.id,
+            "loser": loser.id,
+        }
+
+    def _elimination_standings(self, champions: List[Meal], eliminated: List[List[Meal]]) -> list:
+        """Ranks the champion first, then meals by how late they were knocked out."""
+        standings = [self._standing(1, champions[0])]
+        for losers in reversed(eliminated):
+            rank = len(standings) + 1
+            standings.extend(self._standing(rank, meal) for meal in losers)
+        return standings
+
+    @staticmethod
+    def _standing(rank: int, meal: Meal, **record) -> dict:
+        return {"rank": rank, "id": meal.id, "meal": meal.meal, **record}
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from meal_max.models import history_model, kitchen_model
+from meal_max.utils import sql_utils
+from meal_max.utils.leaderboard_cache import LeaderboardCache
+from meal_max.utils.lru_cache import VersionedLRUCache
+from meal_max.utils.write_behind import WriteBehindCounters
+
+
+# the schema the service is deployed with
+CREATE_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "sql", "create_meal_table.sql")
+
+
+@pytest.fixture(autouse=True)
+def battle_log(monkeypatch):
+    """Fixture giving every test its own battle log without a writer thread, so battles are written only on a flush."""
+    log = history_model.BattleLog(flush_interval=0, retention=0)
+    monkeypatch.setattr(history_model, "_log", log)
+    return log
+
+@pytest.fixture
+def meal_db_file(tmp_path, monkeypatch):
+    """Fixture for a meals database file behind the real connection pool and fresh caches."""
+    monkeypatch.setattr(sql_utils, "DB_PATH", str(tmp_path / "meal_max.db"))
+    monkeypatch.setenv("SQL_CREATE_TABLE_PATH", CREATE_TABLE_PATH)
+    monkeypatch.setattr(kitchen_model, "_leaderboard", LeaderboardCache())
+    monkeypatch.setattr(kitchen_model, "_meal_cache", VersionedLRUCache(kitchen_model.MEAL_CACHE_SIZE, kitchen_model.MEAL_CACHE_TTL))
+    monkeypatch.setattr(kitchen_model, "_stat_counters", WriteBehindCounters(kitchen_model._write_meal_stats, 3, 60, 1000))
+    kitchen_model.clear_meals()
+    kitchen_model.create_meal("Pasta", "Italian", 12.99, "MED")
+    kitchen_model.create_meal("Sushi", "Japanese", 15.00, "HIGH")
+    kitchen_model.create_meal("Tacos", "Mexican", 8.50, "LOW")
+    yield sql_utils.DB_PATH
+    sql_utils.close_pool()
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+from meal_max.models import kitchen_model
+from meal_max.models.arena_model import ArenaNotFoundError, ArenaRegistry, DEFAULT_ARENA
+from meal_max.utils import sql_utils
+
+
+@pytest.fixture
+def arenas(meal_db_file, mocker):
+    """Fixture to create an in-memory ArenaRegistry whose battles are decided without random.org."""
+    mocker.patch("meal_max.models.battle_model.get_random", return_value=0.0)
+    return ArenaRegistry(idle_timeout=60, max_arenas=3)
+
+@pytest.fixture
+def persisted(meal_db_file, mocker):
+    """Fixture to create two persisted registries, standing in for two worker processes."""
+    mocker.patch("meal_max.models.battle_model.get_random", return_value=0.0)
+    return ArenaRegistry(persist=True), ArenaRegistry(persist=True)
+
+def test_arenas_are_isolated(arenas): #Test that combatants prepped in one arena don't show up in another
+    first, second = arenas.create_arena(), arenas.create_arena()
+    arenas.prep_combatant(first, kitchen_model.get_meal_by_name("Pasta"))
+    arenas.prep_combatant(first, kitchen_model.get_meal_by_name("Sushi"))
+    arenas.prep_combatant(second, kitchen_model.get_meal_by_name("Tacos"))
+
+    assert arenas.battle(first) == "Pasta"
+    assert [meal.meal for meal in arenas.get_combatants(first)] == ["Pasta"]
+    assert [meal.meal for meal in arenas.get_combatants(second)] == ["Tacos"]
+    with pytest.raises(ValueError, match="Two combatants must be prepped"):
+        arenas.battle(second)
+    assert kitchen_model.get_meal_by_name("Pasta").id in [meal["id"] for meal in kitchen_model.get_leaderboard("wins", limit=1)]
+
+def test_unknown_arena(arenas): #Test that unknown and deleted arenas raise ArenaNotFoundError
+    arena_id = arenas.create_arena()
+    arenas.delete_arena(arena_id)
+
+    with pytest.raises(ArenaNotFoundError):
+        arenas.get_combatants(arena_id)
+    with pytest.raises(ArenaNotFoundError):
+        arenas.delete_arena("missing")
+
+def test_idle_and_lru_eviction(arenas, mocker): #Test that idle arenas and the least recently used ones are evicted
+    idle = arenas.create_arena()
+    kept = arenas.create_arena()
+    arenas.get_combatants(DEFAULT_ARENA)
+    arenas.get_combatants(idle)
+    arenas.create_arena()
+    with pytest.raises(ArenaNotFoundError):
+        arenas.get_combatants(kept)
+
+    now = time.monotonic()
+    mocker.patch("meal_max.models.arena_model.time.monotonic", return_value=now + 120)
+    with pytest.raises(ArenaNotFoundError):
+        arenas.get_combatants(idle)
+    assert arenas.get_combatants(DEFAULT_ARENA) == []
+    assert arenas.stats()["evicted"] == 3
+
+def test_persisted_arenas_are_shared(persisted): #Test that two registries over one database see the same arenas
+    first, second = persisted
+    arena_id = first.create_arena()
+    second.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Pasta"))
+    first.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Sushi"))
+
+    assert second.battle(arena_id) == "Pasta"
+    assert [meal.meal for meal in first.get_combatants(arena_id)] == ["Pasta"]
+    first.delete_arena(arena_id)
+    with pytest.raises(ArenaNotFoundError):
+        second.get_combatants(arena_id)
+
+def test_persisted_battle_conflict(persisted, mocker): #Test that a battle on a stale read is refused and not recorded
+    first, second = persisted
+    arena_id = first.create_arena()
+    first.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Pasta"))
+    first.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Sushi"))
+    stale = first._load_row(arena_id)
+    second.clear_combatants(arena_id)
+    mocker.patch.object(first, "_load_row", return_value=stale)
+
+    with pytest.raises(ValueError, match="changed by another request"):
+        first.battle(arena_id)
+    assert kitchen_model.get_leaderboard("wins") == []
+    assert first.stats()["conflicts"] == 1
+
+def test_split_battle_conflict(arenas): #Test that a battle prepared before the arena changed is refused
+    arena_id = arenas.create_arena()
+    arenas.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Pasta"))
+    arenas.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Sushi"))
+    combatant_1, combatant_2, version = arenas.prepare_battle(arena_id)
+
+    assert arenas.finish_battle(arena_id, combatant_1, combatant_2, version, random_number=0.99) == "Sushi"
+    with pytest.raises(ValueError, match="changed by another request"):
+        arenas.finish_battle(arena_id, combatant_1, combatant_2, version, random_number=0.99)
+    assert [meal.meal for meal in arenas.get_combatants(arena_id)] == ["Sushi"]
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_failed_settlement_keeps_arena(meal_db_file, mocker, persist): #Test that a battle whose result cannot be recorded leaves both combatants
+    mocker.patch("meal_max.models.battle_model.get_random", return_value=0.0)
+    arenas = ArenaRegistry(persist=persist)
+    arena_id = arenas.create_arena()
+    arenas.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Pasta"))
+    arenas.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Sushi"))
+    kitchen_model.delete_meal(kitchen_model.get_meal_by_name("Sushi").id)
+
+    with pytest.raises(ValueError, match="has been deleted"):
+        arenas.battle(arena_id)
+    if persist:
+        assert arenas._load_row(arena_id)[0] == [1, 2]
+    else:
+        assert [meal.id for meal in arenas.get_combatants(arena_id)] == [1, 2]
+    assert kitchen_model.get_leaderboard("wins") == []
+
+def test_persisted_reads_do_not_write(persisted): #Test that reading the persisted default arena writes nothing to the database
+    first, _ = persisted
+    version = sql_utils.get_data_version()
+
+    assert first.get_combatants(DEFAULT_ARENA) == []
+    assert first.stats()["arenas"] == 1
+    assert sql_utils.get_data_version() == version
+
+def test_persisted_writes_keep_caches(persisted): #Test that arena writes do not make the leaderboard cache rebuild
+    first, _ = persisted
+    kitchen_model.get_leaderboard("wins")
+    arena_id = first.create_arena()
+    first.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Pasta"))
+    first.prep_combatant(arena_id, kitchen_model.get_meal_by_name("Sushi"))
+    first.battle(arena_id)
+    first.clear_combatants(arena_id)
+    first.delete_arena(arena_id)
+
+    kitchen_model.get_leaderboard("wins")
+    assert kitchen_model.get_leaderboard_cache_stats()["rebuilds"] == 1
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from meal_max.models import kitchen_model
+from meal_max.models.arena_model import ArenaConflictError, ArenaRegistry, DEFAULT_ARENA
+
+@pytest.fixture
+def servers(meal_db_file, mocker):
+    """Fixture for the ASGI application and the Flask app over one fresh arena registry, with every draw fixed at 0.0."""
+    import app
+    import asgi
+
+    registry = ArenaRegistry()
+    mocker.patch.object(app, "arena_registry", registry)
+    mocker.patch.object(asgi, "arena_registry", registry)
+    mocker.patch("meal_max.models.battle_model.get_random", return_value=0.0)
+
+    async def draw():
+        return 0.0
+    mocker.patch.object(asgi, "get_random_async", draw)
+    return asgi.application, app.app.test_client(), registry
+
+async def request(application, path):
+    """Drives an ASGI application through one GET request and returns its status and decoded JSON body."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+    await application(scope, receive, send)
+    return messages[0]["status"], json.loads(b"".join(message.get("body", b"") for message in messages[1:]))
+
+def call(application, path):
+    return asyncio.run(request(application, path))
+
+def prep(registry, arena_id, *names):
+    registry.clear_combatants(arena_id)
+    for name in names:
+        registry.prep_combatant(arena_id, kitchen_model.get_meal_by_name(name))
+
+@pytest.mark.parametrize("arena", [None, "new"])
+def test_battle_matches_flask(servers, arena): #Test that a battle gets the same status and body from the ASGI and Flask routes
+    application, client, registry = servers
+    arena_id = registry.create_arena() if arena else DEFAULT_ARENA
+    path = f"/api/arenas/{arena_id}/battle" if arena else "/api/battle"
+
+    prep(registry, arena_id, "Pasta", "Sushi")
+    flask_response = client.get(path)
+    prep(registry, arena_id, "Pasta", "Sushi")
+    assert call(application, path) == (flask_response.status_code, flask_response.get_json())
+    assert flask_response.get_json() == {'status': 'success', 'winner': 'Pasta'}
+    assert [battle['battles'] for battle in kitchen_model.get_leaderboard("wins")] == [2, 2]
+
+@pytest.mark.parametrize("path, status", [
+    ("/api/battle", 500),
+    ("/api/arenas/{arena_id}/battle", 400),
+    ("/api/arenas/missing/battle", 404),
+])
+def test_battle_errors_match_flask(servers, path, status): #Test that refused battles get the same status and body from both routes
+    application, client, registry = servers
+    arena_id = registry.create_arena()
+    prep(registry, arena_id, "Pasta")
+    prep(registry, DEFAULT_ARENA, "Pasta")
+    path = path.format(arena_id=arena_id)
+
+    flask_response = client.get(path)
+    assert flask_response.status_code == status
+    assert call(application, path) == (status, flask_response.get_json())
+
+def test_battle_conflict(servers, mocker): #Test that an arena changed during the battle is answered 409 by both routes
+    application, client, registry = servers
+    conflict = ArenaConflictError("Arena default was changed by another request; try again.")
+    mocker.patch.object(registry, "battle", side_effect=conflict)
+    mocker.patch.object(registry, "finish_battle", side_effect=conflict)
+    prep(registry, DEFAULT_ARENA, "Pasta", "Sushi")
+
+    flask_response = client.get("/api/battle")
+    assert flask_response.status_code == 409
+    assert call(application, "/api/battle") == (409, flask_response.get_json())
+
+@pytest.mark.parametrize("arena", [None, "new"])
+def test_concurrent_battles_are_serialized(servers, mocker, arena): #Test that two battles on one arena wait for each other, as under Flask
+    import asgi
+    application, _, registry = servers
+    arena_id = registry.create_arena() if arena else DEFAULT_ARENA
+    path = f"/api/arenas/{arena_id}/battle" if arena else "/api/battle"
+    prep(registry, arena_id, "Pasta", "Sushi")
+
+    async def slow_draw():
+        await asyncio.sleep(0.01)
+        return 0.0
+    mocker.patch.object(asgi, "get_random_async", slow_draw)
+
+    async def both():
+        return await asyncio.gather(request(application, path), request(application, path))
+    first, second = asyncio.run(both())
+
+    assert first == (200, {'status': 'success', 'winner': 'Pasta'})
+    assert second[0] == (400 if arena else 500) and "Two combatants must be prepped" in second[1]['error']
+    assert asgi._arena_locks == {}
@@ -47,12 +47,12 @@ def test_battle_tie():
     battle_model.prep_combatant(meal2)
 
     with patch("meal_max.utils.random_utils.get_random", return_value=0.0), \
-         patch("meal_max.models.battle_model.update_meal_stats") as mock_update_stats:
+         patch("meal_max.models.battle_model.settle_battle") as mock_settle_battle:
 
         winner = battle_model.battle()
 
         assert winner in [meal1.meal, meal2.meal]
-        assert mock_update_stats.call_count == 2
+        assert mock_settle_battle.call_count == 1
         assert len(battle_model.combatants) == 1
 
 # Test: Battle with two combatants
@@ -63,7 +63,7 @@ def test_battle_with_combatants(battle_model, sample_combatants, caplog, mocker)
     # Mock the battle functions
     mocker.patch("meal_max.models.battle_model.BattleModel.get_battle_score", side_effect=[85.5, 102.0])
     mocker.patch("meal_max.models.battle_model.get_random", return_value=0.42)
-    mock_update_stats = mocker.patch("meal_max.models.battle_model.update_meal_stats")
+    mock_settle_battle = mocker.patch("meal_max.models.battle_model.settle_battle")
 
     # Call the battle method
     winner_meal = battle_model.battle()
@@ -75,9 +75,8 @@ def test_battle_with_combatants(battle_model, sample_combatants, caplog, mocker)
     assert "Score for Pizza: 102.000" in caplog.text
     assert "The winner is: Spaghetti" in caplog.text
 
-    # Verify that stats were updated for both combatants
-    mock_update_stats.assert_any_call(1, "win")
-    mock_update_stats.assert_any_call(2, "loss")
+    # Verify that stats were settled for both combatants in one call
+    mock_settle_battle.assert_called_once_with(1, 2)
 
 # Test: Clear combatants
 def test_clear_combatants(battle_model, sample_combatants, caplog):
@@ -117,7 +116,7 @@ def test_battle_random_outcome(battle_model, sample_combatants, caplog, mocker):
 
     mocker.patch("meal_max.models.battle_model.BattleModel.get_battle_score", side_effect=[90.0, 95.0])
     mocker.patch("meal_max.models.battle_model.get_random", return_value=0.1)
-    mock_update_stats = mocker.patch("meal_max.models.battle_model.update_meal_stats")
+    mock_settle_battle = mocker.patch("meal_max.models.battle_model.settle_battle")
 
     with caplog.at_level("INFO"):
         winner_meal = battle_model.battle()
@@ -128,8 +127,7 @@ def test_battle_random_outcome(battle_model, sample_combatants, caplog, mocker):
     assert "Score for Pizza: 95.000" in caplog.text
     assert "The winner is: Pizza" in caplog.text
 
-    mock_update_stats.assert_any_call(1, "loss")
-    mock_update_stats.assert_any_call(2, "win")
+    mock_settle_battle.assert_called_once_with(2, 1)
 
 # Test: Removing combatant from list after battle
 def test_remove_combatant_after_battle(battle_model, sample_combatants, caplog, mocker):
@@ -0,0 +1,153 @@
+import sqlite3
+import time
+
+import pytest
+from meal_max.models import history_model, kitchen_model
+from meal_max.models.battle_model import BattleModel
+from meal_max.models.history_model import BattleLog, BattleRecord, HistoryIncompleteError
+from meal_max.models.kitchen_model import get_leaderboard, get_meal_by_id
+
+def record(meal_1_id, meal_2_id, winner_id, fought_at=None): #Making a battle record for testing
+    return BattleRecord(meal_1_id, meal_2_id, 10.0, 5.0, 0.05, 0.5, winner_id,
+                        time.time() if fought_at is None else fought_at)
+
+def count_battles(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM battles").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_battle_is_recorded(meal_db_file, mocker): #Test that a settled battle lands in the history with how it was decided
+    mocker.patch("meal_max.models.battle_model.get_random", return_value=0.0)
+    battle_model = BattleModel()
+    pasta, sushi = get_meal_by_id(1), get_meal_by_id(2)
+    battle_model.prep_combatant(pasta)
+    battle_model.prep_combatant(sushi)
+
+    assert battle_model.battle() == "Pasta"
+    assert count_battles(meal_db_file) == 0, "Battles should wait in the buffer until a batch is written"
+
+    [battle] = history_model.get_meal_battles(2)
+    assert battle['meal_1_id'] == 1 and battle['meal_2_id'] == 2
+    assert (battle['winner_id'], battle['loser_id']) == (1, 2)
+    assert battle['score_1'] == pytest.approx(12.99 * len("Italian") - 2)
+    assert battle['delta'] == pytest.approx(abs(battle['score_1'] - battle['score_2']) / 100)
+    assert battle['random_number'] == 0.0
+
+def test_get_meal_battles_pages(meal_db_file): #Test that a meal's battles come newest first and page by battle id
+    history_model.record_battles([record(1, 2, 1), record(3, 1, 3), record(2, 3, 2), record(1, 1, 1)])
+
+    battles = history_model.get_meal_battles(1)
+    assert [(battle['meal_1_id'], battle['meal_2_id']) for battle in battles] == [(1, 1), (3, 1), (1, 2)]
+    assert [battle['id'] for battle in history_model.get_meal_battles(1, limit=1, before=battles[0]['id'])] == [battles[1]['id']]
+    with pytest.raises(ValueError, match="Invalid limit: -1"):
+        history_model.get_meal_battles(1, limit=-1)
+
+def test_head_to_head(meal_db_file): #Test that head-to-head records count both seatings of a pair
+    history_model.record_battles([record(1, 2, 1), record(2, 1, 1), record(2, 1, 2), record(1, 3, 3)])
+
+    assert history_model.get_head_to_head(2, 1) == {
+        'meal_1_id': 2, 'meal_2_id': 1, 'battles': 3, 'meal_1_wins': 1, 'meal_2_wins': 2}
+    assert history_model.get_head_to_head(2, 3)['battles'] == 0
+
+def test_prune_keeps_head_to_head(meal_db_file): #Test that compacted battles leave the table but still count head-to-head
+    old = time.time() - 10 * 86400
+    history_model.record_battles([record(1, 2, 1, old), record(2, 1, 2, old), record(1, 2, 1, old), record(1, 2, 2)])
+
+    assert history_model.prune_battles(time.time() - 86400) == 3
+    assert count_battles(meal_db_file) == 1
+    assert history_model.get_head_to_head(1, 2) == {
+        'meal_1_id': 1, 'meal_2_id': 2, 'battles': 4, 'meal_1_wins': 2, 'meal_2_wins': 2}
+
+    history_model.record_battles([record(2, 1, 1, old)])
+    history_model.prune_battles(time.time())
+    assert history_model.get_head_to_head(1, 2)['meal_1_wins'] == 3, "Later compactions should add to the totals"
+    assert history_model.prune_battles(time.time()) == 0
+
+def test_full_batch_is_written(meal_db_file, monkeypatch): #Test that a full batch is written without a flush
+    monkeypatch.setattr(history_model, "_log", BattleLog(batch_size=2, flush_interval=0, retention=0))
+
+    history_model.record_battles([record(1, 2, 1)])
+    assert count_battles(meal_db_file) == 0
+    history_model.record_battles([record(1, 3, 3)])
+    assert count_battles(meal_db_file) == 2
+    assert history_model.get_battle_log_stats()["batches"] == 1
+
+def test_writer_thread(meal_db_file): #Test that the writer thread writes queued battles after the flush interval
+    log = BattleLog(flush_interval=0.01, retention=0)
+    log.append([record(1, 2, 1)])
+
+    deadline = time.monotonic() + 5
+    while log.stats()["written"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    log.close()
+    assert count_battles(meal_db_file) == 1
+
+def test_failed_write_is_retried(meal_db_file, mocker, battle_log): #Test that battles are kept when a write fails, up to the limit
+    battle_log.max_pending = 2
+    mocker.patch.object(battle_log, "_write", side_effect=sqlite3.OperationalError("database is locked"))
+    battle_log.append([record(1, 2, 1), record(1, 3, 1), record(2, 3, 2)])
+
+    assert battle_log.flush() == 0
+    stats = battle_log.stats()
+    assert (stats["pending"], stats["failures"], stats["dropped"]) == (2, 1, 1)
+
+    mocker.stopall()
+    assert battle_log.flush() == 2
+    assert [battle['meal_2_id'] for battle in history_model.get_meal_battles(3)] == [3, 3]
+
+def test_log_writes_keep_caches(meal_db_file): #Test that writing history does not make the leaderboard cache rebuild
+    kitchen_model.settle_battle(1, 2)
+    get_leaderboard("wins")
+    history_model.record_battles([record(1, 2, 1)])
+    history_model.flush_battle_log()
+
+    get_leaderboard("wins")
+    assert kitchen_model.get_leaderboard_cache_stats()["rebuilds"] == 1
+
+def test_recompute_ratings_from_history(meal_db_file): #Test that replaying the history gives the ratings settled incrementally
+    results = [(1, 2), (1, 3), (3, 2), (2, 1)]
+    for winner_id, loser_id in results:
+        kitchen_model.settle_battle(winner_id, loser_id)
+        history_model.record_battles([record(winner_id, loser_id, winner_id)])
+    ratings = {meal['id']: meal['rating'] for meal in get_leaderboard("rating")}
+
+    assert list(history_model.iter_battle_results(batch_size=3)) == results
+    kitchen_model.recompute_ratings(history_model.iter_battle_results())
+    assert {meal['id']: meal['rating'] for meal in get_leaderboard("rating")} == pytest.approx(ratings)
+
+def test_recompute_ratings_after_prune(meal_db_file): #Test that compacted battles are still replayed in the order they were fought
+    old = time.time() - 10 * 86400
+    results = [(1, 2), (1, 3), (3, 2), (2, 1), (3, 1)]
+    for i, (winner_id, loser_id) in enumerate(results):
+        kitchen_model.settle_battle(winner_id, loser_id)
+        history_model.record_battles([record(loser_id, winner_id, winner_id, old if i < 3 else None)])
+    ratings = {meal['id']: meal['rating'] for meal in get_leaderboard("rating")}
+
+    assert history_model.prune_battles(time.time() - 86400) == 3
+    history_model.check_history_complete()
+    assert list(history_model.iter_battle_results(batch_size=2)) == results
+    kitchen_model.recompute_ratings(history_model.iter_battle_results())
+    assert {meal['id']: meal['rating'] for meal in get_leaderboard("rating")} == pytest.approx(ratings)
+
+def test_check_history_complete(meal_db_file, mocker, battle_log): #Test that a history with battles compacted without results or dropped is not replayed
+    history_model.record_battles([record(1, 2, 1, fought_at=time.time() - 7200), record(2, 3, 2)])
+    history_model.prune_battles(time.time() - 3600)
+    history_model.check_history_complete()
+
+    # Compacted before battle_results was kept
+    conn = sqlite3.connect(meal_db_file)
+    conn.execute("INSERT INTO battle_pairs VALUES (1, 3, 2, 1)")
+    conn.commit()
+    conn.close()
+    with pytest.raises(HistoryIncompleteError, match="2 battles were compacted"):
+        history_model.check_history_complete()
+
+    battle_log.max_pending = 1
+    mocker.patch.object(battle_log, "_write", side_effect=sqlite3.OperationalError("database is locked"))
+    history_model.record_battles([record(1, 2, 1), record(1, 3, 1)])
+    battle_log.flush()
+    mocker.stopall()
+    with pytest.raises(HistoryIncompleteError, match="dropped"):
+        history_model.check_history_complete()
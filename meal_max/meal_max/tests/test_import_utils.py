@@ -0,0 +1,29 @@
+import io
+
+import pytest
+
+from meal_max.utils.import_utils import iter_import_records
+
+def test_csv_records(): #Test that CSV rows are parsed against the header and numbered from 1
+    body = io.BytesIO(b"meal,cuisine,price,difficulty\nPasta,Italian,12.50,MED\nSushi,Japanese,15,HIGH,extra\n")
+
+    records = list(iter_import_records(body, "csv"))
+
+    assert records[0] == (1, {'meal': 'Pasta', 'cuisine': 'Italian', 'price': '12.50', 'difficulty': 'MED'})
+    assert records[1][0] == 2
+    assert isinstance(records[1][1], ValueError)
+
+def test_ndjson_records(): #Test that NDJSON lines are parsed lazily and bad lines become errors
+    body = io.BytesIO(b'{"meal": "Pasta", "price": 12.5}\n\nnot json\n[1, 2]\n')
+
+    records = iter_import_records(body, "ndjson")
+
+    assert next(records) == (1, {'meal': 'Pasta', 'price': 12.5})
+    row_number, error = next(records)
+    assert row_number == 2 and "Invalid JSON" in str(error)
+    row_number, error = next(records)
+    assert row_number == 3 and str(error) == "Each line must be a JSON object"
+
+def test_invalid_format(): #Test that an unknown format is rejected
+    with pytest.raises(ValueError, match="Invalid import format: xml"):
+        list(iter_import_records(io.BytesIO(b""), "xml"))
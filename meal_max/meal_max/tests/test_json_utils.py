@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+from flask import Flask, jsonify
+
+from meal_max.models.kitchen_model import Meal
+from meal_max.models.matchup_model import get_meal_matchups
+from meal_max.utils import json_utils
+from meal_max.utils.json_utils import FastJSONProvider, array_response, dumps, iter_array_chunks
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Fixture running a test with orjson and again with the standard library fallback."""
+    if request.param == "json":
+        monkeypatch.setattr(json_utils, "orjson", None)
+    elif json_utils.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+def test_dumps(encoder): #Test that dumps encodes meals and dicts compactly with sorted keys, like jsonify
+    meal = Meal(1, "Pasta", "Italian", 12.5, "MED")
+
+    assert json_utils.encoder_name() == encoder
+    assert dumps({"meal": "Pasta", "count": 1, "tags": ["a"]}) == b'{"count":1,"meal":"Pasta","tags":["a"]}'
+    assert json.loads(dumps({"meal": meal})) == {
+        "meal": {"id": 1, "meal": "Pasta", "cuisine": "Italian", "price": 12.5, "difficulty": "MED"}}
+    assert dumps({"pct": np.float64(12.5), "wins": np.int64(3), "rates": np.array([0.5, 1.0])}) == \
+        b'{"pct":12.5,"rates":[0.5,1.0],"wins":3}'
+
+def test_iter_array_chunks(encoder): #Test that the chunks join into the same document as encoding it at once
+    meals = [{"id": i, "meal": f"Meal {i}"} for i in range(7)]
+
+    chunks = list(iter_array_chunks({"status": "success"}, "meals", meals, chunk_size=3))
+    assert len(chunks) == 5
+    assert json.loads(b"".join(chunks)) == {"status": "success", "meals": meals}
+    assert b"".join(iter_array_chunks({}, "meals", [])) == b'{"meals":[]}\n'
+
+def test_array_response(encoder, monkeypatch): #Test that only arrays past the threshold are streamed
+    monkeypatch.setattr(json_utils, "JSON_STREAM_MIN_ITEMS", 3)
+
+    small = array_response("meals", [1, 2], status="success")
+    assert not small.is_streamed and small.get_json() == {"status": "success", "meals": [1, 2]}
+    large = array_response("meals", [1, 2, 3], status="success")
+    assert large.is_streamed and large.mimetype == "application/json"
+    assert json.loads(b"".join(large.response)) == {"status": "success", "meals": [1, 2, 3]}
+
+def test_provider(encoder): #Test that jsonify goes through the provider, and debug output is still indented
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    with app.app_context():
+        assert jsonify({"meal": Meal(1, "Pasta", "Italian", 12.5, "MED")}).get_json()["meal"]["meal"] == "Pasta"
+        app.debug = True
+        assert b'\n  "b": 1' in jsonify({"b": 1}).data
+
+def test_matchups_response(encoder, meal_db_file): #Test that the /api/meal-matchups body encodes the same with either encoder
+    matchups = {'status': 'success', **get_meal_matchups(battles=100, seed=1, meal_ids=[1, 3])}
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    with app.app_context():
+        body = jsonify(matchups).get_json()
+    assert body == json.loads(json.dumps(matchups))
+    assert body['simulation']['standings'][0]['win_pct'] > 0
@@ -1,6 +1,9 @@
+from contextlib import contextmanager
 import pytest
 import unittest
 import sqlite3
+import copy
+import pickle
 from typing import Dict, Any
 
 
@@ -12,7 +15,13 @@ from meal_max.models.kitchen_model import get_meal_by_name
 #from meal_max.models.kitchen_model import get_leaderboard
 from meal_max.models.kitchen_model import update_meal_stats
 from meal_max.models.kitchen_model import create_meal
+from meal_max.models.kitchen_model import settle_battle
+from meal_max.models.kitchen_model import settle_battles
+from meal_max.models.kitchen_model import get_meals_by_ids
+from meal_max.models.kitchen_model import get_leaderboard
+from meal_max.models import kitchen_model
 #from meal_max.models.kitchen_model import clear_meals
+from meal_max.utils import sql_utils
 from meal_max.utils.sql_utils import get_db_connection
 from meal_max.utils.logger import configure_logger
 
@@ -222,7 +231,8 @@ def test_get_meal_by_id():
             cuisine TEXT NOT NULL,
             price REAL NOT NULL,
             difficulty TEXT NOT NULL,
-            deleted BOOLEAN NOT NULL DEFAULT FALSE
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
         );
     """)
     
@@ -314,10 +324,12 @@ def test_update_win_stat():
             difficulty TEXT NOT NULL,
             battles INTEGER NOT NULL DEFAULT 0,
             wins INTEGER NOT NULL DEFAULT 0,
-            deleted BOOLEAN NOT NULL DEFAULT FALSE
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
         );
     """)
     conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty, battles, wins) VALUES (1, 'Pasta', 'Italian', 12.99, 'MED', 0, 0)")
+    conn.commit()
 
     with patch('meal_max.models.kitchen_model.get_db_connection', return_value=conn):
         update_meal_stats(1, 'win')
@@ -340,10 +352,12 @@ def test_update_loss_stat():
             difficulty TEXT NOT NULL,
             battles INTEGER NOT NULL DEFAULT 0,
             wins INTEGER NOT NULL DEFAULT 0,
-            deleted BOOLEAN NOT NULL DEFAULT FALSE
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
         );
     """)
     conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty, battles, wins) VALUES (1, 'Pasta', 'Italian', 12.99, 'MED', 0, 0)")
+    conn.commit()
 
     with patch('meal_max.models.kitchen_model.get_db_connection', return_value=conn):
         update_meal_stats(1, 'loss')
@@ -378,3 +392,491 @@ def test_update_nonexistent_meal():
             assert False, "Expected ValueError for non-existent meal, but no exception was raised."
 
     conn.close()
+
+#def test_settle_battle():
+def test_settle_battle():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE meals (
+            id INTEGER PRIMARY KEY,
+            meal TEXT NOT NULL,
+            cuisine TEXT NOT NULL,
+            price REAL NOT NULL,
+            difficulty TEXT NOT NULL,
+            battles INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
+        );
+    """)
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (1, 'Pasta', 'Italian', 12.99, 'MED')")
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (2, 'Sushi', 'Japanese', 15.00, 'HIGH')")
+    conn.commit()
+
+    with patch('meal_max.models.kitchen_model.get_db_connection', return_value=conn):
+        settle_battle(1, 2)
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, battles, wins FROM meals ORDER BY id")
+        assert cursor.fetchall() == [(1, 1, 1), (2, 1, 0)], "Winner and loser stats should both be recorded"
+        assert not conn.in_transaction, "Battle should be committed"
+
+    conn.close()
+def test_settle_battle_with_deleted_meal():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE meals (
+            id INTEGER PRIMARY KEY,
+            meal TEXT NOT NULL,
+            cuisine TEXT NOT NULL,
+            price REAL NOT NULL,
+            difficulty TEXT NOT NULL,
+            battles INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
+        );
+    """)
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (1, 'Pasta', 'Italian', 12.99, 'MED')")
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty, deleted) VALUES (2, 'Sushi', 'Japanese', 15.00, 'HIGH', TRUE)")
+    conn.commit()
+
+    with patch('meal_max.models.kitchen_model.get_db_connection', return_value=conn):
+        with pytest.raises(ValueError) as excinfo:
+            settle_battle(1, 2)
+        assert str(excinfo.value) == "Meal with ID 2 has been deleted"
+
+        with pytest.raises(ValueError) as excinfo:
+            settle_battle(1, 999)
+        assert str(excinfo.value) == "Meal with ID 999 not found"
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT SUM(battles), SUM(wins) FROM meals")
+        assert cursor.fetchone() == (0, 0), "No stats should be recorded for an invalid battle"
+
+    conn.close()
+
+#def test_get_meals_by_ids():
+def test_get_meals_by_ids():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE meals (
+            id INTEGER PRIMARY KEY,
+            meal TEXT NOT NULL,
+            cuisine TEXT NOT NULL,
+            price REAL NOT NULL,
+            difficulty TEXT NOT NULL,
+            battles INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
+        );
+    """)
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (1, 'Pasta', 'Italian', 12.99, 'MED')")
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (2, 'Sushi', 'Japanese', 15.00, 'HIGH')")
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty, deleted) VALUES (3, 'Tacos', 'Mexican', 8.50, 'LOW', TRUE)")
+    conn.commit()
+
+    with patch('meal_max.models.kitchen_model.get_db_connection', return_value=conn):
+        meals = get_meals_by_ids([2, 1])
+        assert [meal.meal for meal in meals] == ["Sushi", "Pasta"], "Meals should come back in the requested order"
+
+        with pytest.raises(ValueError, match="Meal with ID 3 has been deleted"):
+            get_meals_by_ids([1, 3])
+
+        with pytest.raises(ValueError, match="Meal with ID 999 not found"):
+            get_meals_by_ids([1, 999])
+
+    conn.close()
+
+#def test_settle_battles():
+def test_settle_battles():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE meals (
+            id INTEGER PRIMARY KEY,
+            meal TEXT NOT NULL,
+            cuisine TEXT NOT NULL,
+            price REAL NOT NULL,
+            difficulty TEXT NOT NULL,
+            battles INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
+        );
+    """)
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (1, 'Pasta', 'Italian', 12.99, 'MED')")
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (2, 'Sushi', 'Japanese', 15.00, 'HIGH')")
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (3, 'Tacos', 'Mexican', 8.50, 'LOW')")
+    conn.commit()
+
+    with patch('meal_max.models.kitchen_model.get_db_connection', return_value=conn):
+        settle_battles([(1, 2), (1, 3), (3, 2)])
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, battles, wins FROM meals ORDER BY id")
+        assert cursor.fetchall() == [(1, 2, 2), (2, 2, 0), (3, 2, 1)], "Every battle should be recorded"
+        assert not conn.in_transaction, "Battles should be committed together"
+
+        with pytest.raises(ValueError, match="Meal with ID 999 not found"):
+            settle_battles([(1, 2), (999, 3)])
+
+        cursor.execute("SELECT SUM(battles), SUM(wins) FROM meals")
+        assert cursor.fetchone() == (6, 3), "No stats should be recorded when any battle is invalid"
+
+    conn.close()
+
+#def test_get_leaderboard_cache():
+def test_get_leaderboard_cache(meal_db_file):
+    settle_battles([(1, 2), (1, 3), (3, 2)])
+
+    assert [meal['id'] for meal in get_leaderboard("wins")] == [1, 3, 2]
+    assert [meal['id'] for meal in get_leaderboard("win_pct", limit=1, offset=1)] == [3]
+
+    settle_battle(2, 1)
+    assert [meal['wins'] for meal in get_leaderboard("wins")] == [2, 1, 1]
+    stats = kitchen_model.get_leaderboard_cache_stats()
+    assert stats["rebuilds"] == 1, "Our own writes should be applied without a rebuild"
+    assert stats["updates"] == 1
+
+    kitchen_model.delete_meal(1)
+    assert [meal['id'] for meal in get_leaderboard("wins")] == [2, 3]
+    assert kitchen_model.get_leaderboard_cache_stats()["rebuilds"] == 1
+
+#def test_get_leaderboard_cache_external_write():
+def test_get_leaderboard_cache_external_write(meal_db_file):
+    settle_battle(1, 2)
+    assert [meal['id'] for meal in get_leaderboard("wins")] == [1, 2]
+
+    conn = sqlite3.connect(meal_db_file)
+    conn.execute("UPDATE meals SET battles = 5, wins = 5 WHERE id = 3")
+    conn.commit()
+    conn.close()
+
+    assert [meal['id'] for meal in get_leaderboard("wins")] == [3, 1, 2], "A write from another connection should trigger a rebuild"
+    assert kitchen_model.get_leaderboard_cache_stats()["rebuilds"] == 2
+
+    kitchen_model.clear_meals()
+    assert get_leaderboard("wins") == []
+
+#def test_get_leaderboard_cache_external_write_during_write():
+def test_get_leaderboard_cache_external_write_during_write(meal_db_file, mocker):
+    settle_battle(1, 2)
+    assert [meal['id'] for meal in get_leaderboard("wins")] == [1, 2]
+    connect = kitchen_model.get_db_connection
+
+    @contextmanager
+    def connect_after_external_write():
+        conn = sqlite3.connect(meal_db_file)
+        conn.execute("UPDATE meals SET battles = 5, wins = 5 WHERE id = 3")
+        conn.commit()
+        conn.close()
+        with connect() as pooled:
+            yield pooled
+
+    mocker.patch.object(kitchen_model, "get_db_connection", connect_after_external_write)
+    settle_battle(1, 2)
+    mocker.stopall()
+
+    assert [meal['id'] for meal in get_leaderboard("wins")] == [3, 1, 2], "A write from another connection should not be taken for ours"
+    assert kitchen_model.get_leaderboard_cache_stats()["rebuilds"] == 2
+
+#def test_get_leaderboard_rating():
+def test_get_leaderboard_rating(meal_db_file, monkeypatch):
+    settle_battles([(1, 2), (1, 3), (3, 2)])
+
+    leaderboard = get_leaderboard("rating")
+    assert [meal['id'] for meal in leaderboard] == [1, 3, 2]
+    assert sum(meal['rating'] for meal in leaderboard) == pytest.approx(3 * 1500.0), "Elo should conserve rating points"
+    cursor = kitchen_model.leaderboard_cursor("rating", leaderboard[0])
+    assert kitchen_model.parse_leaderboard_cursor("rating", kitchen_model.format_leaderboard_cursor(cursor)) == cursor
+
+    # The uncached query must agree with the cache
+    monkeypatch.setattr(kitchen_model, "get_meal_changes", lambda: None)
+    assert get_leaderboard("rating") == leaderboard
+    assert [meal['id'] for meal in get_leaderboard("rating", after=cursor)] == [3, 2]
+
+#def test_recompute_ratings():
+def test_recompute_ratings(meal_db_file):
+    settle_battles([(1, 2), (1, 3)])
+    settle_battle(3, 2)
+    ratings = {meal['id']: meal['rating'] for meal in get_leaderboard("rating")}
+
+    assert kitchen_model.recompute_ratings([(1, 2), (1, 3), (3, 2)]) == 3
+    assert {meal['id']: meal['rating'] for meal in get_leaderboard("rating")} == pytest.approx(ratings), \
+        "Replaying the same battles should give the same ratings"
+
+    kitchen_model.recompute_ratings([(2, 1)])
+    assert [(meal['id'], meal['rating']) for meal in get_leaderboard("rating")] == [(2, 1516.0), (3, 1500.0), (1, 1484.0)]
+
+#def test_update_meal_stats_write_behind():
+def test_update_meal_stats_write_behind(meal_db_file, monkeypatch):
+    monkeypatch.setattr(kitchen_model, "STATS_WRITE_BEHIND", True)
+    kitchen_model.settle_battle(1, 2)
+    conn = sqlite3.connect(meal_db_file)
+    assert conn.execute("SELECT battles, wins, rating FROM meals WHERE id = 1").fetchone() == (0, 0, 1500.0), \
+        "Battles should wait in memory too"
+    assert kitchen_model.flush_meal_stats() == 2
+    update_meal_stats(1, 'win')
+    update_meal_stats(1, 'loss')
+    update_meal_stats(2, 'win')
+
+    assert conn.execute("SELECT battles, wins, rating FROM meals WHERE id = 1").fetchone() == (1, 1, 1516.0), \
+        "Stats should wait in memory"
+    assert [(meal['id'], meal['battles'], meal['wins']) for meal in get_leaderboard("wins")] == [(1, 3, 2), (2, 2, 1)], \
+        "Reads should include stats not written yet"
+
+    with pytest.raises(ValueError, match="Meal with ID 999 not found"):
+        update_meal_stats(999, 'win')
+    with pytest.raises(ValueError, match="Invalid result: draw"):
+        update_meal_stats(1, 'draw')
+
+    assert kitchen_model.flush_meal_stats() == 3
+    assert conn.execute("SELECT battles, wins, rating FROM meals WHERE id = 1").fetchone() == (3, 2, 1516.0)
+    conn.close()
+    assert [(meal['id'], meal['battles']) for meal in get_leaderboard("wins")] == [(1, 3), (2, 2)]
+    stats = kitchen_model.get_meal_stats_counter_stats()
+    assert (stats["enabled"], stats["flushed_events"], stats["pending_events"]) == (True, 5, 0)
+    assert kitchen_model.get_leaderboard_cache_stats()["rebuilds"] == 1, "A flush should update the cache, not drop it"
+
+#def test_settle_battles_write_behind():
+def test_settle_battles_write_behind(meal_db_file, monkeypatch):
+    results = [(1, 2), (1, 3), (3, 2)]
+    settle_battles(results[:2])
+    settle_battle(*results[2])
+    written = {meal['id']: (meal['battles'], meal['wins']) for meal in get_leaderboard("wins")}
+    ratings = {meal['id']: meal['rating'] for meal in get_leaderboard("wins")}
+    kitchen_model.clear_meals()
+    for meal in ("Pasta", "Sushi", "Tacos"):
+        kitchen_model.create_meal(meal, "Italian", 10.0, "MED")
+
+    monkeypatch.setattr(kitchen_model, "STATS_WRITE_BEHIND", True)
+    settle_battles(results[:2])
+    settle_battle(*results[2])
+    assert kitchen_model.get_meal_stats_counter_stats()["pending_events"] == 5, "Battles should be queued, not written"
+    assert get_leaderboard("wins") == [], "Meals with no written battles stay off the board until a flush"
+
+    with pytest.raises(ValueError, match="Meal with ID 999 not found"):
+        settle_battle(1, 999)
+    kitchen_model.flush_meal_stats()
+    assert {meal['id']: (meal['battles'], meal['wins']) for meal in get_leaderboard("wins")} == written
+    assert {meal['id']: meal['rating'] for meal in get_leaderboard("wins")} == pytest.approx(ratings), \
+        "Queued ratings should add up to the ratings settled one transaction at a time"
+
+#def test_get_leaderboard_invalid_page():
+def test_get_leaderboard_invalid_page():
+    with pytest.raises(ValueError, match="Invalid limit: -1"):
+        get_leaderboard("wins", limit=-1)
+    with pytest.raises(ValueError, match="Invalid offset: -1"):
+        get_leaderboard("wins", offset=-1)
+
+#def test_import_meals():
+def test_import_meals(meal_db_file):
+    records = [
+        (1, {'meal': 'Ramen', 'cuisine': 'Japanese', 'price': '9.50', 'difficulty': 'MED'}),
+        (2, {'meal': 'Pasta', 'cuisine': 'Italian', 'price': 10, 'difficulty': 'LOW'}),
+        (3, {'meal': 'Curry', 'cuisine': 'Indian', 'price': -1, 'difficulty': 'MED'}),
+        (4, ValueError("Invalid JSON")),
+        (5, {'meal': 'Pho', 'cuisine': 'Vietnamese', 'price': 8.0, 'difficulty': 'EASY'}),
+        (6, {'meal': 'Ramen', 'cuisine': 'Japanese', 'price': 9.5, 'difficulty': 'MED'}),
+        (7, {'meal': 'Pho', 'cuisine': 'Vietnamese', 'price': 8.0, 'difficulty': 'LOW'}),
+    ]
+
+    summary = kitchen_model.import_meals(records, chunk_size=2)
+
+    assert summary['imported'] == 2
+    assert summary['failed'] == 5
+    assert summary['errors'] == [
+        {'row': 2, 'error': "Meal with name 'Pasta' already exists"},
+        {'row': 3, 'error': "Invalid price: -1.0. Price must be a positive number."},
+        {'row': 4, 'error': "Invalid JSON"},
+        {'row': 5, 'error': "Invalid difficulty level: EASY. Must be 'LOW', 'MED', or 'HIGH'."},
+        {'row': 6, 'error': "Meal with name 'Ramen' already exists"},
+    ]
+    assert get_meal_by_name("Ramen").price == 9.5
+    assert get_meal_by_name("Pho").difficulty == "LOW"
+
+#def test_get_leaderboard_keyset():
+def test_get_leaderboard_keyset(meal_db_file, monkeypatch):
+    settle_battles([(1, 2), (1, 3), (3, 2)])
+    cursor = kitchen_model.leaderboard_cursor("wins", get_leaderboard("wins", limit=1)[0])
+
+    assert cursor == (2, 1)
+    assert [meal['id'] for meal in get_leaderboard("wins", after=cursor)] == [3, 2]
+    assert [meal['id'] for meal in kitchen_model.iter_leaderboard("win_pct", batch_size=1)] == [1, 3, 2]
+    assert [meal['id'] for meal in kitchen_model.iter_leaderboard("win_pct", limit=2, offset=1, batch_size=1)] == [3, 2]
+    assert [meal['id'] for meal in kitchen_model.iter_leaderboard("wins", limit=1)] == [1]
+
+    # The uncached query must page the same way
+    monkeypatch.setattr(kitchen_model, "get_meal_changes", lambda: None)
+    assert [meal['id'] for meal in get_leaderboard("wins", after=cursor)] == [3, 2]
+    assert [meal['id'] for meal in get_leaderboard("win_pct", after=(0.5, 3))] == [2]
+
+#def test_parse_leaderboard_cursor():
+def test_parse_leaderboard_cursor():
+    assert kitchen_model.parse_leaderboard_cursor("wins", "12,7") == (12, 7)
+    assert kitchen_model.parse_leaderboard_cursor("win_pct", kitchen_model.format_leaderboard_cursor((2 / 3, 7))) == (2 / 3, 7)
+    with pytest.raises(ValueError, match="Invalid cursor: 12"):
+        kitchen_model.parse_leaderboard_cursor("wins", "12")
+
+#def test_meal_cache():
+def test_meal_cache(meal_db_file):
+    meal = get_meal_by_id(1)
+
+    assert get_meal_by_id(1) is meal
+    assert get_meal_by_name("Pasta") is meal
+    stats = kitchen_model.get_meal_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+    settle_battle(1, 2)
+    assert get_meal_by_id(1) is meal, "Battle stats are not part of a meal"
+
+    delete_meal(1)
+    with pytest.raises(ValueError, match="Meal with ID 1 has been deleted"):
+        get_meal_by_id(1)
+    with pytest.raises(ValueError, match="Meal with name Pasta has been deleted"):
+        get_meal_by_name("Pasta")
+
+#def test_meal_cache_external_write():
+def test_meal_cache_external_write(meal_db_file):
+    assert get_meal_by_name("Sushi").price == 15.0
+
+    conn = sqlite3.connect(meal_db_file)
+    conn.execute("UPDATE meals SET price = 16.0 WHERE id = 2")
+    conn.commit()
+    conn.close()
+
+    assert get_meal_by_name("Sushi").price == 16.0, "A write from another connection should clear the cache"
+    assert kitchen_model.get_meal_cache_stats()["invalidations"] == 1
+
+#def test_meal_cache_external_write_during_write():
+def test_meal_cache_external_write_during_write(meal_db_file, mocker):
+    assert get_meal_by_id(3).meal == "Tacos"
+    connect = kitchen_model.get_db_connection
+
+    @contextmanager
+    def connect_after_external_write():
+        conn = sqlite3.connect(meal_db_file)
+        conn.execute("UPDATE meals SET deleted = TRUE WHERE id = 3")
+        conn.commit()
+        conn.close()
+        with connect() as pooled:
+            yield pooled
+
+    mocker.patch.object(kitchen_model, "get_db_connection", connect_after_external_write)
+    create_meal("Curry", "Indian", 11.00, "MED")
+    mocker.stopall()
+
+    with pytest.raises(ValueError, match="Meal with ID 3 has been deleted"):
+        get_meal_by_id(3)
+
+#def test_get_meal_changes():
+def test_get_meal_changes(meal_db_file):
+    changes = sql_utils.get_meal_changes()
+    conn = sqlite3.connect(meal_db_file)
+    conn.execute("INSERT INTO battle_pairs VALUES (1, 2, 1, 1)")
+    conn.commit()
+    assert sql_utils.get_meal_changes() == changes, "Writes to other tables should not count"
+
+    conn.execute("UPDATE meals SET price = 16.0 WHERE id IN (2, 3)")
+    conn.commit()
+    conn.close()
+    assert sql_utils.get_meal_changes() == changes + 2
+
+#def test_meal_from_row():
+def test_meal_from_row(meal_db_file):
+    meal = kitchen_model.meal_from_row((1, "Pasta", "Italian", 12.99, "MED", 0))
+
+    assert meal == Meal(1, "Pasta", "Italian", 12.99, "MED")
+    assert not hasattr(meal, "__dict__"), "Meals should be slotted"
+    with pytest.raises(AttributeError):
+        meal.price = 1.0
+    assert copy.copy(meal) == meal and pickle.loads(pickle.dumps(meal)) == meal
+
+    # Rows from the table are trusted, anything else is still validated
+    assert kitchen_model.meal_from_row((9, "Free", "Thai", -1.0, "LOW")).price == -1.0
+    with pytest.raises(ValueError, match="Price must be a positive value."):
+        Meal(9, "Free", "Thai", -1.0, "LOW")
+
+    conn = sqlite3.connect(meal_db_file)
+    conn.row_factory = kitchen_model.meal_row_factory
+    meals = conn.execute("SELECT id, meal, cuisine, price, difficulty FROM meals ORDER BY id").fetchall()
+    conn.close()
+    assert meals[:2] == [get_meal_by_id(1), get_meal_by_id(2)]
+
+#def test_get_group_leaderboard():
+def test_get_group_leaderboard(meal_db_file, monkeypatch):
+    create_meal("Pizza", "Italian", 10.0, "LOW")
+    pizza = get_meal_by_name("Pizza")
+    settle_battles([(1, 2), (1, 3), (pizza.id, 3), (2, pizza.id)])
+
+    cuisines = kitchen_model.get_group_leaderboard("cuisine")
+    assert [(group['cuisine'], group['battles'], group['wins']) for group in cuisines] == [
+        ("Italian", 4, 3), ("Japanese", 2, 1), ("Mexican", 2, 0)]
+    assert cuisines[0]['top_meal']['meal'] == "Pasta"
+    assert [group['difficulty'] for group in kitchen_model.get_group_leaderboard("difficulty", "win_pct")] == ["MED", "HIGH", "LOW"]
+
+    delete_meal(1)
+    assert kitchen_model.get_group_leaderboard("cuisine")[0]['top_meal']['meal'] == "Pizza"
+    assert kitchen_model.get_leaderboard_cache_stats()["rebuilds"] == 1, "Group boards should follow writes without a rebuild"
+
+    # The uncached roll-up must agree with the cache
+    monkeypatch.setattr(kitchen_model, "get_meal_changes", lambda: None)
+    assert kitchen_model.get_group_leaderboard("cuisine", "rating") == kitchen_model._leaderboard.groups("cuisine", "rating")
+    with pytest.raises(ValueError, match="Invalid group_by parameter: price"):
+        kitchen_model.get_group_leaderboard("price")
+
+#def test_search_meals():
+def test_search_meals(meal_db_file):
+    create_meal("Sushi Burrito", "Mexican", 11.0, "MED")
+    create_meal("Mexican Pizza", "Italian", 9.0, "LOW")
+
+    assert [meal.meal for meal in kitchen_model.search_meals("sushi")] == ["Sushi", "Sushi Burrito"]
+    assert [meal.meal for meal in kitchen_model.search_meals("mexican")] == ["Mexican Pizza", "Tacos", "Sushi Burrito"], \
+        "A match in the name should rank above one in the cuisine"
+    assert [meal.meal for meal in kitchen_model.search_meals("mexican", limit=1, offset=1)] == ["Tacos"]
+    assert kitchen_model.search_meals('burrito" (sushi*') == [get_meal_by_name("Sushi Burrito")]
+
+    # Autocomplete matches the start of the last word, in id order
+    assert [meal.meal for meal in kitchen_model.search_meals("su", prefix=True)] == ["Sushi", "Sushi Burrito"]
+    assert kitchen_model.search_meals("su", prefix=False) == []
+    with pytest.raises(ValueError, match="Search query must contain at least one word."):
+        kitchen_model.search_meals(" -*")
+
+#def test_search_meals_follows_writes():
+def test_search_meals_follows_writes(meal_db_file):
+    delete_meal(2)
+    assert kitchen_model.search_meals("sushi") == [], "Deleted meals should not be found"
+
+    conn = sqlite3.connect(meal_db_file)
+    conn.execute("UPDATE meals SET meal = 'Lasagna' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert kitchen_model.search_meals("pasta") == []
+    assert [meal.id for meal in kitchen_model.search_meals("lasag", prefix=True)] == [1]
+
+    update_meal_stats(1, "win")
+    kitchen_model.clear_meals()
+    assert kitchen_model.search_meals("lasagna") == []
+
+#def test_search_meals_rank_window():
+def test_search_meals_rank_window(meal_db_file, monkeypatch):
+    create_meal("Mexican Pizza", "Italian", 9.0, "LOW")
+    monkeypatch.setattr(kitchen_model, "SEARCH_RANK_WINDOW", 1)
+
+    assert [meal.meal for meal in kitchen_model.search_meals("mexican")] == ["Tacos"], \
+        "Only the first matches by id should be ranked"
+
+#def test_get_meals_version():
+def test_get_meals_version(meal_db_file, monkeypatch):
+    version = kitchen_model.get_meals_version()
+    assert kitchen_model.get_meals_version() == version, "The version should hold without writes"
+
+    settle_battle(1, 2)
+    assert kitchen_model.get_meals_version() != version
+    version = kitchen_model.get_meals_version()
+
+    # Queued stats show up in reads before they are written, so they move the version too
+    monkeypatch.setattr(kitchen_model, "STATS_WRITE_BEHIND", True)
+    update_meal_stats(1, "win")
+    assert kitchen_model.get_meals_version() != version
@@ -0,0 +1,81 @@
+import pytest
+from meal_max.utils.leaderboard_cache import LeaderboardCache
+
+def row(meal_id, battles, wins, deleted=False, rating=1500.0): #Making leaderboard rows for testing
+    return (meal_id, f"Meal {meal_id}", "Italian", 10.0, "MED", battles, wins, deleted, rating)
+
+@pytest.fixture
+def cache():
+    """Fixture for a cache built at data version 1."""
+    cache = LeaderboardCache()
+    cache.rebuild([row(1, 4, 1), row(2, 2, 2), row(3, 10, 3), row(4, 0, 0), row(5, 3, 3, deleted=True)], version=1)
+    return cache
+
+def test_orderings(cache): #Test that both orderings skip meals without battles and deleted meals
+    assert [meal['id'] for meal in cache.get("wins", None, 0, version=1)] == [3, 2, 1]
+    assert [meal['id'] for meal in cache.get("win_pct", None, 0, version=1)] == [2, 3, 1]
+    assert cache.get("win_pct", None, 0, version=1)[0]['win_pct'] == 100.0
+
+def test_pagination(cache): #Test that limit and offset slice the ordering
+    assert [meal['id'] for meal in cache.get("wins", 2, 0, version=1)] == [3, 2]
+    assert [meal['id'] for meal in cache.get("wins", 2, 2, version=1)] == [1]
+    assert cache.get("wins", 0, 0, version=1) == []
+
+def test_stale_version_misses(cache): #Test that a different data version or an expired build is a miss
+    assert cache.get("wins", None, 0, version=2) is None
+
+    cache.ttl = 0
+    assert cache.get("wins", None, 0, version=1) is None
+    assert cache.stats()["misses"] == 2
+
+def test_apply_updates_incrementally(cache): #Test that a write acknowledged from the cached version is applied
+    cache.apply(1, 2, rows=[row(1, 6, 5), row(4, 1, 0)], removed=[2])
+
+    assert [meal['id'] for meal in cache.get("wins", None, 0, version=2)] == [1, 3, 4]
+    assert cache.stats()["updates"] == 1
+
+def test_apply_after_concurrent_change_invalidates(cache): #Test that a write from an unknown version drops the cache
+    cache.apply(5, 6, rows=[row(1, 6, 5)])
+
+    assert cache.get("wins", None, 0, version=6) is None
+    assert not cache.stats()["valid"]
+
+def test_apply_clear(cache): #Test that clearing empties every ordering
+    cache.apply(1, 2, cleared=True)
+
+    assert cache.get("wins", None, 0, version=2) == []
+    assert cache.get("win_pct", None, 0, version=2) == []
+
+def test_keyset_pagination(cache): #Test that a cursor continues right after the given meal
+    assert [meal['id'] for meal in cache.get("wins", None, 0, version=1, after=(3, 3))] == [2, 1]
+    assert [meal['id'] for meal in cache.get("wins", 1, 0, version=1, after=(2, 2))] == [1]
+    assert [meal['id'] for meal in cache.get("win_pct", None, 0, version=1, after=(1.0, 2))] == [3, 1]
+
+def group_row(meal_id, cuisine, difficulty, battles, wins, rating=1500.0): #Making leaderboard rows in a given group
+    return (meal_id, f"Meal {meal_id}", cuisine, 10.0, difficulty, battles, wins, False, rating)
+
+def test_groups(): #Test that groups roll up their meals' totals and rank by the same keys as meals
+    cache = LeaderboardCache()
+    cache.rebuild([group_row(1, "Italian", "MED", 4, 3, 1540.0), group_row(2, "Italian", "LOW", 2, 0, 1480.0),
+                   group_row(3, "Thai", "MED", 2, 2, 1530.0), group_row(4, "Thai", "LOW", 0, 0)], version=1)
+
+    italian, thai = cache.get_groups("cuisine", "wins", version=1)
+    assert italian == {'cuisine': 'Italian', 'meals': 2, 'battles': 6, 'wins': 3, 'win_pct': 50.0, 'rating': 1510.0,
+                       'top_meal': cache.get("wins", 1, 0, version=1)[0]}
+    assert (thai['meals'], thai['top_meal']['id']) == (1, 3)
+    assert [group['cuisine'] for group in cache.groups("cuisine", "win_pct")] == ["Thai", "Italian"]
+    assert [group['difficulty'] for group in cache.groups("difficulty", "rating")] == ["MED", "LOW"]
+    assert cache.get_groups("cuisine", "wins", version=2) is None
+
+def test_groups_follow_writes(): #Test that applied writes move meals between groups and drop empty groups
+    cache = LeaderboardCache()
+    cache.rebuild([group_row(1, "Italian", "MED", 4, 3), group_row(2, "Thai", "LOW", 2, 1)], version=1)
+
+    cache.apply(1, 2, rows=[group_row(2, "Italian", "LOW", 6, 5)])
+    [italian] = cache.groups("cuisine", "wins")
+    assert (italian['meals'], italian['battles'], italian['wins'], italian['top_meal']['id']) == (2, 10, 8, 2)
+
+    cache.apply(2, 3, removed=[2])
+    assert [(group['difficulty'], group['wins']) for group in cache.groups("difficulty", "wins")] == [("MED", 3)]
+    cache.apply(3, 4, cleared=True)
+    assert cache.groups("cuisine", "wins") == []
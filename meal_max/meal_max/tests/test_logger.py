@@ -0,0 +1,46 @@
+import logging
+import pytest
+from unittest.mock import patch
+from meal_max.utils import logger as logger_utils
+from meal_max.utils.logger import RateLimitFilter, configure_logger, get_log_level, stop_logging
+
+def make_record(level=logging.INFO, lineno=10): #Making log records from one call site for testing
+    return logging.makeLogRecord({"name": "meal_max.test", "levelno": level, "pathname": "test.py",
+                                  "lineno": lineno, "msg": "Score for %s", "args": ("Pasta",)})
+
+def test_configure_logger_idempotent(): #Test that configuring a logger twice attaches one handler
+    logger = logging.getLogger("meal_max.tests.idempotent")
+    configure_logger(logger)
+    configure_logger(logger)
+
+    assert len(logger.handlers) == 1
+
+def test_records_written_by_listener(capsys): #Test that records reach stderr once the queue is flushed
+    stop_logging()
+    logger = logging.getLogger("meal_max.tests.listener")
+    configure_logger(logger)
+    logger.info("Battle started between %s and %s", "Pasta", "Sushi")
+    stop_logging()
+
+    assert "meal_max.tests.listener - INFO - Battle started between Pasta and Sushi" in capsys.readouterr().err
+
+def test_get_log_level(monkeypatch): #Test that the longest matching module prefix wins
+    monkeypatch.setattr(logger_utils, "LOG_LEVEL", "info")
+    monkeypatch.setattr(logger_utils, "LOG_LEVELS", "meal_max=WARNING, meal_max.models.battle_model=ERROR")
+
+    assert get_log_level("meal_max.models.battle_model") == "ERROR"
+    assert get_log_level("meal_max.models.kitchen_model") == "WARNING"
+    assert get_log_level("meal_max_other") == "INFO"
+
+def test_rate_limit_filter(): #Test that records past the rate are dropped and counted
+    rate_filter = RateLimitFilter(rate=2)
+
+    with patch("meal_max.utils.logger.time.monotonic", return_value=100.0):
+        assert [rate_filter.filter(make_record()) for _ in range(5)] == [True, True, False, False, False]
+        assert rate_filter.filter(make_record(lineno=11)), "Other call sites have their own budget"
+        assert rate_filter.filter(make_record(level=logging.WARNING)), "Warnings should never be dropped"
+
+    record = make_record()
+    with patch("meal_max.utils.logger.time.monotonic", return_value=101.0):
+        assert rate_filter.filter(record)
+    assert record.getMessage() == "Score for Pasta (3 similar messages suppressed)"
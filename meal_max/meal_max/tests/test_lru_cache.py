@@ -0,0 +1,59 @@
+import pytest
+from meal_max.utils.lru_cache import VersionedLRUCache
+
+@pytest.fixture
+def cache():
+    """Fixture for a three-entry cache holding two keys at data version 1."""
+    cache = VersionedLRUCache(maxsize=3, ttl=60)
+    cache.put(["a", "A"], "apple", version=1)
+    return cache
+
+def test_get(cache): #Test that every key of a value hits and unknown keys miss
+    assert cache.get("a", version=1) == "apple"
+    assert cache.get("A", version=1) == "apple"
+    assert cache.get("b", version=1) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 2)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+def test_lru_eviction(cache): #Test that the least recently used entry is evicted first
+    cache.get("a", version=1)
+    cache.put(["b", "c"], "banana", version=1)
+
+    assert cache.peek("A") is None
+    assert cache.peek("a") == "apple"
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expiry(cache): #Test that expired entries are misses
+    cache.ttl = -1
+    cache.put(["b"], "banana", version=1)
+
+    assert cache.get("b", version=1) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_version_change_clears(cache): #Test that a read at another data version drops every entry
+    assert cache.get("a", version=2) is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+    cache.put(["b"], "banana", version=1)
+    assert cache.peek("b") is None, "A value read at an older version should not be cached"
+
+def test_apply(cache): #Test that an acknowledged write drops only its keys and moves the version
+    cache.apply(1, 2, keys=["A"])
+
+    assert cache.get("a", version=2) == "apple"
+    assert cache.get("A", version=2) is None
+
+def test_apply_after_concurrent_change(cache): #Test that a write from an unknown version or a clear drops everything
+    cache.apply(5, 6, keys=["A"])
+    assert cache.peek("a") is None
+
+    cache.put(["a"], "apple", version=6)
+    cache.apply(6, 7, cleared=True)
+    assert cache.peek("a") is None
+
+def test_invalid_size():
+    with pytest.raises(ValueError, match="Invalid cache size: 0"):
+        VersionedLRUCache(maxsize=0, ttl=60)
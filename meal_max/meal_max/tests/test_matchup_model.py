@@ -0,0 +1,112 @@
+import pytest
+import sqlite3
+import numpy as np
+from unittest.mock import patch
+from meal_max.models.battle_model import BattleModel
+from meal_max.models.kitchen_model import Meal
+from meal_max.models.matchup_model import (
+    expected_win_rates,
+    first_seat_win_probability,
+    get_meal_matchups,
+    rows_per_chunk,
+    simulate_battles
+)
+
+@pytest.fixture
+def meals():
+    """Fixture to create sample meals, including two whose scores differ by a float-rounded 49."""
+    return [
+        Meal(id=1, meal="Pasta", cuisine="Italian", price=12.99, difficulty="MED"),
+        Meal(id=2, meal="Pizza", cuisine="Italian", price=5.99, difficulty="MED"),
+        Meal(id=3, meal="Sushi", cuisine="Japanese", price=15.0, difficulty="HIGH"),
+        Meal(id=4, meal="Tacos", cuisine="Mexican", price=8.5, difficulty="LOW"),
+    ]
+
+@pytest.fixture
+def meal_db(meals):
+    """Fixture for an in-memory meals table holding the sample meals and one deleted meal."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE meals (
+            id INTEGER PRIMARY KEY,
+            meal TEXT NOT NULL,
+            cuisine TEXT NOT NULL,
+            price REAL NOT NULL,
+            difficulty TEXT NOT NULL,
+            battles INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            rating REAL NOT NULL DEFAULT 1500
+        );
+    """)
+    conn.executemany("INSERT INTO meals (id, meal, cuisine, price, difficulty) VALUES (?, ?, ?, ?, ?)",
+                     [(meal.id, meal.meal, meal.cuisine, meal.price, meal.difficulty) for meal in meals])
+    conn.execute("INSERT INTO meals (id, meal, cuisine, price, difficulty, deleted) VALUES (5, 'Curry', 'Indian', 11.0, 'MED', TRUE)")
+    conn.commit()
+    with patch('meal_max.models.matchup_model.get_db_connection', return_value=conn):
+        yield conn
+    conn.close()
+
+def test_probability_matches_battle_model(meals): #Test the closed form against every draw BattleModel.decide can make
+    battle_model = BattleModel()
+    scores = np.array([battle_model.get_battle_score(meal) for meal in meals])
+    matrix = first_seat_win_probability(scores, scores)
+
+    for i, meal_1 in enumerate(meals):
+        for j, meal_2 in enumerate(meals):
+            if i == j:
+                continue
+            wins = 0
+            for draw in range(100):
+                winner, _, _ = battle_model.decide(meal_1, meal_2, draw / 100)
+                wins += winner is meal_1
+            assert matrix[i, j] == wins / 100, f"Mismatch for {meal_1.meal} against {meal_2.meal}"
+
+def test_expected_win_rates_in_chunks(): #Test that a one-row budget gives the same rates as one pass
+    scores = np.random.default_rng(0).uniform(0, 300, 50)
+    full = first_seat_win_probability(scores, scores).sum(axis=1) / 49
+
+    assert rows_per_chunk(50, memory_budget_mb=0) == 1
+    assert np.allclose(expected_win_rates(scores, memory_budget_mb=0), full)
+    assert np.allclose(expected_win_rates(scores), full)
+
+def test_simulate_battles(): #Test that the simulation is reproducible and every battle has one winner
+    scores = np.array([10.0, 50.0, 90.0])
+
+    wins, played = simulate_battles(scores, 250_001, seed=7)
+    again, _ = simulate_battles(scores, 250_001, seed=7)
+
+    assert wins.sum() == 250_001
+    assert played.sum() == 2 * 250_001
+    assert (wins == again).all()
+
+def test_get_meal_matchups(meal_db): #Test the matchup analysis of the live meals
+    result = get_meal_matchups(battles=1000, seed=1, meal_ids=[3, 1])
+
+    assert result['meals'] == 4
+    assert result['pairs'] == 12
+    assert {matchup['id'] for matchup in result['matchups']} == {1, 2, 3, 4}
+    for matchup in result['matchups']:
+        assert matchup['win_pct_as_first'] + matchup['win_pct_as_second'] == pytest.approx(100.0)
+    assert sum(standing['wins'] for standing in result['simulation']['standings']) == 1000
+    for standing in result['simulation']['standings']:
+        assert all(type(value) in (int, float, str) for value in standing.values()), "NumPy scalars should not leak"
+    for matchup in result['matchups']:
+        assert all(type(value) in (int, float, str) for value in matchup.values()), "NumPy scalars should not leak"
+    assert result['matrix']['meal_ids'] == [3, 1]
+    assert result['matrix']['win_probability'][0][0] == 0.0
+
+    cursor = meal_db.cursor()
+    cursor.execute("SELECT SUM(battles) FROM meals")
+    assert cursor.fetchone() == (0,), "The analysis should not record any battles"
+
+def test_get_meal_matchups_invalid(meal_db): #Test that unknown or deleted meals and bad counts are rejected
+    with pytest.raises(ValueError, match="Meal with ID 5 not found"):
+        get_meal_matchups(meal_ids=[1, 5])
+
+    with pytest.raises(ValueError, match="Invalid number of battles: -1"):
+        get_meal_matchups(battles=-1)
+
+    meal_db.execute("UPDATE meals SET deleted = TRUE WHERE id > 1")
+    with pytest.raises(ValueError, match="At least two meals are needed for matchups."):
+        get_meal_matchups()
@@ -0,0 +1,116 @@
+"""Runs every query kitchen_model issues through EXPLAIN QUERY PLAN against the deployed schema."""
+from contextlib import contextmanager
+import re
+import sqlite3
+
+import pytest
+
+from meal_max.models import history_model, kitchen_model
+
+
+# a full pass over the table, or a sort the indexes should have made unnecessary
+FORBIDDEN_PLAN = re.compile(r"^SCAN meals$|USE TEMP B-TREE")
+
+# statements whose plans are checked
+PLANNED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+@pytest.fixture
+def captured_sql(meal_db_file, monkeypatch):
+    """Fixture recording every statement kitchen_model runs on a pooled connection."""
+    statements = []
+    get_db_connection = kitchen_model.get_db_connection
+
+    @contextmanager
+    def traced_connection():
+        with get_db_connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                yield conn
+            finally:
+                conn.set_trace_callback(None)
+
+    monkeypatch.setattr(kitchen_model, "get_db_connection", traced_connection)
+    return statements
+
+def exercise_kitchen_model(monkeypatch):
+    """Calls every read and write path of kitchen_model once."""
+    kitchen_model.create_meal("Curry", "Indian", 11.0, "MED")
+    kitchen_model.import_meals([(1, {"meal": "Ramen", "cuisine": "Japanese", "price": 9.5, "difficulty": "MED"}),
+                                (2, {"meal": "Curry", "cuisine": "Indian", "price": 11.0, "difficulty": "MED"})])
+    kitchen_model.get_meal_by_id(1)
+    kitchen_model.get_meal_by_name("Sushi")
+    kitchen_model.get_meals_by_ids([1, 2, 3])
+    kitchen_model.search_meals("sushi")
+    kitchen_model.search_meals("su", prefix=True)
+    kitchen_model.update_meal_stats(1, "win")
+    kitchen_model.update_meal_stats(2, "loss")
+    kitchen_model.settle_battles([(1, 2), (3, 4)])
+    kitchen_model.delete_meal(4)
+    for sort_by in ("wins", "win_pct", "rating"):
+        kitchen_model.get_leaderboard(sort_by)
+    kitchen_model.get_group_leaderboard("cuisine")
+    kitchen_model.rebuild_leaderboard_cache()
+    # The uncached path runs when no data version can be read
+    monkeypatch.setattr(kitchen_model, "get_meal_changes", lambda: None)
+    for sort_by in ("wins", "win_pct", "rating"):
+        kitchen_model.get_leaderboard(sort_by, limit=2, offset=1)
+        kitchen_model.get_leaderboard(sort_by, limit=2, after=(1, 1))
+    kitchen_model.get_group_leaderboard("difficulty", "rating")
+
+def query_plan(db_path, statement):
+    conn = sqlite3.connect(db_path)
+    try:
+        # Older Pythons trace the statement with its placeholders still in place
+        rows = conn.execute("EXPLAIN QUERY PLAN " + statement, [None] * statement.count("?")).fetchall()
+    finally:
+        conn.close()
+    return [row[-1] for row in rows]
+
+def test_hot_queries_use_indexes(meal_db_file, captured_sql, monkeypatch):
+    """Test that no kitchen_model query scans the whole meals table or sorts in a temp B-tree."""
+    exercise_kitchen_model(monkeypatch)
+
+    planned = {statement.strip() for statement in captured_sql
+               if statement.lstrip().upper().startswith(PLANNED_STATEMENTS)}
+    assert any("ORDER BY win_pct" in statement for statement in planned), "Expected the uncached leaderboard to run"
+
+    regressions = {}
+    for statement in sorted(planned):
+        bad_steps = [step for step in query_plan(meal_db_file, statement) if FORBIDDEN_PLAN.search(step)]
+        if bad_steps:
+            regressions[statement] = bad_steps
+    assert not regressions, f"Queries regressed to a scan or temp sort: {regressions}"
+
+def test_leaderboard_uses_partial_indexes(meal_db_file):
+    """Test that each leaderboard ordering is read straight from its own partial index."""
+    base = "SELECT id FROM meals WHERE deleted = FALSE AND battles > 0"
+
+    assert query_plan(meal_db_file, base + " ORDER BY wins DESC, id") == [
+        "SCAN meals USING INDEX idx_meals_leaderboard_wins"]
+    assert query_plan(meal_db_file, base + " ORDER BY win_pct DESC, id") == [
+        "SCAN meals USING INDEX idx_meals_leaderboard_win_pct"]
+
+def test_history_queries_use_indexes(meal_db_file, monkeypatch):
+    """Test that the battle history reads seek into their indexes instead of scanning or sorting battles."""
+    statements = []
+    get_db_connection = history_model.get_db_connection
+
+    @contextmanager
+    def traced_connection():
+        with get_db_connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                yield conn
+            finally:
+                conn.set_trace_callback(None)
+
+    monkeypatch.setattr(history_model, "get_db_connection", traced_connection)
+    history_model.get_head_to_head(1, 2)
+    history_model.get_meal_battles(1, limit=10, before=100)
+
+    reads = [statement.strip() for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+    assert len(reads) == 3
+    for statement in reads:
+        plan = query_plan(meal_db_file, statement)
+        assert not [step for step in plan if re.search(r"^SCAN |USE TEMP B-TREE", step)], f"{statement}: {plan}"
@@ -1,35 +1,111 @@
+import asyncio
+
 import pytest
 import requests
 from unittest.mock import patch, Mock
-from meal_max.utils.random_utils import get_random #do I need to modify this path
+from meal_max.utils import random_utils
+from meal_max.utils.random_utils import RandomPool, fetch_random_numbers, get_random
+from meal_max.utils.random_stub import RandomOrgStub
 
-def test_get_random_success(): #Test that get_random returns a float when the response is valid
+def test_get_random_success(): #Test that fetch_random_numbers returns floats when the response is valid
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.text = '0.45\n'
 
     with patch('requests.get', return_value=mock_response):
-        result = get_random()
-        assert result == 0.45, "Expected the random number to be 0.45"
+        result = fetch_random_numbers(1)
+        assert result == [0.45], "Expected the random numbers to be [0.45]"
 
-def test_get_random_value_error(): #Test that get_random raises ValueError when response is not a valid float
+def test_get_random_value_error(): #Test that fetch_random_numbers raises ValueError when response is not a valid float
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.text = 'invalid_text'
 
     with patch('requests.get', return_value=mock_response):
         with pytest.raises(ValueError, match="Invalid response from random.org"):
-            get_random()
+            fetch_random_numbers(1)
 
-def test_get_random_timeout(): #Test that get_random raises RuntimeError on a timeout
+def test_get_random_timeout(): #Test that fetch_random_numbers raises RuntimeError on a timeout
     with patch('requests.get', side_effect=requests.exceptions.Timeout):
         with pytest.raises(RuntimeError, match="Request to random.org timed out"):
-            get_random()
+            fetch_random_numbers(1)
 
-def test_get_random_request_failure():  # Test that get_random raises RuntimeError on request failure
+def test_get_random_request_failure():  # Test that fetch_random_numbers raises RuntimeError on request failure
     # Mock the `requests.get` call to raise a general `RequestException`
     with patch('requests.get', side_effect=requests.exceptions.RequestException("Connection error")):
         with pytest.raises(RuntimeError, match="Request to random.org failed: Connection error"):
-            get_random()
+            fetch_random_numbers(1)
+
+@pytest.fixture
+def random_org_stub():
+    """Fixture running a local random.org stub for the duration of a test."""
+    stub = RandomOrgStub(seed=42).start()
+    yield stub
+    stub.stop()
+
+def test_pool_fetches_in_bulk(random_org_stub): #Test that one request fills the pool with a whole batch
+    pool = RandomPool(batch_size=50, low_water=0, fallback="none", background=False, base_url=random_org_stub.url)
+
+    values = [pool.get() for _ in range(50)]
+
+    assert random_org_stub.requests == 1, "Expected a single bulk request for the whole batch"
+    assert all(0 <= value < 1 for value in values)
+    assert pool.stats()["hits"] == 50
+
+def test_pool_refills_below_low_water(random_org_stub): #Test that dropping below the low-water mark triggers a refill
+    pool = RandomPool(batch_size=10, low_water=5, fallback="local", background=False, base_url=random_org_stub.url)
+    pool.refill()
+
+    for _ in range(6):
+        pool.get()
+
+    stats = pool.stats()
+    assert stats["refills"] == 2
+    assert stats["depth"] == 14
+    assert stats["last_refill_ms"] > 0
+
+def test_pool_falls_back_when_remote_is_down(random_org_stub): #Test that draws keep working while random.org fails
+    random_org_stub.fail = True
+    pool = RandomPool(batch_size=10, low_water=5, fallback="local", background=False, base_url=random_org_stub.url)
+
+    values = [pool.get() for _ in range(3)]
+
+    stats = pool.stats()
+    assert all(0 <= value < 1 for value in values)
+    assert stats["fallbacks"] == 3
+    assert stats["hit_rate"] == 0.0
+    assert stats["failed_refills"] == 1, "Expected failed refills to back off instead of retrying every draw"
+
+def test_pool_without_fallback_raises(random_org_stub): #Test that a disabled fallback surfaces random.org errors
+    random_org_stub.fail = True
+    pool = RandomPool(batch_size=10, fallback="none", background=False, base_url=random_org_stub.url)
+
+    with pytest.raises(RuntimeError, match="Request to random.org failed"):
+        pool.get()
+
+def test_get_random_uses_shared_pool(mocker): #Test that get_random draws from the process-wide pool
+    pool = RandomPool(batch_size=1, low_water=0, fallback="none", background=False)
+    pool._buffer.append(0.42)
+    mocker.patch.object(random_utils, "_pool", pool)
+
+    assert get_random() == 0.42
+    assert random_utils.get_random_pool_stats()["hits"] == 1
+
+def test_pool_async_draws_share_refills(random_org_stub): #Test that concurrent async draws on an empty pool share round trips
+    random_org_stub.latency = 0.05
+    pool = RandomPool(batch_size=1, low_water=0, fallback="none", background=False, base_url=random_org_stub.url)
+
+    async def draw_many():
+        return await asyncio.gather(*[pool.get_async() for _ in range(50)])
+
+    values = asyncio.run(draw_many())
+
+    assert len(values) == 50 and all(0 <= value < 1 for value in values)
+    assert random_org_stub.requests <= 3, "Expected waiting draws to share refills instead of one request each"
+
+def test_pool_async_draw_raises(random_org_stub): #Test that an async draw surfaces random.org errors when the fallback is disabled
+    random_org_stub.fail = True
+    pool = RandomPool(batch_size=10, fallback="none", background=False, base_url=random_org_stub.url)
 
-            
+    with pytest.raises(RuntimeError, match="Request to random.org failed"):
+        asyncio.run(pool.get_async())
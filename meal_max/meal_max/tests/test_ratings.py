@@ -0,0 +1,36 @@
+import random
+
+import pytest
+from meal_max.utils.ratings import INITIAL_RATING, expected_score, rate_battles, replay_ratings
+
+def test_expected_score(): #Test that equal ratings are a coin flip and a 400 point lead is 10 to 1
+    assert expected_score(1500, 1500) == 0.5
+    assert expected_score(1900, 1500) == pytest.approx(10 / 11)
+    assert expected_score(1500, 1900) + expected_score(1900, 1500) == pytest.approx(1.0)
+
+def test_rate_battles(): #Test that an even battle moves half the K-factor and points are conserved
+    ratings = rate_battles({1: 1500.0, 2: 1500.0}, [(1, 2)], k=32)
+
+    assert ratings == {1: 1516.0, 2: 1484.0}
+
+    rate_battles(ratings, [(2, 1)], k=32)
+    assert ratings[2] > 1500.0, "An upset should earn more than an even win"
+    assert ratings[1] + ratings[2] == pytest.approx(3000.0)
+
+def test_replay_ratings_matches_rate_battles(): #Test that the fast replay gives the same ratings as rating battle by battle
+    rng = random.Random(0)
+    results = []
+    for _ in range(2000):
+        winner_id, loser_id = rng.sample(range(1, 50), 2)
+        results.append((winner_id, loser_id))
+    ratings = {meal_id: INITIAL_RATING for pair in results for meal_id in pair}
+
+    expected = rate_battles(ratings, results)
+    replayed = replay_ratings(results)
+
+    assert replayed.keys() == expected.keys()
+    for meal_id, rating in expected.items():
+        assert replayed[meal_id] == pytest.approx(rating)
+
+def test_replay_ratings_empty(): #Test that replaying no battles rates no meals
+    assert replay_ratings([]) == {}
@@ -0,0 +1,116 @@
+import pytest
+from meal_max.models.battle_model import BattleModel
+from meal_max.models.history_model import BattleRecord
+from meal_max.models.kitchen_model import Meal
+from meal_max.models.tournament_model import TournamentModel
+
+def make_meals(count): #Making meals for testing; a higher price means a stronger meal
+    return [Meal(id=i, meal=f"Meal {i}", cuisine="Italian", price=float(i), difficulty="MED")
+            for i in range(1, count + 1)]
+
+def decided(winner, loser): #Making the result of BattleModel.decide for a mocked battle
+    return winner, loser, BattleRecord(winner.id, loser.id, 0.0, 0.0, 0.0, 0.0, winner.id, 0.0)
+
+@pytest.fixture
+def meals():
+    """Fixture to create eight sample entrants."""
+    return make_meals(8)
+
+@pytest.fixture
+def tournament_model(mocker, meals):
+    """Fixture to create a TournamentModel whose battles are won by the higher id."""
+    by_id = {meal.id: meal for meal in meals}
+    mocker.patch("meal_max.models.tournament_model.get_meals_by_ids",
+                 side_effect=lambda meal_ids: [by_id[meal_id] for meal_id in meal_ids])
+    mocker.patch("meal_max.models.tournament_model.settle_battles")
+    battle_model = BattleModel()
+    mocker.patch.object(battle_model, "decide",
+                        side_effect=lambda meal_1, meal_2: decided(meal_1, meal_2) if meal_1.id > meal_2.id else decided(meal_2, meal_1))
+    return TournamentModel(battle_model)
+
+def test_single_elimination(tournament_model, mocker): #Test the bracket, standings and one batched write
+    settle_battles = mocker.patch("meal_max.models.tournament_model.settle_battles")
+
+    tournament = tournament_model.run_tournament(list(range(1, 9)), "single_elimination")
+
+    assert tournament["champion"]["id"] == 8
+    assert len(tournament["rounds"]) == 3
+    assert tournament["battles"] == 7
+    assert [standing["rank"] for standing in tournament["standings"]] == [1, 2, 3, 3, 5, 5, 5, 5]
+    settle_battles.assert_called_once()
+    assert len(settle_battles.call_args[0][0]) == 7
+
+def test_single_elimination_with_bye(tournament_model): #Test that an odd field gives the last seed a bye
+    tournament = tournament_model.run_tournament([1, 2, 3], "single_elimination")
+
+    assert tournament["rounds"][0] == [
+        {"round": 1, "bracket": "winners", "meal_1": 1, "meal_2": 2, "winner": 2, "loser": 1}
+    ]
+    assert tournament["champion"]["id"] == 3
+    assert tournament["battles"] == 2
+
+def test_double_elimination(tournament_model): #Test that every meal but the champion loses twice
+    tournament = tournament_model.run_tournament(list(range(1, 9)), "double_elimination")
+
+    losses = {}
+    for matches in tournament["rounds"]:
+        for match in matches:
+            losses[match["loser"]] = losses.get(match["loser"], 0) + 1
+
+    assert tournament["champion"]["id"] == 8
+    assert 8 not in losses
+    assert all(count == 2 for count in losses.values())
+    assert len(tournament["standings"]) == 8
+
+def test_double_elimination_bracket_reset(mocker, meals): #Test that the losers bracket champion must win the final twice
+    by_id = {meal.id: meal for meal in meals}
+    mocker.patch("meal_max.models.tournament_model.get_meals_by_ids",
+                 side_effect=lambda meal_ids: [by_id[meal_id] for meal_id in meal_ids])
+    mocker.patch("meal_max.models.tournament_model.settle_battles")
+    battle_model = BattleModel()
+    # Meal 1 wins the first meeting, then meal 2 wins every meeting after that
+    meetings = []
+    def decide(meal_1, meal_2):
+        meetings.append(1)
+        if len(meetings) == 1:
+            return decided(meal_1, meal_2) if meal_1.id == 1 else decided(meal_2, meal_1)
+        return decided(meal_1, meal_2) if meal_1.id == 2 else decided(meal_2, meal_1)
+    mocker.patch.object(battle_model, "decide", side_effect=decide)
+
+    tournament = TournamentModel(battle_model).run_tournament([1, 2], "double_elimination")
+
+    assert [matches[0]["bracket"] for matches in tournament["rounds"]] == ["winners", "final", "final"]
+    assert tournament["champion"]["id"] == 2
+    assert tournament["battles"] == 3
+
+def test_round_robin(tournament_model): #Test that every pair meets exactly once
+    tournament = tournament_model.run_tournament([1, 2, 3, 4, 5], "round_robin")
+
+    pairs = [frozenset((match["meal_1"], match["meal_2"])) for matches in tournament["rounds"] for match in matches]
+    assert len(pairs) == 10
+    assert len(set(pairs)) == 10
+    assert tournament["champion"] == {"rank": 1, "id": 5, "meal": "Meal 5", "wins": 4, "losses": 0}
+
+def test_get_tournament(tournament_model): #Test that finished tournaments can be looked up by id
+    tournament = tournament_model.run_tournament([1, 2], "single_elimination")
+
+    assert tournament_model.get_tournament(tournament["id"]) is tournament
+    with pytest.raises(ValueError, match="Tournament with ID 999 not found"):
+        tournament_model.get_tournament(999)
+
+def test_tournament_history_is_bounded(tournament_model): #Test that only the latest tournaments are kept
+    tournament_model.max_history = 2
+    ids = [tournament_model.run_tournament([1, 2])["id"] for _ in range(3)]
+
+    assert list(tournament_model.tournaments) == ids[1:]
+
+def test_invalid_format(tournament_model): #Test that an unknown format is rejected
+    with pytest.raises(ValueError, match="Invalid tournament format: swiss"):
+        tournament_model.run_tournament([1, 2], "swiss")
+
+def test_invalid_entrants(tournament_model): #Test that duplicate or too few entrants are rejected
+    with pytest.raises(ValueError, match="Each meal can only enter a tournament once."):
+        tournament_model.run_tournament([1, 1, 2])
+
+    with pytest.raises(ValueError, match="A tournament needs at least two meals."):
+        tournament_model.run_tournament([1])
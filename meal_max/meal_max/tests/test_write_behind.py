@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from meal_max.utils.write_behind import WriteBehindCounters
+
+@pytest.fixture
+def written():
+    """Fixture collecting every map handed to the write callback."""
+    return []
+
+@pytest.fixture
+def counters(written):
+    """Fixture for two counters per key, flushed after ten events or a minute."""
+    return WriteBehindCounters(written.append, 2, flush_interval=60, max_events=10)
+
+def test_add_sums_per_key(counters, written): #Test that increments add up per key until a flush writes them at once
+    counters.add(1, 1, 1)
+    counters.add(1, 1, 0)
+    counters.add(2, 1, 0)
+
+    assert counters.pending(1) == (2, 1)
+    assert counters.pending(3) is None
+    assert counters.snapshot() == {1: (2, 1), 2: (1, 0)}
+    assert written == []
+
+    assert counters.flush() == 3
+    assert written == [{1: [2, 1], 2: [1, 0]}]
+    assert counters.pending(1) is None
+    assert counters.flush() == 0
+
+def test_flush_after_max_events(counters, written): #Test that the writer thread flushes once enough events are pending
+    for _ in range(10):
+        counters.add(1, 1, 0)
+
+    deadline = time.monotonic() + 5
+    while not written and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert written == [{1: [10, 0]}]
+    counters.close()
+
+def test_flush_after_interval(written): #Test that the writer thread flushes a lone event after the interval
+    counters = WriteBehindCounters(written.append, 1, flush_interval=0.01, max_events=1000)
+    counters.add("a", 1)
+
+    deadline = time.monotonic() + 5
+    while not written and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert written == [{"a": [1]}]
+    counters.close()
+
+def test_failed_write_is_merged_back(): #Test that a failed write keeps its increments for the next flush
+    attempts = []
+    def write(deltas):
+        attempts.append(dict(deltas))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+    counters = WriteBehindCounters(write, 1, flush_interval=60, max_events=100)
+    counters.add(1, 1)
+    counters.add(1, 1)
+
+    assert counters.flush() == 0
+    counters.add(1, 1)
+    assert counters.pending(1) == (3,)
+    assert counters.flush() == 3
+    assert attempts[-1] == {1: [3]}
+    stats = counters.stats()
+    assert (stats["failures"], stats["flushes"], stats["flushed_events"]) == (1, 1, 3)
+
+def test_close_flushes_and_discard_drops(counters, written): #Test that close writes pending events and discard drops them
+    counters.add(1, 1, 0)
+    counters.discard()
+    counters.add(2, 1, 1)
+    counters.close()
+
+    assert written == [{2: [1, 1]}]
+    assert counters.stats()["discarded_events"] == 1
@@ -0,0 +1,154 @@
+from datetime import datetime, timezone
+import functools
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import make_response, request
+
+from meal_max.utils.logger import configure_logger
+from meal_max.utils.metrics import increment
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# PRAGMA data_version counts from when this process opened the database, so every process
+# tags its versions with its own epoch and never hands out another process's ETag for other data
+ETAG_EPOCH = secrets.token_hex(4)
+
+
+_lock = threading.Lock()
+# {route: (etag, when it was first served)}
+_last_modified: Dict[str, Tuple[str, datetime]] = {}
+# {route: [full responses, body bytes, CPU nanoseconds]}, to estimate what a 304 saves
+_full_responses: Dict[str, List[int]] = {}
+
+
+def make_etag(version: Hashable, variant: str = "") -> str:
+    """Returns the ETag of a resource version.
+
+    Args:
+        version (Hashable): The version token, e.g. a data version or a tuple of counters.
+        variant (str): What else picks the representation, e.g. the query string; hashed into the tag.
+
+    Returns:
+        str: The entity tag, without quotes.
+    """
+    parts = version if isinstance(version, tuple) else (version,)
+    etag = "-".join(str(part) for part in (ETAG_EPOCH, *parts))
+    if variant:
+        etag += "-" + hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+    return etag
+
+def conditional(version: Callable[[], Optional[Hashable]],
+                representation: Optional[Callable[[], str]] = None) -> Callable:
+    """Decorator that lets clients revalidate a GET route instead of downloading it again.
+
+    Every 200 response gets a weak ETag built from ``version()``, the query
+    string and the negotiated representation, and a Last-Modified of when
+    this process first served that version. A request
+    whose If-None-Match holds the current ETag is answered 304 before the
+    route runs, and the bytes and CPU time a full response takes on average
+    are counted as saved; streamed responses are measured as they are sent. If-Modified-Since alone is not answered with 304,
+    since a second is too coarse to tell two writes apart.
+
+    Args:
+        version (Callable): Returns a token that changes whenever the resource may have,
+            or None if it cannot be read; the route then runs unconditionally.
+        representation (Callable, optional): For routes that pick their format from the
+            Accept header, returns the format this request gets, e.g. 'json' or 'ndjson'.
+            Responses then also carry Vary: Accept.
+    """
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Read before the route runs, so a write racing the response gives it an older ETag, never a newer one
+            token = version()
+            if token is None:
+                return view(*args, **kwargs)
+            route = request.url_rule.rule
+            # Last-Modified follows the data alone, whatever representation is asked for
+            modified = _first_served(route, make_etag(token))
+            variant = urlencode(sorted(request.args.items(multi=True)))
+            if representation is not None:
+                variant += "#" + representation()
+            etag = make_etag(token, variant)
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+                _count_saved(route)
+            else:
+                start = time.thread_time_ns()
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if response.is_streamed:
+                    response.response = _measure_stream(route, response.response, time.thread_time_ns() - start)
+                else:
+                    _count_full(route, response.calculate_content_length() or 0, time.thread_time_ns() - start)
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = modified
+            if representation is not None:
+                response.vary.add("Accept")
+            # Last-Modified alone would let browsers reuse the body for a while; make them ask every time
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+def _first_served(route: str, etag: str) -> datetime:
+    with _lock:
+        seen = _last_modified.get(route)
+        if seen is None or seen[0] != etag:
+            seen = _last_modified[route] = (etag, datetime.now(timezone.utc).replace(microsecond=0))
+        return seen[1]
+
+def _measure_stream(route: str, chunks: Iterable, cpu_ns: int) -> Iterator:
+    # Counts a streamed body once it has been sent in full, with the CPU time spent making its chunks
+    iterator = iter(chunks)
+    size = 0
+    try:
+        while True:
+            start = time.thread_time_ns()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                cpu_ns += time.thread_time_ns() - start
+            size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
+    _count_full(route, size, cpu_ns)
+
+def _count_full(route: str, size: int, cpu_ns: int) -> None:
+    with _lock:
+        totals = _full_responses.setdefault(route, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += size
+        totals[2] += cpu_ns
+
+def _count_saved(route: str) -> None:
+    increment("http_not_modified_total", route=route)
+    with _lock:
+        totals = _full_responses.get(route)
+        if not totals:
+            return
+        responses, size, cpu_ns = totals
+    increment("http_bytes_saved_total", size / responses, route=route)
+    increment("http_cpu_seconds_saved_total", cpu_ns / responses / 1e9, route=route)
+
+def reset_http_cache() -> None:
+    """Forgets every served version and response size, e.g. between tests."""
+    with _lock:
+        _last_modified.clear()
+        _full_responses.clear()
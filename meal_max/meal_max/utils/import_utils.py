@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+import logging
+from typing import IO, Iterator, Tuple, Union
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# request content types understood by the bulk import, by format
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+}
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def _text_stream(stream: IO[bytes]) -> io.TextIOWrapper:
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+
+
+def iter_import_records(stream: IO[bytes], import_format: str) -> Iterator[Tuple[int, Union[dict, ValueError]]]:
+    """Lazily parses an uploaded CSV or NDJSON body, one record at a time.
+
+    CSV bodies need a header row naming the columns. Blank NDJSON lines are
+    skipped. A record that cannot be parsed is yielded as a ValueError so the
+    caller can report it and carry on with the rest of the upload.
+
+    Args:
+        stream (IO[bytes]): The raw request body.
+        import_format (str): 'csv' or 'ndjson'.
+
+    Yields:
+        Tuple[int, Union[dict, ValueError]]: The 1-based record number and the parsed record or its error.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError(f"Invalid import format: {import_format}. Must be 'csv' or 'ndjson'.")
+
+    text = _text_stream(stream)
+    if import_format == "csv":
+        for row_number, record in enumerate(csv.DictReader(text), start=1):
+            if None in record:
+                yield row_number, ValueError("Row has more fields than the header")
+            else:
+                yield row_number, record
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield row_number, ValueError("Each line must be a JSON object")
+        else:
+            yield row_number, record
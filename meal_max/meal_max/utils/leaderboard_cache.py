@@ -0,0 +1,284 @@
+from bisect import bisect_left, bisect_right, insort
+import logging
+import os
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# seconds before the leaderboard is rebuilt even if no change was detected
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "300"))
+
+# orderings kept sorted; ties are broken by id, like the SQL fallback
+SORT_KEYS = ("wins", "win_pct", "rating")
+
+# columns meals are rolled up by; ties between groups are broken by the group value
+GROUP_COLUMNS = ("cuisine", "difficulty")
+
+
+class LeaderboardCache:
+    """An in-process leaderboard kept sorted by wins, win percentage and rating.
+
+    Every live meal with at least one battle is indexed by one sorted key list
+    per ordering, so a page of k meals is a slice of that list. The meals are
+    also rolled up by cuisine and by difficulty: each group keeps its totals
+    and its own sorted key lists, so the group boards cost time in the number
+    of groups, not meals. Writes are applied incrementally; the whole
+    structure is rebuilt from the database when the meal change count moves
+    for any other reason, or after the TTL.
+
+    Rows passed in have the columns
+    ``(id, meal, cuisine, price, difficulty, battles, wins, deleted, rating)``.
+
+    Attributes:
+        ttl (float): Seconds a build stays valid without a detected change.
+    """
+
+    def __init__(self, ttl: float = LEADERBOARD_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._keys = {}
+        self._orders = {sort_by: [] for sort_by in SORT_KEYS}
+        self._groups = {column: {} for column in GROUP_COLUMNS}
+        self._version = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "rebuilds": 0, "updates": 0, "invalidations": 0}
+
+    @staticmethod
+    def _sort_keys(entry: dict) -> dict:
+        return {
+            "wins": (-entry["wins"], entry["id"]),
+            "win_pct": (-(entry["wins"] * 1.0 / entry["battles"]), entry["id"]),
+            "rating": (-entry["rating"], entry["id"]),
+        }
+
+    def _remove(self, meal_id: int) -> None:
+        keys = self._keys.pop(meal_id, None)
+        if keys is None:
+            return
+        entry = self._entries.pop(meal_id)
+        for sort_by, key in keys.items():
+            order = self._orders[sort_by]
+            del order[bisect_left(order, key)]
+        for column, groups in self._groups.items():
+            group = groups[entry[column]]
+            group["meals"] -= 1
+            if not group["meals"]:
+                del groups[entry[column]]
+                continue
+            group["battles"] -= entry["battles"]
+            group["wins"] -= entry["wins"]
+            group["rating_sum"] -= entry["rating"]
+            for sort_by, key in keys.items():
+                order = group["orders"][sort_by]
+                del order[bisect_left(order, key)]
+
+    def _upsert(self, row: tuple) -> None:
+        meal_id, meal, cuisine, price, difficulty, battles, wins, deleted, rating = row
+        self._remove(meal_id)
+        if deleted or not battles:
+            return
+        entry = {
+            'id': meal_id,
+            'meal': meal,
+            'cuisine': cuisine,
+            'price': price,
+            'difficulty': difficulty,
+            'battles': battles,
+            'wins': wins,
+            'win_pct': round(wins * 1.0 / battles * 100, 1),  # Convert to percentage
+            'rating': rating
+        }
+        keys = self._sort_keys(entry)
+        self._entries[meal_id] = entry
+        self._keys[meal_id] = keys
+        for sort_by, key in keys.items():
+            insort(self._orders[sort_by], key)
+        for column, groups in self._groups.items():
+            group = groups.get(entry[column])
+            if group is None:
+                group = groups[entry[column]] = {"meals": 0, "battles": 0, "wins": 0, "rating_sum": 0.0,
+                                                 "orders": {sort_by: [] for sort_by in SORT_KEYS}}
+            group["meals"] += 1
+            group["battles"] += battles
+            group["wins"] += wins
+            group["rating_sum"] += rating
+            for sort_by, key in keys.items():
+                insort(group["orders"][sort_by], key)
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._keys.clear()
+        for order in self._orders.values():
+            order.clear()
+        for groups in self._groups.values():
+            groups.clear()
+
+    def get(self, sort_by: str, limit: Optional[int], offset: int, version: int,
+            after: Optional[Tuple[float, int]] = None) -> Optional[List[dict]]:
+        """Returns a page of the leaderboard if the cache is valid for the given version.
+
+        Args:
+            sort_by (str): 'wins', 'win_pct' or 'rating'.
+            limit (int, optional): The page size; None returns every remaining meal.
+            offset (int): How many leading meals to skip.
+            version (int): The current meal change count of the database.
+            after (Tuple[float, int], optional): Start after the meal with this (sort value, id).
+
+        Returns:
+            list[dict] or None: The page, or None if the cache must be rebuilt first.
+        """
+        with self._lock:
+            if (self._version is None or self._version != version
+                    or time.monotonic() - self._built_at > self.ttl):
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return self._page(sort_by, limit, offset, after)
+
+    def page(self, sort_by: str, limit: Optional[int], offset: int,
+             after: Optional[Tuple[float, int]] = None) -> List[dict]:
+        """Returns a page of the leaderboard as last built, without checking that it is current.
+
+        Args:
+            sort_by (str): 'wins', 'win_pct' or 'rating'.
+            limit (int, optional): The page size; None returns every remaining meal.
+            offset (int): How many leading meals to skip.
+            after (Tuple[float, int], optional): Start after the meal with this (sort value, id).
+
+        Returns:
+            list[dict]: The page.
+        """
+        with self._lock:
+            return self._page(sort_by, limit, offset, after)
+
+    def _page(self, sort_by: str, limit: Optional[int], offset: int, after: Optional[Tuple[float, int]]) -> List[dict]:
+        order = self._orders[sort_by]
+        # Keys are (-value, id), so the cursor is found by binary search rather than by walking the list
+        start = offset if after is None else bisect_right(order, (-after[0], after[1])) + offset
+        end = len(order) if limit is None else start + limit
+        return [dict(self._entries[key[-1]]) for key in order[start:end]]
+
+    def get_groups(self, group_by: str, sort_by: str, version: int) -> Optional[List[dict]]:
+        """Returns the group leaderboard if the cache is valid for the given version.
+
+        Args:
+            group_by (str): 'cuisine' or 'difficulty'.
+            sort_by (str): 'wins', 'win_pct' or 'rating'.
+            version (int): The current meal change count of the database.
+
+        Returns:
+            list[dict] or None: Every group, or None if the cache must be rebuilt first.
+        """
+        with self._lock:
+            if (self._version is None or self._version != version
+                    or time.monotonic() - self._built_at > self.ttl):
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return self._group_page(group_by, sort_by)
+
+    def groups(self, group_by: str, sort_by: str) -> List[dict]:
+        """Returns the group leaderboard as last built, without checking that it is current.
+
+        Args:
+            group_by (str): 'cuisine' or 'difficulty'.
+            sort_by (str): 'wins', 'win_pct' or 'rating'.
+
+        Returns:
+            list[dict]: Every group.
+        """
+        with self._lock:
+            return self._group_page(group_by, sort_by)
+
+    def _group_page(self, group_by: str, sort_by: str) -> List[dict]:
+        ranked = []
+        for value, group in self._groups[group_by].items():
+            # Groups are ranked by unrounded values, like meals, and ties go to the lower group value
+            sort_value = {"wins": group["wins"], "win_pct": group["wins"] * 1.0 / group["battles"],
+                          "rating": group["rating_sum"] / group["meals"]}[sort_by]
+            ranked.append(((-sort_value, value), value, group))
+        ranked.sort(key=lambda item: item[0])
+        return [{
+            group_by: value,
+            'meals': group["meals"],
+            'battles': group["battles"],
+            'wins': group["wins"],
+            'win_pct': round(group["wins"] * 1.0 / group["battles"] * 100, 1),  # Convert to percentage
+            'rating': round(group["rating_sum"] / group["meals"], 1),  # Mean rating of the group's meals
+            'top_meal': dict(self._entries[group["orders"][sort_by][0][-1]])
+        } for _, value, group in ranked]
+
+    def rebuild(self, rows: Iterable[tuple], version: int) -> None:
+        """Replaces the cached leaderboard with rows read at the given version.
+
+        Args:
+            rows (Iterable[tuple]): Every meal that may be on the leaderboard.
+            version (int): The meal change count the rows were read at.
+        """
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._upsert(row)
+            self._version = version
+            self._built_at = time.monotonic()
+            self._stats["rebuilds"] += 1
+        logger.info("Leaderboard cache rebuilt with %d meals", len(self._entries))
+
+    def apply(self, before: Optional[int], after: Optional[int], rows: Iterable[tuple] = (),
+              removed: Iterable[int] = (), cleared: bool = False) -> None:
+        """Applies a committed write to the cached leaderboard.
+
+        The write is applied only if the cache was valid at ``before``. Both
+        versions must be read inside the write transaction, holding the write
+        lock, so that nothing but the write itself lies between them. If the
+        cache was at another version, something else changed meals first, so
+        the cache is dropped and rebuilt on the next read.
+
+        Args:
+            before (int, optional): The version read at the start of the write transaction.
+            after (int, optional): The version read just before the commit.
+            rows (Iterable[tuple]): The rows of the meals whose stats changed.
+            removed (Iterable[int]): The ids of meals that were deleted.
+            cleared (bool): Whether every meal was removed.
+        """
+        with self._lock:
+            if self._version is None:
+                return
+            if before is None or after is None or self._version != before:
+                self._version = None
+                self._stats["invalidations"] += 1
+                logger.info("Leaderboard cache invalidated by a concurrent change")
+                return
+            if cleared:
+                self._clear()
+            for meal_id in removed:
+                self._remove(meal_id)
+            for row in rows:
+                self._upsert(row)
+            self._version = after
+            self._stats["updates"] += 1
+
+    def invalidate(self) -> None:
+        """Drops the cached leaderboard so the next read rebuilds it."""
+        with self._lock:
+            self._version = None
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        """Returns cache hit and rebuild counters.
+
+        Returns:
+            dict: The cache statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"size": len(self._entries), "valid": self._version is not None})
+        return stats
@@ -1,26 +1,140 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
 
-from flask import current_app, has_request_context
 
+# default level of every module logger, and per-module overrides such as
+# "meal_max.models.battle_model=WARNING,meal_max.utils=INFO"; the longest matching prefix wins
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
 
-def configure_logger(logger):
-    logger.setLevel(logging.DEBUG)  # Set the desired logging level here
+# most DEBUG/INFO records per second from any one call site; 0 keeps every record
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "0"))
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """Samples high-frequency DEBUG and INFO messages.
+
+    Records are grouped by the call site that logged them. At most ``rate``
+    records per group pass in any one-second window; the first record let
+    through afterwards notes how many were dropped. WARNING and above always pass.
+
+    Attributes:
+        rate (int): The most records per group per second.
+    """
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = rate
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = int(time.monotonic())
+        with self._lock:
+            window, count, dropped = self._windows.get(key, (now, 0, 0))
+            if window != now:
+                window, count = now, 0
+            if count >= self.rate:
+                self._windows[key] = (window, count, dropped + 1)
+                return False
+            self._windows[key] = (window, count + 1, 0)
+
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar messages suppressed)"
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them.
+
+    Only the message itself is rendered in the calling thread, so that later
+    changes to mutable arguments cannot leak into the log line. Timestamps,
+    tracebacks and the final line are formatted by the writer thread.
+    """
 
-    # Create a console handler that logs to stderr
-    handler = logging.StreamHandler(sys.stderr)
-    handler.setLevel(logging.DEBUG)
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
-    # Create a formatter with a timestamp
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-    # Add the formatter to the handler
-    handler.setFormatter(formatter)
+_handler = None
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def _get_handler() -> logging.Handler:
+    """Returns the process-wide queue handler, starting its writer thread on first use."""
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is None:
+            log_queue = queue.SimpleQueue()
+            stream_handler = logging.StreamHandler(sys.stderr)
+            stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+            _listener.start()
+            _handler = _QueueHandler(log_queue)
+            if LOG_RATE_LIMIT > 0:
+                _handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT))
+        return _handler
+
+def stop_logging() -> None:
+    """Writes out every queued record and stops the writer thread."""
+    global _handler, _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+        _handler = None
+        _listener = None
+
+# Flush whatever is still queued when the process exits
+atexit.register(stop_logging)
+
+
+def get_log_level(name: str) -> str:
+    """Returns the level configured for a logger by LOG_LEVEL and LOG_LEVELS.
+
+    Args:
+        name (str): The logger name, usually a module's __name__.
+
+    Returns:
+        str: The logging level name.
+    """
+    level, matched = LOG_LEVEL, -1
+    for override in LOG_LEVELS.split(","):
+        prefix, _, value = override.partition("=")
+        prefix = prefix.strip()
+        if not value or len(prefix) <= matched:
+            continue
+        if name == prefix or name.startswith(prefix + "."):
+            level, matched = value.strip(), len(prefix)
+    return level.upper()
+
+
+def configure_logger(logger):
+    """Sends a logger's records through the shared queue to the background writer thread.
+
+    Safe to call more than once for the same logger; the queue handler is only attached once.
 
-    # Add the handler to the logger
-    logger.addHandler(handler)
+    Args:
+        logger (logging.Logger): The logger to configure.
+    """
+    logger.setLevel(get_log_level(logger.name))
 
-    if has_request_context():
-        app_logger = current_app.logger
-        for handler in app_logger.handlers:
-            logger.addHandler(handler)
\ No newline at end of file
+    handler = _get_handler()
+    if handler not in logger.handlers:
+        # Drop a handler left behind by an earlier writer thread that has been stopped
+        logger.handlers = [h for h in logger.handlers if not isinstance(h, _QueueHandler)]
+        logger.addHandler(handler)
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+from typing import Any, Hashable, Iterable, Optional
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class VersionedLRUCache:
+    """A bounded LRU cache whose entries also expire after a TTL and are tied to a data version.
+
+    Every read passes the current version of the cached data, such as the meal
+    change count. If it differs from the version the entries were cached at,
+    another connection or process has written since, and the whole cache is
+    dropped. Writes made through this process are acknowledged with apply()
+    instead, so they only drop the keys they touched.
+
+    Values should be immutable, since the same object is handed to every caller.
+
+    Attributes:
+        maxsize (int): The most entries kept before the least recently used is evicted.
+        ttl (float): Seconds an entry is served before it is read again from the database.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        if maxsize < 1:
+            raise ValueError(f"Invalid cache size: {maxsize}. Must be at least 1.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _sync_version(self, version: int) -> None:
+        """Drops every entry if the data version moved. Must hold the lock."""
+        if self._version != version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+                logger.info("Cache cleared after a database change (data version %s -> %s)", self._version, version)
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        """Returns the cached value for key if it is still valid at the given data version.
+
+        Args:
+            key (Hashable): The cache key.
+            version (int): The current data version of the database.
+
+        Returns:
+            Any or None: The cached value, or None on a miss.
+        """
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, keys: Iterable[Hashable], value: Any, version: int) -> None:
+        """Caches a value read at the given data version under one or more keys.
+
+        Values read at a different version than the cache is at are ignored.
+
+        Args:
+            keys (Iterable[Hashable]): The keys to cache the value under.
+            value (Any): The value to cache.
+            version (int): The data version the value was read at.
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if self._version is None:
+                self._version = version
+            elif self._version != version:
+                return
+            for key in keys:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value for key without checking the version or updating the counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def apply(self, before: Optional[int], after: Optional[int], keys: Iterable[Hashable] = (),
+              cleared: bool = False) -> None:
+        """Acknowledges a committed write made through this process.
+
+        If the cache was at ``before`` the given keys are dropped and the cache
+        moves to ``after``; otherwise something else wrote in between and
+        everything is dropped. Both versions must be read inside the write
+        transaction, holding the write lock, so that they bracket exactly
+        that write; versions read around the commit could take in a write
+        made by someone else.
+
+        Args:
+            before (int, optional): The version read at the start of the write transaction.
+            after (int, optional): The version read just before the commit.
+            keys (Iterable[Hashable]): The keys whose values the write changed.
+            cleared (bool): Whether the write removed every value.
+        """
+        with self._lock:
+            if cleared or before is None or after is None or self._version != before:
+                if self._entries:
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._version = None
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+            self._version = after
+
+    def stats(self) -> dict:
+        """Returns hit, miss, eviction and invalidation counters.
+
+        Returns:
+            dict: The cache statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"size": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl})
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
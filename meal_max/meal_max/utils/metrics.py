@@ -0,0 +1,199 @@
+from contextlib import contextmanager
+import functools
+import inspect
+import threading
+import time
+from typing import Callable, Dict, Iterator, Tuple
+
+
+# bits of precision kept per recorded value, so a quantile is off by at most 1/2**SIGNIFICANT_BITS (under 1%)
+SIGNIFICANT_BITS = 7
+
+# quantiles reported for every histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+# every metric this service exports, with its type and help text
+METRICS = {
+    "http_request_duration_seconds": ("summary", "Time spent handling a request, by route."),
+    "http_requests_total": ("counter", "Requests handled, by route and status code."),
+    "http_not_modified_total": ("counter", "Conditional requests answered 304 without running the route, by route."),
+    "http_bytes_saved_total": ("counter", "Estimated response body bytes not sent thanks to 304 answers, by route."),
+    "http_cpu_seconds_saved_total": ("counter", "Estimated CPU seconds not spent building responses thanks to 304 answers, by route."),
+    "db_connection_duration_seconds": ("summary", "Time a pooled database connection was checked out."),
+    "query_duration_seconds": ("summary", "Time spent in each data access function."),
+    "random_duration_seconds": ("summary", "Time spent getting a random number."),
+}
+
+
+class LatencyHistogram:
+    """A log-linear histogram of durations in the style of HdrHistogram.
+
+    Each duration in nanoseconds is rounded down to SIGNIFICANT_BITS
+    significant bits, so recording is a dictionary increment and memory stays
+    bounded by the range of values rather than by how many were recorded.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._count = 0
+        self._sum = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(value: int) -> int:
+        shift = max(value.bit_length() - SIGNIFICANT_BITS, 0)
+        return value >> shift << shift
+
+    def record(self, value: int) -> None:
+        """Records one duration.
+
+        Args:
+            value (int): The duration in nanoseconds.
+        """
+        bucket = self._bucket(max(value, 0))
+        with self._lock:
+            self._counts[bucket] = self._counts.get(bucket, 0) + 1
+            self._count += 1
+            self._sum += value
+
+    def snapshot(self, quantiles: Tuple[float, ...] = QUANTILES) -> Tuple[Dict[float, int], int, int]:
+        """Returns the given quantiles, the number of durations and their sum.
+
+        Args:
+            quantiles (tuple[float]): The quantiles to compute, each between 0 and 1.
+
+        Returns:
+            tuple: ({quantile: nanoseconds}, count, sum in nanoseconds).
+        """
+        with self._lock:
+            counts = sorted(self._counts.items())
+            count, total = self._count, self._sum
+
+        values = {}
+        seen = 0
+        targets = iter(sorted(quantiles))
+        target = next(targets, None)
+        for bucket, bucket_count in counts:
+            seen += bucket_count
+            while target is not None and seen >= target * count:
+                # Report the middle of the bucket the quantile falls in
+                width = 1 << max(bucket.bit_length() - SIGNIFICANT_BITS, 0)
+                values[target] = bucket + (width - 1) // 2
+                target = next(targets, None)
+        for quantile in quantiles:
+            values.setdefault(quantile, 0)
+        return values, count, total
+
+
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def observe(name: str, duration_ns: int, **labels) -> None:
+    """Records a duration in the named histogram.
+
+    Args:
+        name (str): A summary from METRICS.
+        duration_ns (int): The duration in nanoseconds.
+        **labels: The labels identifying the series, such as route or function.
+    """
+    key = (name, _labels_key(labels))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(key, LatencyHistogram())
+    histogram.record(duration_ns)
+
+def increment(name: str, amount: float = 1, **labels) -> None:
+    """Adds to the named counter.
+
+    Args:
+        name (str): A counter from METRICS.
+        amount (float): How much to add; one by default.
+        **labels: The labels identifying the series.
+    """
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+@contextmanager
+def timer(name: str, **labels) -> Iterator[None]:
+    """Times the body of a with block into the named histogram, even if it raises."""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter_ns() - start, **labels)
+
+def timed(name: str) -> Callable:
+    """Decorator that times every call of a function or coroutine function, labelled with its name.
+
+    Args:
+        name (str): A summary from METRICS.
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(name, time.perf_counter_ns() - start, function=func.__name__)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter_ns() - start, function=func.__name__)
+        return wrapper
+    return decorator
+
+def _format_labels(labels: tuple, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+def render_metrics() -> str:
+    """Renders every metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics, with durations in seconds.
+    """
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if metric_type == "counter":
+            for (series, labels), value in counters:
+                if series == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+        for (series, labels), histogram in histograms:
+            if series != name:
+                continue
+            values, count, total = histogram.snapshot()
+            for quantile in QUANTILES:
+                lines.append(f"{name}{_format_labels(labels, quantile=quantile)} {values[quantile] / 1e9:.9f}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total / 1e9:.9f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+def reset_metrics() -> None:
+    """Drops every recorded value."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -1,41 +1,76 @@
+import asyncio
+from collections import deque
 import logging
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
 import requests
 
 from meal_max.utils.logger import configure_logger
+from meal_max.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-def get_random() -> float:
-    """Fetches a random decimal number from random.org.
+# base URL of random.org; point this at a local stub to run offline
+RANDOM_ORG_URL = os.getenv("RANDOM_ORG_URL", "https://www.random.org")
+
+# numbers fetched per request, and the depth below which a refill is started
+RANDOM_POOL_BATCH_SIZE = int(os.getenv("RANDOM_POOL_BATCH_SIZE", "100"))
+RANDOM_POOL_LOW_WATER = int(os.getenv("RANDOM_POOL_LOW_WATER", "20"))
+
+# seconds to wait after a failed refill before asking random.org again
+RANDOM_POOL_RETRY_AFTER = float(os.getenv("RANDOM_POOL_RETRY_AFTER", "5"))
+
+# "local" draws from the OS CSPRNG when the pool is empty, "none" blocks on random.org instead
+RANDOM_FALLBACK = os.getenv("RANDOM_FALLBACK", "local")
+
+# random.org caps a single decimal-fractions request at this many numbers
+MAX_BATCH_SIZE = 10000
+
+
+def fetch_random_numbers(num: int, session: requests.Session = None, base_url: str = None) -> list[float]:
+    """Fetches a batch of random decimal numbers from random.org in one request.
+
+    Args:
+        num (int): How many numbers to fetch.
+        session (requests.Session, optional): A session to reuse a keep-alive connection.
+        base_url (str, optional): The random.org base URL. Defaults to RANDOM_ORG_URL.
+
     Returns:
-        float: The random decimal number received from random.org.
+        list[float]: The random decimal numbers received from random.org.
 
     Raises:
         RuntimeError: If the request to random.org times out or encounters a network error.
-        ValueError: If the response cannot be converted to a float.
+        ValueError: If the response cannot be converted to floats.
     """
-    url = "https://www.random.org/decimal-fractions/?num=1&dec=2&col=1&format=plain&rnd=new"
+    url = f"{base_url or RANDOM_ORG_URL}/decimal-fractions/?num={num}&dec=2&col=1&format=plain&rnd=new"
+    http = session if session is not None else requests
 
     try:
         # Log the request to random.org
-        logger.info("Fetching random number from %s", url)
+        logger.info("Fetching %d random numbers from %s", num, url)
 
-        response = requests.get(url, timeout=5)
+        response = http.get(url, timeout=5)
 
         # Check if the request was successful
         response.raise_for_status()
 
-        random_number_str = response.text.strip()
+        random_number_strs = response.text.split()
 
         try:
-            random_number = float(random_number_str)
+            random_numbers = [float(value) for value in random_number_strs]
         except ValueError:
-            raise ValueError("Invalid response from random.org: %s" % random_number_str)
+            raise ValueError("Invalid response from random.org: %s" % response.text.strip())
+        if not random_numbers:
+            raise ValueError("Invalid response from random.org: %s" % response.text.strip())
 
-        logger.info("Received random number: %.3f", random_number)
-        return random_number
+        logger.info("Received %d random numbers", len(random_numbers))
+        return random_numbers
 
     except requests.exceptions.Timeout:
         logger.error("Request to random.org timed out.")
@@ -44,3 +79,260 @@ def get_random() -> float:
     except requests.exceptions.RequestException as e:
         logger.error("Request to random.org failed: %s", e)
         raise RuntimeError("Request to random.org failed: %s" % e)
+
+
+def local_random() -> float:
+    """Draws a random decimal number from the OS CSPRNG with the same two-decimal
+    granularity as the random.org requests.
+
+    Returns:
+        float: A random number in [0, 1).
+    """
+    return secrets.randbelow(100) / 100
+
+
+class RandomPool:
+    """A buffer of random.org numbers that is refilled in bulk.
+
+    Draws are served from memory. When the buffer drops below the low-water
+    mark a refill is fetched over a keep-alive session, in a background thread
+    by default. When the buffer is empty the draw falls back to the local
+    CSPRNG, or blocks on a synchronous refill if the fallback is disabled.
+
+    Attributes:
+        batch_size (int): How many numbers each refill fetches.
+        low_water (int): The buffer depth that triggers a refill.
+        fallback (str): "local" to use the local CSPRNG when empty, "none" to block on random.org.
+        background (bool): Whether refills run in a background thread.
+    """
+
+    def __init__(self, batch_size: int = RANDOM_POOL_BATCH_SIZE, low_water: int = RANDOM_POOL_LOW_WATER,
+                 fallback: str = RANDOM_FALLBACK, background: bool = True, base_url: str = None,
+                 retry_after: float = RANDOM_POOL_RETRY_AFTER):
+        if not 1 <= batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"Invalid batch size: {batch_size}. Must be between 1 and {MAX_BATCH_SIZE}.")
+        if fallback not in ("local", "none"):
+            raise ValueError(f"Invalid fallback: {fallback}. Must be 'local' or 'none'.")
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.fallback = fallback
+        self.background = background
+        self.base_url = base_url
+        self.retry_after = retry_after
+        self.session = requests.Session()
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._refilling = False
+        self._next_retry = 0.0
+        self._waiting = 0
+        self._async_refill = None
+        self._stats = {
+            "hits": 0,
+            "fallbacks": 0,
+            "refills": 0,
+            "failed_refills": 0,
+            "last_refill_ms": 0.0,
+            "total_refill_ms": 0.0,
+        }
+
+    def get(self) -> float:
+        """Draws one random number from the pool.
+
+        Returns:
+            float: A random number in [0, 1).
+
+        Raises:
+            RuntimeError: If the pool is empty, the fallback is disabled and random.org fails.
+            ValueError: If the pool is empty, the fallback is disabled and random.org returns garbage.
+        """
+        value = self._pop()
+        if value is not None:
+            return value
+
+        if self.fallback == "local":
+            return self._fall_back()
+
+        while True:
+            self.refill()
+            value = self._pop()
+            if value is not None:
+                return value
+
+    async def get_async(self) -> float:
+        """Draws one random number from the pool without blocking the event loop.
+
+        When the pool is empty and the fallback is disabled, every waiting draw
+        shares one refill, sized to cover all of them, which runs in a thread.
+
+        Returns:
+            float: A random number in [0, 1).
+
+        Raises:
+            RuntimeError: If the pool is empty, the fallback is disabled and random.org fails.
+            ValueError: If the pool is empty, the fallback is disabled and random.org returns garbage.
+        """
+        value = self._pop()
+        if value is not None:
+            return value
+
+        if self.fallback == "local":
+            return self._fall_back()
+
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                await asyncio.shield(self._shared_refill())
+                value = self._pop()
+                if value is not None:
+                    return value
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _pop(self) -> Optional[float]:
+        """Takes the next number from the buffer, or returns None if it is empty."""
+        with self._lock:
+            value = self._buffer.popleft() if self._buffer else None
+            if value is not None:
+                self._stats["hits"] += 1
+            depth = len(self._buffer)
+
+        if value is not None and depth < self.low_water:
+            self._schedule_refill()
+        return value
+
+    def _fall_back(self) -> float:
+        self._schedule_refill()
+        with self._lock:
+            self._stats["fallbacks"] += 1
+        logger.warning("Random pool is empty, falling back to the local CSPRNG.")
+        return local_random()
+
+    def _shared_refill(self) -> "asyncio.Future":
+        """Returns the refill the event loop is already waiting on, or starts one."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # A finished refill would be awaited without yielding, so only one still running is shared
+            if self._async_refill is not None and self._async_refill[0] is loop and not self._async_refill[1].done():
+                return self._async_refill[1]
+            size = min(MAX_BATCH_SIZE, max(self.batch_size, self._waiting))
+        future = loop.run_in_executor(None, self.refill, size)
+        with self._lock:
+            self._async_refill = (loop, future)
+        return future
+
+    def refill(self, num: int = None) -> int:
+        """Fetches one batch from random.org and appends it to the pool.
+
+        Args:
+            num (int, optional): How many numbers to fetch. Defaults to batch_size.
+
+        Returns:
+            int: The number of random numbers added.
+
+        Raises:
+            RuntimeError: If the request to random.org fails.
+            ValueError: If the response cannot be converted to floats.
+        """
+        with self._refill_lock:
+            start = time.perf_counter()
+            try:
+                numbers = fetch_random_numbers(num or self.batch_size, session=self.session, base_url=self.base_url)
+            except (RuntimeError, ValueError):
+                with self._lock:
+                    self._stats["failed_refills"] += 1
+                    self._next_retry = time.monotonic() + self.retry_after
+                raise
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with self._lock:
+                self._buffer.extend(numbers)
+                self._stats["refills"] += 1
+                self._stats["last_refill_ms"] = elapsed_ms
+                self._stats["total_refill_ms"] += elapsed_ms
+            logger.info("Random pool refilled with %d numbers in %.1f ms", len(numbers), elapsed_ms)
+            return len(numbers)
+
+    def _schedule_refill(self) -> None:
+        with self._lock:
+            if self._refilling or time.monotonic() < self._next_retry:
+                return
+            self._refilling = True
+
+        if self.background:
+            threading.Thread(target=self._run_refill, name="random-pool-refill", daemon=True).start()
+        else:
+            self._run_refill()
+
+    def _run_refill(self) -> None:
+        try:
+            self.refill()
+        except (RuntimeError, ValueError) as e:
+            logger.error("Random pool refill failed: %s", e)
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def stats(self) -> dict:
+        """Returns a snapshot of pool depth, hit rate and refill latency.
+
+        Returns:
+            dict: The pool statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["depth"] = len(self._buffer)
+        draws = stats["hits"] + stats["fallbacks"]
+        stats["hit_rate"] = stats["hits"] / draws if draws else 0.0
+        stats["avg_refill_ms"] = stats["total_refill_ms"] / stats["refills"] if stats["refills"] else 0.0
+        stats.update({"batch_size": self.batch_size, "low_water": self.low_water, "fallback": self.fallback})
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> RandomPool:
+    """Returns the process-wide random pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RandomPool()
+        return _pool
+
+def get_random_pool_stats() -> dict:
+    """Returns the statistics of the process-wide random pool."""
+    return get_pool().stats()
+
+@timed("random_duration_seconds")
+def get_random() -> float:
+    """Draws a random decimal number, served from the prefetched random.org pool.
+
+    Returns:
+        float: The random decimal number in [0, 1).
+
+    Raises:
+        RuntimeError: If the fallback is disabled and the request to random.org fails.
+        ValueError: If the fallback is disabled and the response cannot be converted to a float.
+    """
+    random_number = get_pool().get()
+    logger.info("Drew random number: %.3f", random_number)
+    return random_number
+
+@timed("random_duration_seconds")
+async def get_random_async() -> float:
+    """Draws a random decimal number from the prefetched random.org pool without blocking the event loop.
+
+    Returns:
+        float: The random decimal number in [0, 1).
+
+    Raises:
+        RuntimeError: If the fallback is disabled and the request to random.org fails.
+        ValueError: If the fallback is disabled and the response cannot be converted to a float.
+    """
+    random_number = await get_pool().get_async()
+    logger.info("Drew random number: %.3f", random_number)
+    return random_number
@@ -0,0 +1,80 @@
+import logging
+import os
+from typing import Dict, Iterable, Tuple
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# rating of a meal that has not battled yet; the meals table defaults to the same value
+INITIAL_RATING = 1500.0
+
+# most rating points that change hands in one battle
+ELO_K_FACTOR = float(os.getenv("ELO_K_FACTOR", "32"))
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    """Returns the chance that a meal beats its opponent, according to their Elo ratings.
+
+    Args:
+        rating (float): The meal's rating.
+        opponent_rating (float): The opponent's rating.
+
+    Returns:
+        float: The expected score, between 0 and 1.
+    """
+    return 1.0 / (1.0 + 10.0 ** ((opponent_rating - rating) / 400.0))
+
+def rate_battles(ratings: Dict[int, float], results: Iterable[Tuple[int, int]], k: float = ELO_K_FACTOR) -> Dict[int, float]:
+    """Applies battle results to Elo ratings, one battle at a time in order.
+
+    Args:
+        ratings (dict[int, float]): The current rating of every meal in the results; updated in place.
+        results (Iterable[Tuple[int, int]]): (winner_id, loser_id) pairs in the order they were fought.
+        k (float): The K-factor.
+
+    Returns:
+        dict[int, float]: The updated ratings.
+    """
+    for winner_id, loser_id in results:
+        winner_rating, loser_rating = ratings[winner_id], ratings[loser_id]
+        change = k * (1.0 - expected_score(winner_rating, loser_rating))
+        ratings[winner_id] = winner_rating + change
+        ratings[loser_id] = loser_rating - change
+    return ratings
+
+def replay_ratings(results: Iterable[Tuple[int, int]], k: float = ELO_K_FACTOR) -> Dict[int, float]:
+    """Recomputes Elo ratings from scratch by replaying every battle in order.
+
+    Gives the same ratings as rate_battles over the same results with every
+    meal starting at INITIAL_RATING, but faster: ratings live in a list
+    indexed by meal id and the update is inlined.
+
+    Args:
+        results (Iterable[Tuple[int, int]]): (winner_id, loser_id) pairs in the order they were fought.
+        k (float): The K-factor.
+
+    Returns:
+        dict[int, float]: The final rating of every meal that battled.
+    """
+    ratings = []
+    battles = 0
+    for winner_id, loser_id in results:
+        if winner_id >= len(ratings) or loser_id >= len(ratings):
+            ratings.extend([None] * (max(winner_id, loser_id) + 1 - len(ratings)))
+        winner_rating, loser_rating = ratings[winner_id], ratings[loser_id]
+        if winner_rating is None:
+            winner_rating = INITIAL_RATING
+        if loser_rating is None:
+            loser_rating = INITIAL_RATING
+        change = k - k / (1.0 + 10.0 ** ((loser_rating - winner_rating) / 400.0))
+        ratings[winner_id] = winner_rating + change
+        ratings[loser_id] = loser_rating - change
+        battles += 1
+
+    replayed = {meal_id: rating for meal_id, rating in enumerate(ratings) if rating is not None}
+    logger.info("Replayed %d battles into ratings for %d meals", battles, len(replayed))
+    return replayed
@@ -1,9 +1,13 @@
 from contextlib import contextmanager
 import logging
 import os
+import queue
 import sqlite3
+import threading
+import time
 
 from meal_max.utils.logger import configure_logger
+from meal_max.utils.metrics import observe
 
 
 logger = logging.getLogger(__name__)
@@ -13,6 +17,18 @@ configure_logger(logger)
 # load the db path from the environment with a default value
 DB_PATH = os.getenv("DB_PATH", "/app/sql/meal_max.db")
 
+# pool sizing; a checkout waits up to DB_POOL_TIMEOUT seconds for a free connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+
+# applied once to every pooled connection right after it is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+)
+
 
 def check_database_connection():
     try:
@@ -37,6 +53,276 @@ def check_table_exists(tablename: str):
         logger.error(error_message)
         raise Exception(error_message) from e
 
+
+class ConnectionPool:
+    """A bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily up to ``size``, configured once with
+    CONNECTION_PRAGMAS and validated with ``SELECT 1`` on every checkout.
+    Connections that fail validation are discarded and replaced.
+
+    Attributes:
+        db_path (str): The database file the pool connects to.
+        size (int): The maximum number of open connections.
+        timeout (float): Seconds a checkout waits for a free connection.
+    """
+
+    def __init__(self, db_path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        if size < 1:
+            raise ValueError(f"Invalid pool size: {size}. Must be at least 1.")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "discarded": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        logger.info("Opened pooled database connection to %s", self.db_path)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._opened -= 1
+            self._stats["discarded"] += 1
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Checks a connection out of the pool.
+
+        Returns:
+            sqlite3.Connection: A validated connection for exclusive use by the caller.
+
+        Raises:
+            sqlite3.OperationalError: If the pool is closed or no connection frees up in time.
+        """
+        start = time.perf_counter()
+        waited = False
+        while True:
+            if self._closed:
+                raise sqlite3.OperationalError("Connection pool is closed")
+
+            conn = None
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._opened < self.size
+                    if can_open:
+                        self._opened += 1
+                if can_open:
+                    try:
+                        conn = self._connect()
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._opened -= 1
+                        raise
+                else:
+                    waited = True
+                    remaining = self.timeout - (time.perf_counter() - start)
+                    try:
+                        conn = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        with self._lock:
+                            self._stats["timeouts"] += 1
+                        logger.error("Timed out waiting for a database connection after %.2fs", self.timeout)
+                        raise sqlite3.OperationalError("Timed out waiting for a database connection")
+
+            if self._is_healthy(conn):
+                break
+            logger.warning("Discarding unhealthy pooled database connection")
+            self._discard(conn)
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+            if waited:
+                self._stats["waits"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Returns a connection to the pool, rolling back any open transaction.
+
+        Args:
+            conn (sqlite3.Connection): A connection previously returned by acquire().
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+            return
+        self._idle.put_nowait(conn)
+
+    def close(self) -> None:
+        """Closes every idle connection; checked-out connections close on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    def stats(self) -> dict:
+        """Returns a snapshot of pool usage, including checkout wait times.
+
+        Returns:
+            dict: Pool size, open/idle/in-use counts, checkout and wait statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            opened = self._opened
+        idle = self._idle.qsize()
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        stats.update({"size": self.size, "open": opened, "idle": idle, "in_use": opened - idle})
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Returns the process-wide pool for DB_PATH, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+def get_pool_stats() -> dict:
+    """Returns the statistics of the process-wide connection pool."""
+    return get_pool().stats()
+
+def close_pool() -> None:
+    """Closes the process-wide pool; the next checkout opens a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+# (data version, meal change count) last read by the watcher
+_meal_changes_seen = None
+
+
+def _open_watcher() -> sqlite3.Connection:
+    # Callers hold _watcher_lock
+    global _watcher
+    if _watcher is None or _watcher[0] != DB_PATH:
+        _close_watcher()
+        # mode=rw never creates a missing database file
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=rw", uri=True, check_same_thread=False)
+        _watcher = (DB_PATH, conn)
+    return _watcher[1]
+
+def _close_watcher() -> None:
+    global _watcher, _meal_changes_seen
+    if _watcher is not None:
+        _watcher[1].close()
+        _watcher = None
+    _meal_changes_seen = None
+
+def get_data_version():
+    """Returns a token that changes whenever any connection commits to DB_PATH.
+
+    A dedicated connection that never writes runs ``PRAGMA data_version``, so
+    commits made through the pool, other processes or the sqlite3 shell are
+    all seen. It moves once however many commits were made since the last
+    read, so it tells whether anything changed but not how much.
+
+    Returns:
+        int or None: The current data version, or None if the database cannot be opened.
+    """
+    with _watcher_lock:
+        try:
+            return _open_watcher().execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning("Could not read the database data version: %s", str(e))
+            _close_watcher()
+            return None
+
+def get_meal_changes():
+    """Returns the meal change count, which moves with every committed change to meals.
+
+    Triggers on meals bump the count in the writing transaction, whichever
+    connection or process writes, while writes to other tables leave it alone.
+    Caches of meals compare it to decide whether they are still valid. The
+    watcher reads it again only after the data version has moved.
+
+    Returns:
+        int or None: The current count, or None if the database or its meal_changes table cannot be read.
+    """
+    global _meal_changes_seen
+    with _watcher_lock:
+        try:
+            conn = _open_watcher()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if _meal_changes_seen is None or _meal_changes_seen[0] != data_version:
+                _meal_changes_seen = (data_version, conn.execute("SELECT count FROM meal_changes").fetchone()[0])
+            return _meal_changes_seen[1]
+        except (sqlite3.Error, TypeError) as e:
+            logger.warning("Could not read the meal change count: %s", str(e))
+            _close_watcher()
+            return None
+
+def read_meal_changes(cursor: sqlite3.Cursor):
+    """Reads the meal change count through a writer's own cursor.
+
+    Read right after ``BEGIN IMMEDIATE`` and again just before the commit, the
+    two counts bracket exactly the changes of that transaction, since no other
+    connection can write in between; caches use them to apply the write.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor of the writing connection.
+
+    Returns:
+        int or None: The count seen by the transaction, or None if the database has no meal_changes table.
+    """
+    try:
+        cursor.execute("SELECT count FROM meal_changes")
+    except sqlite3.OperationalError:
+        return None
+    row = cursor.fetchone()
+    return row[0] if row else None
+
 ###################################################
 #
 # This one yields rather than returns.
@@ -45,14 +331,18 @@ def check_table_exists(tablename: str):
 ###################################################
 @contextmanager
 def get_db_connection():
+    pool = get_pool()
     conn = None
+    start = 0
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = pool.acquire()
+        start = time.perf_counter_ns()
         yield conn
     except sqlite3.Error as e:
         logger.error("Database connection error: %s", str(e))
         raise e
     finally:
         if conn:
-            conn.close()
-            logger.info("Database connection closed.")
+            pool.release(conn)
+            observe("db_connection_duration_seconds", time.perf_counter_ns() - start)
+            logger.debug("Database connection returned to pool.")
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from typing import Callable, ContextManager, Dict, Hashable, List, Optional, Tuple
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class WriteBehindCounters:
+    """Adds up counter increments in memory and writes them many at a time.
+
+    Every key has a fixed number of counters. Increments are summed per key
+    and handed to ``write`` as one ``{key: deltas}`` map, meant to be applied
+    in a single transaction, by a writer thread once max_events increments
+    are pending or flush_interval seconds after the first of them. If the
+    write fails the deltas are merged back and retried with the next flush,
+    so increments are only lost if the process dies before they are written.
+    While a flush is being written its increments are neither pending nor
+    yet in the database.
+
+    Attributes:
+        write (Callable): Applies a {key: deltas} map.
+        width (int): How many counters each key has.
+        flush_interval (float): Most seconds an increment waits before it is written.
+        max_events (int): Pending increments that start a flush early.
+    """
+
+    def __init__(self, write: Callable[[Dict[Hashable, List[int]]], None], width: int,
+                 flush_interval: float, max_events: int):
+        if max_events < 1:
+            raise ValueError(f"Invalid flush size: {max_events}. Must be at least 1.")
+        self.write = write
+        self.width = width
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self._pending: Dict[Hashable, List[int]] = {}
+        self._events = 0
+        self._first_at = 0.0
+        self._lock = threading.Condition()
+        # Keeps flushes from overlapping, so a retried map is never written twice
+        self._flush_lock = threading.Lock()
+        self._writer = None
+        self._closed = False
+        self._stats = {"events": 0, "flushes": 0, "flushed_events": 0, "flushed_keys": 0, "failures": 0,
+                       "discarded_events": 0, "last_flush_ms": None}
+
+    def add(self, key: Hashable, *deltas: int) -> None:
+        """Adds one event's increments to a key's pending counters.
+
+        Args:
+            key (Hashable): What the counters belong to, e.g. a row id.
+            *deltas (int): One increment per counter.
+        """
+        with self._lock:
+            counters = self._pending.get(key)
+            if counters is None:
+                self._pending[key] = list(deltas)
+            else:
+                for i, delta in enumerate(deltas):
+                    counters[i] += delta
+            if not self._events:
+                self._first_at = time.monotonic()
+            self._events += 1
+            self._stats["events"] += 1
+            if self._writer is None and not self._closed:
+                self._writer = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._writer.start()
+            if self._events >= self.max_events:
+                self._lock.notify()
+
+    def pending(self, key: Hashable) -> Optional[Tuple[int, ...]]:
+        """Returns the increments of a key not written yet, or None if there are none.
+
+        Args:
+            key (Hashable): The key.
+
+        Returns:
+            tuple or None: One pending increment per counter.
+        """
+        with self._lock:
+            counters = self._pending.get(key)
+            return None if counters is None else tuple(counters)
+
+    def snapshot(self) -> Dict[Hashable, Tuple[int, ...]]:
+        """Returns every key's increments not written yet.
+
+        Returns:
+            dict: The pending increments by key.
+        """
+        with self._lock:
+            return {key: tuple(counters) for key, counters in self._pending.items()}
+
+    def holding_flushes(self) -> ContextManager:
+        """Returns a context manager that keeps flushes from running while it is held.
+
+        While held, what is written plus what is pending is every increment,
+        e.g. to compute new increments from the current totals. Do not flush
+        while holding it.
+        """
+        return self._flush_lock
+
+    def flush(self) -> int:
+        """Writes every pending increment now.
+
+        Returns:
+            int: How many events were written; 0 if the write failed.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, events = self._pending, self._events
+                self._pending, self._events = {}, 0
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                self.write(batch)
+            except Exception as e:
+                logger.error("Failed to write %d pending counter events: %s", events, str(e))
+                with self._lock:
+                    for key, deltas in batch.items():
+                        counters = self._pending.setdefault(key, [0] * self.width)
+                        for i, delta in enumerate(deltas):
+                            counters[i] += delta
+                    if not self._events:
+                        self._first_at = time.monotonic()
+                    self._events += events
+                    self._stats["failures"] += 1
+                return 0
+
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["flushed_events"] += events
+                self._stats["flushed_keys"] += len(batch)
+                self._stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return events
+
+    def discard(self) -> None:
+        """Drops every pending increment, e.g. after the rows they belong to were removed."""
+        with self._lock:
+            self._stats["discarded_events"] += self._events
+            self._pending, self._events = {}, 0
+
+    def close(self) -> None:
+        """Stops the writer thread and writes whatever is still pending."""
+        with self._lock:
+            self._closed = True
+            writer, self._writer = self._writer, None
+            self._lock.notify()
+        if writer is not None:
+            writer.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        """Returns how many events are pending, written and discarded, and how long the last flush took.
+
+        Returns:
+            dict: The counter statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"pending_events": self._events, "pending_keys": len(self._pending)})
+        stats.update({"flush_interval_ms": self.flush_interval * 1000, "max_events": self.max_events})
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._events and not self._closed:
+                    self._lock.wait()
+                # Wait out the interval from the first pending event, unless enough events pile up first
+                while not self._closed and self._events < self.max_events:
+                    remaining = self._first_at + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
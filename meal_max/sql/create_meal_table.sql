@@ -7,5 +7,96 @@ CREATE TABLE meals (
     difficulty TEXT CHECK(difficulty IN ('HIGH', 'MED', 'LOW')),
     battles INTEGER DEFAULT 0,
     wins INTEGER DEFAULT 0,
-    deleted BOOLEAN DEFAULT FALSE
-);
\ No newline at end of file
+    deleted BOOLEAN DEFAULT FALSE,
+    rating REAL NOT NULL DEFAULT 1500,
+    win_pct REAL GENERATED ALWAYS AS (wins * 1.0 / battles) STORED
+);
+
+-- The leaderboard only ever reads live meals that have fought, so index just those rows
+CREATE INDEX idx_meals_leaderboard_wins ON meals (wins DESC) WHERE deleted = FALSE AND battles > 0;
+CREATE INDEX idx_meals_leaderboard_win_pct ON meals (win_pct DESC) WHERE deleted = FALSE AND battles > 0;
+CREATE INDEX idx_meals_leaderboard_rating ON meals (rating DESC) WHERE deleted = FALSE AND battles > 0;
+
+-- Full-text index of meal names and cuisines for search and autocomplete. It stores no copy of the text,
+-- reading it back from meals, and the triggers keep it in step; stats updates do not touch it.
+-- The prefix indexes answer autocomplete prefixes of up to 3 characters without scanning terms.
+DROP TABLE IF EXISTS meals_fts;
+CREATE VIRTUAL TABLE meals_fts USING fts5(meal, cuisine, content='meals', content_rowid='id', prefix='1 2 3');
+
+CREATE TRIGGER meals_fts_insert AFTER INSERT ON meals BEGIN
+    INSERT INTO meals_fts (rowid, meal, cuisine) VALUES (new.id, new.meal, new.cuisine);
+END;
+CREATE TRIGGER meals_fts_delete AFTER DELETE ON meals BEGIN
+    INSERT INTO meals_fts (meals_fts, rowid, meal, cuisine) VALUES ('delete', old.id, old.meal, old.cuisine);
+END;
+CREATE TRIGGER meals_fts_update AFTER UPDATE OF meal, cuisine ON meals BEGIN
+    INSERT INTO meals_fts (meals_fts, rowid, meal, cuisine) VALUES ('delete', old.id, old.meal, old.cuisine);
+    INSERT INTO meals_fts (rowid, meal, cuisine) VALUES (new.id, new.meal, new.cuisine);
+END;
+
+-- Counts changes to meals so caches can tell them from writes to other tables. The count is never reset:
+-- it starts from the creation time in milliseconds, so a recreated database does not reuse old counts.
+CREATE TABLE IF NOT EXISTS meal_changes (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    count INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meal_changes (id, count) VALUES (1, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER));
+-- Recreating meals fires no delete trigger, so count it here
+UPDATE meal_changes SET count = count + 1;
+
+CREATE TRIGGER meal_changes_insert AFTER INSERT ON meals BEGIN
+    UPDATE meal_changes SET count = count + 1;
+END;
+CREATE TRIGGER meal_changes_delete AFTER DELETE ON meals BEGIN
+    UPDATE meal_changes SET count = count + 1;
+END;
+CREATE TRIGGER meal_changes_update AFTER UPDATE ON meals BEGIN
+    UPDATE meal_changes SET count = count + 1;
+END;
+
+-- Every battle as it was fought, appended in batches by the battle log
+DROP TABLE IF EXISTS battles;
+CREATE TABLE battles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    meal_1_id INTEGER NOT NULL,
+    meal_2_id INTEGER NOT NULL,
+    score_1 REAL NOT NULL,
+    score_2 REAL NOT NULL,
+    delta REAL NOT NULL,
+    random_number REAL NOT NULL,
+    winner_id INTEGER NOT NULL,
+    fought_at REAL NOT NULL
+);
+
+-- A meal's history newest first comes from one range per side; the pair index serves head-to-head records
+CREATE INDEX idx_battles_meal_1 ON battles (meal_1_id);
+CREATE INDEX idx_battles_meal_2 ON battles (meal_2_id);
+CREATE INDEX idx_battles_pair ON battles (min(meal_1_id, meal_2_id), max(meal_1_id, meal_2_id));
+
+-- Head-to-head totals of battles past the retention period, keyed by the lower meal id first
+DROP TABLE IF EXISTS battle_pairs;
+CREATE TABLE battle_pairs (
+    meal_low_id INTEGER NOT NULL,
+    meal_high_id INTEGER NOT NULL,
+    battles INTEGER NOT NULL,
+    low_wins INTEGER NOT NULL,
+    PRIMARY KEY (meal_low_id, meal_high_id)
+) WITHOUT ROWID;
+
+-- Winner and loser of every compacted battle under its original id, so ratings can still be replayed in order
+DROP TABLE IF EXISTS battle_results;
+CREATE TABLE battle_results (
+    id INTEGER PRIMARY KEY,
+    winner_id INTEGER NOT NULL,
+    loser_id INTEGER NOT NULL
+);
+
+-- Battle arenas shared by every worker process when ARENA_PERSIST is on; the default arena always exists
+DROP TABLE IF EXISTS arenas;
+CREATE TABLE arenas (
+    id TEXT PRIMARY KEY,
+    combatant_ids TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+INSERT INTO arenas (id, last_used) VALUES ('default', strftime('%s', 'now'));
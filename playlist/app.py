@@ -1,15 +1,43 @@
+import time
+
 from dotenv import load_dotenv
-from flask import Flask, jsonify, make_response, Response, request
+from flask import Flask, g, jsonify, make_response, Response, request
+from flask.logging import default_handler
 
 from music_collection.models import song_model
 from music_collection.models.playlist_model import PlaylistModel
-from music_collection.utils.sql_utils import check_database_connection, check_table_exists
+from music_collection.utils.http_cache import conditional
+from music_collection.utils.json_utils import FastJSONProvider, array_response
+from music_collection.utils.random_utils import get_random_source_stats
+from music_collection.utils.sql_utils import check_database_connection, check_table_exists, get_pool_stats
+from music_collection.utils.logger import configure_logger
+from music_collection.utils.metrics import increment, observe, render_metrics
 
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
+# jsonify encodes with orjson when it is installed
+app.json = FastJSONProvider(app)
+# Route logs go through the same background writer as the models
+app.logger.removeHandler(default_handler)
+configure_logger(app.logger)
+
+# Time every request for /api/metrics
+@app.before_request
+def start_request_timer() -> None:
+    """Notes when the request started so its latency can be recorded."""
+    g.request_start = time.perf_counter_ns()
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Records the request latency and status under its route pattern rather than the raw path."""
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    observe("http_request_duration_seconds", time.perf_counter_ns() - g.request_start, method=request.method, route=route)
+    increment("http_requests_total", method=request.method, route=route, status=response.status_code)
+    return response
+
 
 playlist_model = PlaylistModel()
 
@@ -53,6 +81,61 @@ def db_check() -> Response:
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 404)
 
+@app.route('/api/db-pool-stats', methods=['GET'])
+def db_pool_stats() -> Response:
+    """
+    Route to report database connection pool usage, including checkout wait times.
+
+    Returns:
+        JSON response with the pool statistics.
+    """
+    try:
+        app.logger.info("Retrieving database pool statistics")
+        return make_response(jsonify({'status': 'success', 'pool': get_pool_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving database pool statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/random-source-stats', methods=['GET'])
+def random_source_stats() -> Response:
+    """
+    Route to report how many random draws were served and how many random.org calls were saved.
+
+    Returns:
+        JSON response with the random source statistics.
+    """
+    try:
+        app.logger.info("Retrieving random source statistics")
+        return make_response(jsonify({'status': 'success', 'random_source': get_random_source_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving random source statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/write-behind-stats', methods=['GET'])
+def write_behind_stats() -> Response:
+    """
+    Route to report whether play counts are written behind, and how many are pending and written.
+
+    Returns:
+        JSON response with the write-behind statistics.
+    """
+    try:
+        app.logger.info("Retrieving write-behind statistics")
+        return make_response(jsonify({'status': 'success', 'write_behind': song_model.get_play_count_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving write-behind statistics: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics() -> Response:
+    """
+    Route to export request, query and random number latencies in the Prometheus text format.
+
+    Returns:
+        Text response with the p50, p95 and p99 latency of every route and query.
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 
 ##########################################################
 #
@@ -137,6 +220,7 @@ def delete_song(song_id: int) -> Response:
 
 
 @app.route('/api/get-all-songs-from-catalog', methods=['GET'])
+@conditional(song_model.get_catalog_version)
 def get_all_songs() -> Response:
     """
     Route to retrieve all songs in the catalog (non-deleted), with an option to sort by play count.
@@ -154,7 +238,8 @@ def get_all_songs() -> Response:
         app.logger.info("Retrieving all songs from the catalog, sort_by_play_count=%s", sort_by_play_count)
         songs = song_model.get_all_songs(sort_by_play_count=sort_by_play_count)
 
-        return make_response(jsonify({'status': 'success', 'songs': songs}), 200)
+        # Large catalogs are streamed in chunks instead of encoded into one body
+        return make_response(array_response('songs', songs, status='success'), 200)
     except Exception as e:
         app.logger.error(f"Error retrieving songs: {e}")
         return make_response(jsonify({'error': str(e)}), 500)
@@ -707,6 +792,7 @@ def swap_songs_in_playlist() -> Response:
 ############################################################
 
 @app.route('/api/song-leaderboard', methods=['GET'])
+@conditional(song_model.get_catalog_version)
 def get_song_leaderboard() -> Response:
     """
     Route to get a list of all sorted by play count.
@@ -719,7 +805,7 @@ def get_song_leaderboard() -> Response:
     try:
         app.logger.info("Generating song leaderboard sorted")
         leaderboard_data = song_model.get_all_songs(sort_by_play_count=True)
-        return make_response(jsonify({'status': 'success', 'leaderboard': leaderboard_data}), 200)
+        return make_response(array_response('leaderboard', leaderboard_data, status='success'), 200)
     except Exception as e:
         app.logger.error(f"Error generating leaderboard: {e}")
         return make_response(jsonify({'error': str(e)}), 500)
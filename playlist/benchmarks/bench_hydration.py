@@ -0,0 +1,114 @@
+"""Compares the memory and build rate of songs hydrated from database rows.
+
+The legacy path is the previous Song, a dataclass with a __dict__ that
+re-validated every row. Each path reads every song of a generated database,
+so the rates include the query. Run from the playlist directory:
+
+    python -m benchmarks.bench_hydration --sizes 1000000
+"""
+import argparse
+from dataclasses import dataclass
+import gc
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.datagen import populate
+from music_collection.models.song_model import Song, song_from_row, song_row_factory
+
+
+SELECT_SONGS = "SELECT id, artist, title, year, genre, duration FROM songs"
+
+
+@dataclass
+class LegacySong:
+    """The previous implementation: one __dict__ per song, validated on every build."""
+    id: int
+    artist: str
+    title: str
+    year: int
+    genre: str
+    duration: int
+
+    def __post_init__(self):
+        if self.duration <= 0:
+            raise ValueError(f"Duration must be greater than 0, got {self.duration}")
+        if self.year <= 1900:
+            raise ValueError(f"Year must be greater than 1900, got {self.year}")
+
+def legacy(conn: sqlite3.Connection) -> list:
+    return [LegacySong(id=row[0], artist=row[1], title=row[2], year=row[3], genre=row[4], duration=row[5])
+            for row in conn.execute(SELECT_SONGS).fetchall()]
+
+def validated(conn: sqlite3.Connection) -> list:
+    return [Song(id=row[0], artist=row[1], title=row[2], year=row[3], genre=row[4], duration=row[5])
+            for row in conn.execute(SELECT_SONGS).fetchall()]
+
+def from_row(conn: sqlite3.Connection) -> list:
+    return [song_from_row(row) for row in conn.execute(SELECT_SONGS).fetchall()]
+
+def row_factory(conn: sqlite3.Connection) -> list:
+    cursor = conn.cursor()
+    cursor.row_factory = song_row_factory
+    return cursor.execute(SELECT_SONGS).fetchall()
+
+def tuples(conn: sqlite3.Connection) -> list:
+    return conn.execute(SELECT_SONGS).fetchall()
+
+PATHS = [
+    ("tuples (no objects)", tuples),
+    ("legacy dataclass", legacy),
+    ("Song() validated", validated),
+    ("song_from_row", from_row),
+    ("song_row_factory", row_factory),
+]
+
+def retained_bytes(build, conn: sqlite3.Connection) -> int:
+    """Returns how many bytes the built list keeps alive after the query is done, field values included.
+
+    Measured with tracemalloc rather than sys.getsizeof, since Python 3.11+
+    only allocates an instance __dict__ once something asks for it.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        built = build(conn)
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del built
+    return size
+
+def run(sizes: list, repeat: int) -> None:
+    print(f"{'songs':>10} {'path':<22} {'bytes/row':>10} {'best s':>8} {'rows/s':>12}")
+    for num_songs in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "song_catalog.db")
+            populate(db_path, num_songs)
+            conn = sqlite3.connect(db_path)
+            try:
+                for name, build in PATHS:
+                    best = float("inf")
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        built = build(conn)
+                        best = min(best, time.perf_counter() - start)
+                    del built
+                    per_row = retained_bytes(build, conn) / num_songs
+                    print(f"{num_songs:>10} {name:<22} {per_row:>10.0f} {best:>8.3f} {num_songs / best:>12,.0f}")
+            finally:
+                conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark hydrating songs from database rows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path; the best one is reported")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    run(args.sizes, args.repeat)
@@ -0,0 +1,98 @@
+"""Compares the encode time and peak memory of catalog responses.
+
+Each path encodes the get-all-songs payload, ``{"status": ..., "songs": [...]}``,
+either as the dicts get_all_songs returns or as Song objects. "stdlib jsonify"
+is what Flask's default provider did before FastJSONProvider; the streamed
+paths join the chunks array_response would send, keeping only one chunk of
+encoded items alive at a time. Run from the playlist directory:
+
+    python -m benchmarks.bench_json --sizes 100000
+"""
+import argparse
+import dataclasses
+import gc
+import json
+import logging
+import time
+import tracemalloc
+
+from flask.json.provider import DefaultJSONProvider
+
+from music_collection.models.song_model import Song
+from music_collection.utils import json_utils
+
+
+GENRES = ["Pop", "Rock", "Jazz", "Hip-Hop", "Classical", "Country"]
+
+
+def make_songs(num_songs: int) -> list:
+    return [Song(id=i, artist=f"Artist {i % 5000}", title=f"Song title number {i}", year=1950 + i % 70,
+                 genre=GENRES[i % len(GENRES)], duration=120 + i % 240)
+            for i in range(1, num_songs + 1)]
+
+def stdlib_jsonify(payload: dict) -> int:
+    return len(json.dumps(payload, default=DefaultJSONProvider.default, sort_keys=True,
+                          separators=(",", ":"), ensure_ascii=True).encode() + b"\n")
+
+def fallback_dumps(payload: dict) -> int:
+    encoder, json_utils.orjson = json_utils.orjson, None
+    try:
+        return len(json_utils.dumps(payload) + b"\n")
+    finally:
+        json_utils.orjson = encoder
+
+def orjson_dumps(payload: dict) -> int:
+    return len(json_utils.dumps(payload) + b"\n")
+
+def streamed(payload: dict) -> int:
+    fields = {key: value for key, value in payload.items() if key != "songs"}
+    return sum(len(chunk) for chunk in json_utils.iter_array_chunks(fields, "songs", payload["songs"]))
+
+PATHS = [
+    ("stdlib jsonify", stdlib_jsonify),
+    ("json_utils fallback", fallback_dumps),
+    ("orjson", orjson_dumps),
+    ("orjson streamed", streamed),
+]
+
+def peak_bytes(encode, payload: dict) -> int:
+    """Returns the most memory an encode allocates on top of the payload."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        encode(payload)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def run(sizes: list, repeat: int) -> None:
+    if json_utils.orjson is None:
+        print("orjson is not installed; the orjson paths use the standard library encoder")
+    print(f"{'songs':>10} {'items':<6} {'path':<20} {'best s':>8} {'songs/s':>12} {'peak MB':>8} {'body MB':>8}")
+    for num_songs in sizes:
+        songs = make_songs(num_songs)
+        payloads = [
+            ("dicts", {"status": "success", "songs": [dataclasses.asdict(song) for song in songs]}),
+            ("Song", {"status": "success", "songs": songs}),
+        ]
+        for items, payload in payloads:
+            for name, encode in PATHS:
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    size = encode(payload)
+                    best = min(best, time.perf_counter() - start)
+                peak = peak_bytes(encode, payload)
+                print(f"{num_songs:>10} {items:<6} {name:<20} {best:>8.3f} {num_songs / best:>12,.0f} "
+                      f"{peak / 1e6:>8.1f} {size / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark encoding catalog responses as JSON.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path; the best one is reported")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    run(args.sizes, args.repeat)
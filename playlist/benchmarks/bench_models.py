@@ -0,0 +1,143 @@
+"""Micro-benchmarks for every song_model and PlaylistModel operation.
+
+Each catalog size gets a fresh generated database behind the real connection
+pool, and random numbers come from a local random.org stub, so nothing leaves
+the machine. Run from the playlist directory:
+
+    python -m benchmarks.bench_models --sizes 10000 100000 1000000 --output results.json
+    python -m benchmarks.bench_models --baseline results.json
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+import tempfile
+
+from benchmarks.common import load_baseline, measure, print_table, regressions, save_results
+from benchmarks.datagen import populate
+from music_collection.models import song_model
+from music_collection.models.playlist_model import PlaylistModel
+from music_collection.utils import random_utils, sql_utils
+from music_collection.utils.random_stub import RandomOrgStub
+
+
+def live_ids(rng: random.Random, num_songs: int):
+    """Yields random ids of generated songs that are not soft deleted."""
+    while True:
+        song_id = rng.randrange(1, num_songs + 1)
+        if (song_id - 1) % 10:
+            yield song_id
+
+def benchmarks(num_songs: int, playlist_size: int, rng: random.Random) -> list:
+    """Returns (name, func, setup, iterations) for every operation, in the order they are run.
+
+    clear_catalog runs last because it empties the database.
+    """
+    ids = live_ids(rng, num_songs)
+    titles = (f"Bench song {i}" for i in itertools.count())
+    songs = []
+    seen = set()
+    while len(songs) < playlist_size:
+        song = song_model.get_song_by_id(next(ids))
+        if song.id not in seen:
+            seen.add(song.id)
+            songs.append(song)
+    first, middle, last = songs[0], songs[len(songs) // 2], songs[-1]
+    playlist_model = PlaylistModel()
+
+    def create_song() -> str:
+        title = next(titles)
+        song_model.create_song("Bench Artist", title, 2000, "Pop", 200)
+        return title
+
+    def prep_delete():
+        # The id of a fresh live song for the timed delete_song call
+        prep_delete.song_id = song_model.get_song_by_compound_key("Bench Artist", create_song(), 2000).id
+
+    def fill_playlist():
+        playlist_model.playlist = list(songs)
+        playlist_model.current_track_number = 1
+
+    def fill_all_but_last():
+        playlist_model.playlist = list(songs[:-1])
+
+    return [
+        ("song.create_song", create_song, None, 1000),
+        ("song.get_song_by_id", lambda: song_model.get_song_by_id(next(ids)), None, 10000),
+        ("song.get_song_by_compound_key", lambda: song_model.get_song_by_compound_key(middle.artist, middle.title, middle.year), None, 10000),
+        ("song.get_random_song", song_model.get_random_song, None, 10000),
+        ("song.update_play_count", lambda: song_model.update_play_count(next(ids)), None, 1000),
+        ("song.get_all_songs", song_model.get_all_songs, None, 20),
+        ("song.get_all_songs by play count", lambda: song_model.get_all_songs(sort_by_play_count=True), None, 20),
+        ("song.delete_song", lambda: song_model.delete_song(prep_delete.song_id), prep_delete, 1000),
+        ("playlist.add_song_to_playlist", lambda: playlist_model.add_song_to_playlist(last), fill_all_but_last, 10000),
+        ("playlist.remove_song_by_song_id", lambda: playlist_model.remove_song_by_song_id(middle.id), fill_playlist, 10000),
+        ("playlist.remove_song_by_track_number", lambda: playlist_model.remove_song_by_track_number(playlist_size // 2),
+         fill_playlist, 10000),
+        ("playlist.clear_playlist", playlist_model.clear_playlist, fill_playlist, 10000),
+        ("playlist.get_all_songs", playlist_model.get_all_songs, fill_playlist, 10000),
+        ("playlist.get_song_by_song_id", lambda: playlist_model.get_song_by_song_id(last.id), fill_playlist, 10000),
+        ("playlist.get_song_by_track_number", lambda: playlist_model.get_song_by_track_number(playlist_size),
+         fill_playlist, 10000),
+        ("playlist.get_current_song", playlist_model.get_current_song, fill_playlist, 10000),
+        ("playlist.get_playlist_length", playlist_model.get_playlist_length, fill_playlist, 10000),
+        ("playlist.get_playlist_duration", playlist_model.get_playlist_duration, fill_playlist, 10000),
+        ("playlist.go_to_track_number", lambda: playlist_model.go_to_track_number(playlist_size), fill_playlist, 10000),
+        ("playlist.move_song_to_beginning", lambda: playlist_model.move_song_to_beginning(last.id), fill_playlist, 10000),
+        ("playlist.move_song_to_end", lambda: playlist_model.move_song_to_end(first.id), fill_playlist, 10000),
+        ("playlist.move_song_to_track_number", lambda: playlist_model.move_song_to_track_number(first.id, playlist_size // 2),
+         fill_playlist, 10000),
+        ("playlist.swap_songs_in_playlist", lambda: playlist_model.swap_songs_in_playlist(first.id, last.id),
+         fill_playlist, 10000),
+        ("playlist.play_current_song", playlist_model.play_current_song, fill_playlist, 1000),
+        ("playlist.play_entire_playlist", playlist_model.play_entire_playlist, fill_playlist, 50),
+        ("playlist.play_rest_of_playlist", playlist_model.play_rest_of_playlist, fill_playlist, 50),
+        ("playlist.rewind_playlist", playlist_model.rewind_playlist, fill_playlist, 10000),
+        ("song.clear_catalog", song_model.clear_catalog, None, 1),
+    ]
+
+def run(sizes: list, playlist_size: int, budget: float, seed: int, only: str = None) -> dict:
+    results = {}
+    stub = RandomOrgStub(seed=seed).start()
+    random_utils._source = random_utils.RandomIndexSource(base_url=stub.url, batch_size=1000)
+    os.environ.setdefault("SQL_CREATE_TABLE_PATH", os.path.join(os.path.dirname(__file__), "..", "sql", "create_song_table.sql"))
+    try:
+        for num_songs in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                sql_utils.DB_PATH = os.path.join(tmp, "song_catalog.db")
+                populate(sql_utils.DB_PATH, num_songs, seed)
+                song_model._invalidate_live_song_ids()
+
+                for name, func, setup, iterations in benchmarks(num_songs, playlist_size, random.Random(seed)):
+                    if only and only not in name:
+                        continue
+                    results[f"{name} [{num_songs}]"] = measure(func, iterations, budget, setup)
+                sql_utils.close_pool()
+    finally:
+        stub.stop()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the song model and playlist model operations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000], help="numbers of songs to generate")
+    parser.add_argument("--playlist-size", type=int, default=100, help="songs in the playlist under test")
+    parser.add_argument("--budget", type=float, default=2.0, help="most seconds to spend timing each operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="run only the benchmarks whose name contains this text")
+    parser.add_argument("--output", help="save the results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    baseline = load_baseline(args.baseline)
+    results = run(args.sizes, args.playlist_size, args.budget, args.seed, args.only)
+    print_table(results, baseline)
+    if args.output:
+        save_results(args.output, results, vars(args))
+    slower = regressions(results, baseline)
+    if slower:
+        print(f"{len(slower)} benchmarks regressed against the baseline: {', '.join(slower)}")
+        sys.exit(1)
@@ -0,0 +1,68 @@
+"""Compares the O(1) random song pick with the old load-the-whole-catalog path.
+
+Run from the playlist directory:
+
+    python -m benchmarks.bench_random_song --sizes 1000 100000 1000000
+"""
+import argparse
+import logging
+import os
+import secrets
+import tempfile
+import time
+
+from benchmarks.datagen import populate
+from music_collection.models import song_model
+from music_collection.models.song_model import Song
+from music_collection.utils import sql_utils
+
+
+def local_random(num_songs: int) -> int:
+    """Stands in for random.org so the benchmark measures only the database path."""
+    return secrets.randbelow(num_songs) + 1
+
+def legacy_random_song() -> Song:
+    """The previous implementation: materialise every live song, then pick one."""
+    all_songs = song_model.get_all_songs()
+    song_data = all_songs[local_random(len(all_songs)) - 1]
+    return Song(id=song_data["id"], artist=song_data["artist"], title=song_data["title"],
+                year=song_data["year"], genre=song_data["genre"], duration=song_data["duration"])
+
+def time_calls(func, iterations: int) -> float:
+    """Returns the mean wall time per call in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+def run(sizes: list, legacy_budget: float) -> None:
+    song_model.get_random = local_random
+    print(f"{'songs':>10} {'legacy ms':>12} {'cold ms':>10} {'warm ms':>10} {'speedup':>10}")
+    for num_songs in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            sql_utils.DB_PATH = os.path.join(tmp, "song_catalog.db")
+            populate(sql_utils.DB_PATH, num_songs)
+            song_model._invalidate_live_song_ids()
+
+            # Run the slow path until the time budget is spent, but at least once
+            iterations, elapsed, start = 0, 0.0, time.perf_counter()
+            while iterations == 0 or elapsed < legacy_budget:
+                legacy_random_song()
+                iterations += 1
+                elapsed = time.perf_counter() - start
+            legacy_ms = elapsed * 1000 / iterations
+
+            cold_ms = time_calls(song_model.get_random_song, 1)
+            warm_ms = time_calls(song_model.get_random_song, 1000)
+            print(f"{num_songs:>10} {legacy_ms:>12.3f} {cold_ms:>10.3f} {warm_ms:>10.3f} {legacy_ms / warm_ms:>9.0f}x")
+            sql_utils.close_pool()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark random song selection.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--legacy-budget", type=float, default=2.0, help="seconds to spend timing the legacy path")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    run(args.sizes, args.legacy_budget)
@@ -0,0 +1,63 @@
+"""Generates a song catalog database for the benchmarks.
+
+Run from the playlist directory:
+
+    python -m benchmarks.datagen --songs 100000 --db /tmp/song_catalog.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+
+
+SQL_CREATE_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "create_song_table.sql")
+
+GENRES = ("Pop", "Rock", "Jazz", "Hip Hop", "Country", "Classical", "Electronic", "Folk", "Blues", "Reggae")
+
+# rows inserted per executemany call
+INSERT_BATCH_SIZE = 10_000
+
+
+def generate_songs(num_songs: int, seed: int = 0, deleted_every: int = 10):
+    """Yields (artist, title, year, genre, duration, play_count, deleted) rows.
+
+    Song i is "Song i" by "Artist i % 1000", and every deleted_every-th song
+    is soft deleted. The same seed gives the same rows.
+    """
+    rng = random.Random(seed)
+    for i in range(num_songs):
+        yield (
+            f"Artist {i % 1000}",
+            f"Song {i}",
+            1950 + i % 70,
+            rng.choice(GENRES),
+            rng.randint(90, 420),
+            rng.randrange(1000) if rng.random() < 0.5 else 0,
+            bool(deleted_every) and i % deleted_every == 0,
+        )
+
+def populate(db_path: str, num_songs: int, seed: int = 0) -> None:
+    """Creates the songs table at db_path, replacing any existing one, and fills it with num_songs songs."""
+    conn = sqlite3.connect(db_path)
+    with open(SQL_CREATE_TABLE_PATH) as fh:
+        conn.executescript(fh.read())
+    rows = generate_songs(num_songs, seed)
+    insert = "INSERT INTO songs (artist, title, year, genre, duration, play_count, deleted) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    while True:
+        batch = [row for _, row in zip(range(INSERT_BATCH_SIZE), rows)]
+        if not batch:
+            break
+        conn.executemany(insert, batch)
+    conn.commit()
+    conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a song catalog database for benchmarking.")
+    parser.add_argument("--songs", type=int, default=10_000)
+    parser.add_argument("--db", required=True, help="path of the database file to create")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    populate(args.db, args.songs, args.seed)
+    print(f"Created {args.songs} songs in {args.db}")
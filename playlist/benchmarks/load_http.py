@@ -0,0 +1,168 @@
+"""End-to-end HTTP load driver for the playlist service.
+
+Fills the playlist, then sends a weighted mix of catalog lookups, random
+songs and plays from several concurrent clients and reports throughput and
+latency percentiles per request type. Without --url it serves the app
+in-process on a generated catalog, with random numbers from a local
+random.org stub. Run from the playlist directory:
+
+    python -m benchmarks.load_http --songs 100000 --concurrency 8 --duration 30 --output load.json
+    python -m benchmarks.load_http --url http://localhost:5000 --baseline load.json
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from urllib.parse import urlencode
+
+import requests
+
+from benchmarks.common import load_baseline, print_table, regressions, save_results, summarize
+from benchmarks.datagen import populate
+
+
+def song_key(song_id: int) -> dict:
+    """Returns the compound key benchmarks.datagen gave the song with this id."""
+    i = song_id - 1
+    return {"artist": f"Artist {i % 1000}", "title": f"Song {i}", "year": 1950 + i % 70}
+
+def live_id(rng: random.Random, num_songs: int) -> int:
+    """Returns the id of a random generated song that is not soft deleted."""
+    song_id = rng.randrange(1, num_songs + 1)
+    return song_id if (song_id - 1) % 10 else song_id + 1 if song_id < num_songs else 2
+
+def scenarios(num_songs: int) -> list:
+    """Returns (name, weight, make_request) for every request type in the mix.
+
+    make_request takes a random.Random and returns (method, path, json body).
+    """
+    return [
+        ("GET /api/get-song-from-catalog-by-id", 40,
+         lambda rng: ("GET", f"/api/get-song-from-catalog-by-id/{live_id(rng, num_songs)}", None)),
+        ("GET /api/get-song-from-catalog-by-compound-key", 20,
+         lambda rng: ("GET", "/api/get-song-from-catalog-by-compound-key?"
+                      + urlencode(song_key(live_id(rng, num_songs))), None)),
+        ("GET /api/get-random-song", 25, lambda rng: ("GET", "/api/get-random-song", None)),
+        ("POST /api/play-current-song", 10, lambda rng: ("POST", "/api/play-current-song", None)),
+        ("GET /api/get-current-song", 5, lambda rng: ("GET", "/api/get-current-song", None)),
+    ]
+
+def fill_playlist(base_url: str, num_songs: int, playlist_size: int, seed: int) -> None:
+    """Clears the playlist and adds playlist_size distinct live songs to it."""
+    rng = random.Random(seed)
+    song_ids = set()
+    while len(song_ids) < min(playlist_size, num_songs * 9 // 10):
+        song_ids.add(live_id(rng, num_songs))
+    with requests.Session() as session:
+        session.post(base_url + "/api/clear-playlist", timeout=30).raise_for_status()
+        for song_id in sorted(song_ids):
+            session.post(base_url + "/api/add-song-to-playlist", json=song_key(song_id), timeout=30).raise_for_status()
+
+def worker(base_url: str, mix: list, deadline: float, seed: int, samples: dict, statuses: Counter,
+           lock: threading.Lock) -> None:
+    """Sends requests until the deadline, recording each latency under its request type."""
+    rng = random.Random(seed)
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    makers = {name: make for name, _, make in mix}
+    local = defaultdict(list)
+    local_statuses = Counter()
+    with requests.Session() as session:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = makers[name](rng)
+            start = time.perf_counter()
+            try:
+                status = session.request(method, base_url + path, json=body, timeout=30).status_code
+            except requests.RequestException:
+                status = "error"
+            local[name].append((time.perf_counter() - start) * 1000)
+            local_statuses[status] += 1
+    with lock:
+        for name, latencies in local.items():
+            samples[name].extend(latencies)
+        statuses.update(local_statuses)
+
+def run_load(base_url: str, num_songs: int, concurrency: int, duration: float, seed: int) -> dict:
+    """Runs the request mix against base_url and returns a summary per request type and overall."""
+    mix = scenarios(num_songs)
+    samples = defaultdict(list)
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(base_url, mix, deadline, seed + i, samples, statuses, lock))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize(latencies, elapsed) for name, latencies in sorted(samples.items())}
+    results["all requests"] = summarize([ms for latencies in samples.values() for ms in latencies], elapsed)
+    print("Status codes: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    return results
+
+def serve_in_process(num_songs: int, seed: int):
+    """Serves the app on a free local port over a generated catalog; returns (base url, shutdown)."""
+    from music_collection.utils.random_stub import RandomOrgStub
+
+    tmp = tempfile.TemporaryDirectory()
+    stub = RandomOrgStub(seed=seed).start()
+    os.environ["DB_PATH"] = os.path.join(tmp.name, "song_catalog.db")
+    os.environ["RANDOM_ORG_URL"] = stub.url
+    os.environ.setdefault("SQL_CREATE_TABLE_PATH", os.path.join(os.path.dirname(__file__), "..", "sql", "create_song_table.sql"))
+    populate(os.environ["DB_PATH"], num_songs, seed)
+
+    # Imported only now so the app picks up the database and stub configured above
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def shutdown():
+        server.shutdown()
+        stub.stop()
+        tmp.cleanup()
+
+    return f"http://127.0.0.1:{server.server_port}", shutdown
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Drive HTTP load against the playlist service.")
+    parser.add_argument("--url", help="base URL of a running service; by default one is served in-process")
+    parser.add_argument("--songs", type=int, default=10_000,
+                        help="songs to generate, or how many the running service's generated catalog holds")
+    parser.add_argument("--playlist-size", type=int, default=50, help="songs to add to the playlist before the run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to send requests for")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    baseline = load_baseline(args.baseline)
+    base_url, shutdown = (args.url.rstrip("/"), None) if args.url else serve_in_process(args.songs, args.seed)
+    try:
+        fill_playlist(base_url, args.songs, args.playlist_size, args.seed)
+        results = run_load(base_url, args.songs, args.concurrency, args.duration, args.seed)
+    finally:
+        if shutdown:
+            shutdown()
+    print_table(results, baseline)
+    if args.output:
+        save_results(args.output, results, vars(args))
+    slower = regressions(results, baseline)
+    if slower:
+        print(f"{len(slower)} request types regressed against the baseline: {', '.join(slower)}")
+        sys.exit(1)
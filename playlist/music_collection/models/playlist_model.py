@@ -260,12 +260,12 @@ class PlaylistModel:
         """
         self.check_if_empty()
         current_song = self.get_song_by_track_number(self.current_track_number)
-        logger.info("Playing song: %s (ID: %d) at track number: %d", current_song.title, current_song.id, self.current_track_number)
+        logger.debug("Playing song: %s (ID: %d) at track number: %d", current_song.title, current_song.id, self.current_track_number)
         update_play_count(current_song.id)
-        logger.info("Updated play count for song: %s (ID: %d)", current_song.title, current_song.id)
+        logger.debug("Updated play count for song: %s (ID: %d)", current_song.title, current_song.id)
         previous_track_number = self.current_track_number
         self.current_track_number = (self.current_track_number % self.get_playlist_length()) + 1
-        logger.info("Track number updated from %d to %d", previous_track_number, self.current_track_number)
+        logger.debug("Track number updated from %d to %d", previous_track_number, self.current_track_number)
 
     def play_entire_playlist(self) -> None:
         """
@@ -280,7 +280,7 @@ class PlaylistModel:
         self.current_track_number = 1
         logger.info("Reset current track number to 1.")
         for _ in range(self.get_playlist_length()):
-            logger.info("Playing track number: %d", self.current_track_number)
+            logger.debug("Playing track number: %d", self.current_track_number)
             self.play_current_song()
         logger.info("Finished playing the entire playlist. Current track number reset to 1.")
 
@@ -295,7 +295,7 @@ class PlaylistModel:
         self.check_if_empty()
         logger.info("Starting to play the rest of the playlist from track number: %d", self.current_track_number)
         for _ in range(self.get_playlist_length() - self.current_track_number + 1):
-            logger.info("Playing track number: %d", self.current_track_number)
+            logger.debug("Playing track number: %d", self.current_track_number)
             self.play_current_song()
         logger.info("Finished playing the rest of the playlist. Current track number reset to 1.")
 
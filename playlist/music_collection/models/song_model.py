@@ -1,19 +1,40 @@
+from array import array
+import atexit
 from dataclasses import dataclass
 import logging
 import os
 import sqlite3
+import threading
 
 from music_collection.utils.logger import configure_logger
+from music_collection.utils.metrics import timed
 from music_collection.utils.random_utils import get_random
-from music_collection.utils.sql_utils import get_db_connection
+from music_collection.utils.sql_utils import get_data_version, get_db_connection
+from music_collection.utils.write_behind import WriteBehindCounters
 
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-@dataclass
+# Write-behind mode for update_play_count: plays are counted in memory and written in one
+# transaction every STATS_FLUSH_INTERVAL_MS milliseconds or STATS_FLUSH_MAX_EVENTS plays,
+# so a crash can lose up to that window of plays
+STATS_WRITE_BEHIND = os.getenv("STATS_WRITE_BEHIND", "false").lower() == "true"
+STATS_FLUSH_INTERVAL_MS = float(os.getenv("STATS_FLUSH_INTERVAL_MS", "200"))
+STATS_FLUSH_MAX_EVENTS = int(os.getenv("STATS_FLUSH_MAX_EVENTS", "1000"))
+
+# Dense array of live song ids for random picks, and the MAX(id) of the table when it was built.
+# Songs created in this process are appended; deletes and clears drop it so the next pick rebuilds it.
+_live_song_ids = None
+_live_song_ids_max_id = None
+_live_song_ids_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
 class Song:
+    __slots__ = ("id", "artist", "title", "year", "genre", "duration")
+
     id: int
     artist: str
     title: str
@@ -27,7 +48,61 @@ class Song:
         if self.year <= 1900:
             raise ValueError(f"Year must be greater than 1900, got {self.year}")
 
+    def __getstate__(self):
+        return (self.id, self.artist, self.title, self.year, self.genre, self.duration)
+
+    def __setstate__(self, state):
+        # copy and pickle restore through here, since the frozen __setattr__ refuses them
+        _hydrate_song(self, state)
+
+
+# Slot setters that skip the frozen __setattr__, for building songs from trusted rows
+_set_id, _set_artist, _set_title, _set_year, _set_genre, _set_duration = (
+    Song.__dict__[name].__set__ for name in Song.__slots__)
+_new_song = object.__new__
+
+def _hydrate_song(song: Song, row: tuple) -> Song:
+    _set_id(song, row[0])
+    _set_artist(song, row[1])
+    _set_title(song, row[2])
+    _set_year(song, row[3])
+    _set_genre(song, row[4])
+    _set_duration(song, row[5])
+    return song
+
+def song_from_row(row: tuple) -> Song:
+    """
+    Builds a song from a database row without validating it again.
+
+    Songs are validated when they are created, and the table's CHECK
+    constraints hold the year and duration, so this is only for rows read
+    back from the songs table. Everything else goes through Song().
+
+    Args:
+        row (tuple): A row starting with id, artist, title, year, genre, duration.
+
+    Returns:
+        Song: The song in the row.
+    """
+    return _hydrate_song(_new_song(Song), row)
+
+def song_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Song:
+    """
+    A sqlite3 row factory that turns each row of a "SELECT id, artist, title,
+    year, genre, duration ..." query straight into a song, e.g.
+    cursor.row_factory = song_row_factory.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor the row was read from.
+        row (tuple): The row.
+
+    Returns:
+        Song: The song in the row.
+    """
+    return _hydrate_song(_new_song(Song), row)
 
+
+@timed("query_duration_seconds")
 def create_song(artist: str, title: str, year: int, genre: str, duration: int) -> None:
     """
     Creates a new song in the songs table.
@@ -59,6 +134,7 @@ def create_song(artist: str, title: str, year: int, genre: str, duration: int) -
                 VALUES (?, ?, ?, ?, ?)
             """, (artist, title, year, genre, duration))
             conn.commit()
+            _append_live_song_id(cursor.lastrowid)
 
             logger.info("Song created successfully: %s - %s (%d)", artist, title, year)
 
@@ -69,6 +145,7 @@ def create_song(artist: str, title: str, year: int, genre: str, duration: int) -
         logger.error("Database error while creating song: %s", str(e))
         raise sqlite3.Error(f"Database error: {str(e)}")
 
+@timed("query_duration_seconds")
 def clear_catalog() -> None:
     """
     Recreates the songs table, effectively deleting all songs.
@@ -83,6 +160,9 @@ def clear_catalog() -> None:
             cursor = conn.cursor()
             cursor.executescript(create_table_script)
             conn.commit()
+            _invalidate_live_song_ids()
+            # Pending plays belong to songs that no longer exist
+            _play_counts.discard()
 
             logger.info("Catalog cleared successfully.")
 
@@ -90,6 +170,7 @@ def clear_catalog() -> None:
         logger.error("Database error while clearing catalog: %s", str(e))
         raise e
 
+@timed("query_duration_seconds")
 def delete_song(song_id: int) -> None:
     """
     Soft deletes a song from the catalog by marking it as deleted.
@@ -119,6 +200,7 @@ def delete_song(song_id: int) -> None:
             # Perform the soft delete by setting 'deleted' to TRUE
             cursor.execute("UPDATE songs SET deleted = TRUE WHERE id = ?", (song_id,))
             conn.commit()
+            _invalidate_live_song_ids()
 
             logger.info("Song with ID %s marked as deleted.", song_id)
 
@@ -126,6 +208,7 @@ def delete_song(song_id: int) -> None:
         logger.error("Database error while deleting song: %s", str(e))
         raise e
 
+@timed("query_duration_seconds")
 def get_song_by_id(song_id: int) -> Song:
     """
     Retrieves a song from the catalog by its song ID.
@@ -155,7 +238,7 @@ def get_song_by_id(song_id: int) -> Song:
                     logger.info("Song with ID %s has been deleted", song_id)
                     raise ValueError(f"Song with ID {song_id} has been deleted")
                 logger.info("Song with ID %s found", song_id)
-                return Song(id=row[0], artist=row[1], title=row[2], year=row[3], genre=row[4], duration=row[5])
+                return song_from_row(row)
             else:
                 logger.info("Song with ID %s not found", song_id)
                 raise ValueError(f"Song with ID {song_id} not found")
@@ -164,6 +247,7 @@ def get_song_by_id(song_id: int) -> Song:
         logger.error("Database error while retrieving song by ID %s: %s", song_id, str(e))
         raise e
 
+@timed("query_duration_seconds")
 def get_song_by_compound_key(artist: str, title: str, year: int) -> Song:
     """
     Retrieves a song from the catalog by its compound key (artist, title, year).
@@ -195,7 +279,7 @@ def get_song_by_compound_key(artist: str, title: str, year: int) -> Song:
                     logger.info("Song with artist '%s', title '%s', and year %d has been deleted", artist, title, year)
                     raise ValueError(f"Song with artist '{artist}', title '{title}', and year {year} has been deleted")
                 logger.info("Song with artist '%s', title '%s', and year %d found", artist, title, year)
-                return Song(id=row[0], artist=row[1], title=row[2], year=row[3], genre=row[4], duration=row[5])
+                return song_from_row(row)
             else:
                 logger.info("Song with artist '%s', title '%s', and year %d not found", artist, title, year)
                 raise ValueError(f"Song with artist '{artist}', title '{title}', and year {year} not found")
@@ -204,6 +288,7 @@ def get_song_by_compound_key(artist: str, title: str, year: int) -> Song:
         logger.error("Database error while retrieving song by compound key (artist '%s', title '%s', year %d): %s", artist, title, year, str(e))
         raise e
 
+@timed("query_duration_seconds")
 def get_all_songs(sort_by_play_count: bool = False) -> list[dict]:
     """
     Retrieves all songs that are not marked as deleted from the catalog.
@@ -212,7 +297,8 @@ def get_all_songs(sort_by_play_count: bool = False) -> list[dict]:
         sort_by_play_count (bool): If True, sort the songs by play count in descending order.
 
     Returns:
-        list[dict]: A list of dictionaries representing all non-deleted songs with play_count.
+        list[dict]: A list of dictionaries representing all non-deleted songs with play_count,
+            including plays not written yet in write-behind mode.
 
     Logs:
         Warning: If the catalog is empty.
@@ -250,6 +336,13 @@ def get_all_songs(sort_by_play_count: bool = False) -> list[dict]:
                 }
                 for row in rows
             ]
+            pending = _play_counts.snapshot()
+            if pending:
+                for song in songs:
+                    if song["id"] in pending:
+                        song["play_count"] += pending[song["id"]][0]
+                if sort_by_play_count:
+                    songs.sort(key=lambda song: -song["play_count"])
             logger.info("Retrieved %d songs from the catalog", len(songs))
             return songs
 
@@ -257,10 +350,68 @@ def get_all_songs(sort_by_play_count: bool = False) -> list[dict]:
         logger.error("Database error while retrieving all songs: %s", str(e))
         raise e
 
+def _invalidate_live_song_ids() -> None:
+    """Drops the cached live song ids so the next random pick rebuilds them."""
+    global _live_song_ids, _live_song_ids_max_id
+    with _live_song_ids_lock:
+        _live_song_ids = None
+        _live_song_ids_max_id = None
+
+def _append_live_song_id(song_id: int) -> None:
+    """Appends a newly created song to the cached live song ids, if they are loaded."""
+    global _live_song_ids, _live_song_ids_max_id
+    with _live_song_ids_lock:
+        if _live_song_ids is None:
+            return
+        if song_id == _live_song_ids_max_id + 1:
+            _live_song_ids.append(song_id)
+            _live_song_ids_max_id = song_id
+        else:
+            # Another process inserted in between; reload rather than miss its songs
+            _live_song_ids = None
+            _live_song_ids_max_id = None
+
+def _get_live_song_ids() -> tuple:
+    """
+    Returns the cached ids of all non-deleted songs, loading them on first use.
+
+    Returns:
+        tuple: The ids as an array sorted ascending, and the table's MAX(id) when they were loaded.
+    """
+    global _live_song_ids, _live_song_ids_max_id
+    with _live_song_ids_lock:
+        if _live_song_ids:
+            return _live_song_ids, _live_song_ids_max_id
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            logger.info("Loading the ids of all non-deleted songs")
+            # One statement so the ids and MAX(id) come from the same snapshot
+            cursor.execute("""
+                SELECT id, (SELECT MAX(id) FROM songs)
+                FROM songs
+                WHERE deleted = FALSE
+                ORDER BY id
+            """)
+            rows = cursor.fetchall()
+
+        if not rows:
+            return array("q"), None
+        _live_song_ids = array("q", (row[0] for row in rows))
+        _live_song_ids_max_id = rows[0][1]
+        logger.info("Loaded %d live song ids", len(_live_song_ids))
+        return _live_song_ids, _live_song_ids_max_id
+
+@timed("query_duration_seconds")
 def get_random_song() -> Song:
     """
     Retrieves a random song from the catalog.
 
+    The pick is made from a cached array of live song ids, then the song is read
+    by primary key together with the table's MAX(id). If the song has since been
+    deleted, or songs were added by another process, the cache is rebuilt and
+    the pick is retried.
+
     Returns:
         Song: A randomly selected Song object.
 
@@ -268,35 +419,48 @@ def get_random_song() -> Song:
         ValueError: If the catalog is empty.
     """
     try:
-        all_songs = get_all_songs()
-
-        if not all_songs:
-            logger.info("Cannot retrieve random song because the song catalog is empty.")
-            raise ValueError("The song catalog is empty.")
-
-        # Get a random index using the random.org API
-        random_index = get_random(len(all_songs))
-        logger.info("Random index selected: %d (total songs: %d)", random_index, len(all_songs))
-
-        # Return the song at the random index, adjust for 0-based indexing
-        song_data = all_songs[random_index - 1]
-        return Song(
-            id=song_data["id"],
-            artist=song_data["artist"],
-            title=song_data["title"],
-            year=song_data["year"],
-            genre=song_data["genre"],
-            duration=song_data["duration"]
-        )
+        for attempt in range(3):
+            song_ids, max_id = _get_live_song_ids()
+
+            if not song_ids:
+                logger.info("Cannot retrieve random song because the song catalog is empty.")
+                raise ValueError("The song catalog is empty.")
+
+            # Get a random index using the random.org API
+            random_index = get_random(len(song_ids))
+            logger.info("Random index selected: %d (total songs: %d)", random_index, len(song_ids))
+
+            # Look up the song at the random index, adjust for 0-based indexing
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT id, artist, title, year, genre, duration, deleted, (SELECT MAX(id) FROM songs)
+                    FROM songs
+                    WHERE id = ?
+                """, (song_ids[random_index - 1],))
+                row = cursor.fetchone()
+
+            if row and not row[6] and (row[7] == max_id or attempt == 2):
+                return song_from_row(row)
+
+            logger.info("Live song ids are stale, reloading them")
+            _invalidate_live_song_ids()
+
+        logger.info("Cannot retrieve random song because the catalog keeps changing.")
+        raise ValueError("The song catalog changed while picking a random song.")
 
     except Exception as e:
         logger.error("Error while retrieving random song: %s", str(e))
         raise e
 
+@timed("query_duration_seconds")
 def update_play_count(song_id: int) -> None:
     """
     Increments the play count of a song by song ID.
 
+    In write-behind mode the song is still checked, but the play is only
+    counted in memory, to be written with others by flush_play_counts.
+
     Args:
         song_id (int): The ID of the song whose play count should be incremented.
 
@@ -304,6 +468,11 @@ def update_play_count(song_id: int) -> None:
         ValueError: If the song does not exist or is marked as deleted.
         sqlite3.Error: If there is a database error.
     """
+    if STATS_WRITE_BEHIND:
+        get_song_by_id(song_id)
+        _play_counts.add(song_id, 1)
+        return
+
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -329,3 +498,67 @@ def update_play_count(song_id: int) -> None:
     except sqlite3.Error as e:
         logger.error("Database error while updating play count for song with ID %d: %s", song_id, str(e))
         raise e
+
+def _write_play_counts(deltas: dict) -> None:
+    """
+    Writes counted plays in one transaction.
+
+    Args:
+        deltas (dict): [plays] by song ID.
+
+    Raises:
+        sqlite3.Error: If there is a database error.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("UPDATE songs SET play_count = play_count + ? WHERE id = ?",
+                               [(plays, song_id) for song_id, (plays,) in deltas.items()])
+            conn.commit()
+
+            logger.info("Wrote counted plays of %d songs", len(deltas))
+
+    except sqlite3.Error as e:
+        logger.error("Database error while writing play counts: %s", str(e))
+        raise e
+
+# Plays counted by update_play_count in write-behind mode
+_play_counts = WriteBehindCounters(_write_play_counts, 1, STATS_FLUSH_INTERVAL_MS / 1000, STATS_FLUSH_MAX_EVENTS)
+
+# Write out counted plays when the process exits
+atexit.register(lambda: _play_counts.close())
+
+def flush_play_counts() -> int:
+    """
+    Writes every play counted in write-behind mode now.
+
+    Returns:
+        int: How many plays were written.
+    """
+    return _play_counts.flush()
+
+def get_play_count_stats() -> dict:
+    """
+    Returns the pending, written and failed counters of write-behind play counts.
+
+    Returns:
+        dict: The write-behind statistics.
+    """
+    stats = _play_counts.stats()
+    stats["enabled"] = STATS_WRITE_BEHIND
+    return stats
+
+def get_catalog_version():
+    """
+    Returns a token that changes whenever the catalog or its play counts may have changed.
+
+    Plays queued in write-behind mode are counted too, since get_all_songs adds
+    them in before they are written. Used for HTTP ETags.
+
+    Returns:
+        tuple or None: The data version and the number of queued plays ever, or None if the database cannot be opened.
+    """
+    version = get_data_version()
+    if version is None:
+        return None
+    return version, _play_counts.stats()["events"]
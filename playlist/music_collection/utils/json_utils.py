@@ -0,0 +1,131 @@
+import dataclasses
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+from music_collection.utils.logger import configure_logger
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is used without it
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# arrays at least this long are streamed by array_response, JSON_STREAM_CHUNK_SIZE items per chunk
+JSON_STREAM_MIN_ITEMS = int(os.getenv("JSON_STREAM_MIN_ITEMS", "1000"))
+JSON_STREAM_CHUNK_SIZE = int(os.getenv("JSON_STREAM_CHUNK_SIZE", "1000"))
+
+# field names of each dataclass type encoded so far
+_dataclass_fields: Dict[type, Tuple[str, ...]] = {}
+
+
+def _default(obj: Any) -> Any:
+    # dataclasses.asdict deep-copies every value; reading the fields is enough for Song
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        names = _dataclass_fields.get(type(obj))
+        if names is None:
+            names = _dataclass_fields[type(obj)] = tuple(field.name for field in dataclasses.fields(obj))
+        return {name: getattr(obj, name) for name in names}
+    # NumPy scalars and arrays, told apart by module so NumPy is not imported here
+    if type(obj).__module__ == "numpy" and hasattr(obj, "tolist"):
+        return obj.tolist()
+    return DefaultJSONProvider.default(obj)
+
+def encoder_name() -> str:
+    """Returns which encoder dumps uses: 'orjson' or 'json'."""
+    return "json" if orjson is None else "orjson"
+
+def dumps(obj: Any) -> bytes:
+    """Encodes a value as compact JSON with sorted keys, like jsonify.
+
+    orjson is used when it is installed. It encodes dataclasses such as Song
+    natively, with their fields in declaration order rather than sorted.
+    Otherwise the standard library encoder is used. NumPy scalars and arrays
+    are encoded as the numbers and lists they hold, by either encoder.
+
+    Args:
+        obj (Any): The value to encode.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, sort_keys=True, separators=(",", ":")).encode()
+
+def iter_array_chunks(fields: Dict[str, Any], key: str, items: Iterable[Any],
+                      chunk_size: int = JSON_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encodes the object ``{**fields, key: items}`` a chunk of items at a time.
+
+    The array comes last, after the other fields, so only one chunk of it is
+    ever encoded in memory at once.
+
+    Args:
+        fields (dict): The other fields of the object.
+        key (str): The name of the array field.
+        items (Iterable): The array items.
+        chunk_size (int): How many items to encode per chunk.
+
+    Yields:
+        bytes: Consecutive pieces of the JSON document, ending with a newline like jsonify.
+    """
+    head = dumps(fields)[:-1]
+    yield head + (b"," if fields else b"") + dumps(key) + b":["
+    chunk = []
+    separator = b""
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield separator + dumps(chunk)[1:-1]
+            separator = b","
+            chunk = []
+    if chunk:
+        yield separator + dumps(chunk)[1:-1]
+    yield b"]}\n"
+
+def array_response(key: str, items: list, **fields: Any) -> Response:
+    """Returns the JSON response ``{**fields, key: items}``.
+
+    Arrays of JSON_STREAM_MIN_ITEMS or more are streamed in chunks rather than
+    encoded into one large body.
+
+    Args:
+        key (str): The name of the array field.
+        items (list): The array items.
+        **fields: The other fields of the response.
+
+    Returns:
+        Response: The JSON response.
+    """
+    if len(items) < JSON_STREAM_MIN_ITEMS:
+        return Response(dumps({**fields, key: items}) + b"\n", mimetype="application/json")
+    return Response(iter_array_chunks(fields, key, items), mimetype="application/json")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with dumps, so jsonify uses orjson when it is installed.
+
+    Pretty output, in debug mode or when ``compact`` is False, still goes
+    through the standard library encoder.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            kwargs.setdefault("default", _default)
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
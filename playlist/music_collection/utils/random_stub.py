@@ -0,0 +1,111 @@
+"""A local stand-in for random.org, for running the service and its tests offline.
+
+Run it with ``python -m music_collection.utils.random_stub --port 8081`` and point the
+service at it with ``RANDOM_ORG_URL=http://localhost:8081``.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+class RandomOrgStub:
+    """Serves random.org's plain-text decimal-fractions and integers endpoints.
+
+    Attributes:
+        latency (float): Seconds to sleep before answering each request.
+        fail (bool): Whether to answer every request with a 503.
+        requests (int): How many requests have been served.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.fail = False
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """The base URL to use as RANDOM_ORG_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                if stub.fail:
+                    self._reply(503, "Error: the stub is configured to fail\n")
+                    return
+
+                num = int(params.get("num", "1"))
+                with stub._lock:
+                    if parsed.path.rstrip("/") == "/decimal-fractions":
+                        dec = int(params.get("dec", "2"))
+                        values = [f"{stub._random.randrange(10 ** dec) / 10 ** dec:.{dec}f}" for _ in range(num)]
+                    elif parsed.path.rstrip("/") == "/integers":
+                        low, high = int(params["min"]), int(params["max"])
+                        values = [str(stub._random.randint(low, high)) for _ in range(num)]
+                    else:
+                        values = None
+                if values is None:
+                    self._reply(404, "Error: unknown endpoint\n")
+                else:
+                    self._reply(200, "\n".join(values) + "\n")
+
+            def _reply(self, status, body):
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "RandomOrgStub":
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server and waits for its thread to exit."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a local random.org stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to delay each response")
+    args = parser.parse_args()
+
+    stub = RandomOrgStub(args.host, args.port, latency=args.latency)
+    print(f"random.org stub listening on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
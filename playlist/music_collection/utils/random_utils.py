@@ -1,43 +1,79 @@
+from collections import deque
 import logging
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
 import requests
 
 from music_collection.utils.logger import configure_logger
+from music_collection.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-def get_random(num_songs: int) -> int:
+# base URL of random.org; point this at a local stub to run offline
+RANDOM_ORG_URL = os.getenv("RANDOM_ORG_URL", "https://www.random.org")
+
+# raw integers fetched per request
+RANDOM_BATCH_SIZE = int(os.getenv("RANDOM_BATCH_SIZE", "100"))
+
+# seconds to wait after a failed fetch before asking random.org again
+RANDOM_RETRY_AFTER = float(os.getenv("RANDOM_RETRY_AFTER", "5"))
+
+# "local" uses the OS CSPRNG when random.org is unavailable, "none" raises instead
+RANDOM_FALLBACK = os.getenv("RANDOM_FALLBACK", "local")
+
+# raw integers are drawn uniformly from [0, RAW_RANGE); random.org allows at most 1e9
+RAW_RANGE = 1_000_000_000
+
+# random.org caps a single integers request at this many numbers
+MAX_BATCH_SIZE = 10000
+
+
+def fetch_random_integers(num: int, session: requests.Session = None, base_url: str = None) -> list[int]:
     """
-    Fetches a random int between 1 and the number of songs in the catalog from random.org.
+    Fetches a batch of random ints in [0, RAW_RANGE) from random.org in one request.
+
+    Args:
+        num (int): How many integers to fetch.
+        session (requests.Session, optional): A session to reuse a keep-alive connection.
+        base_url (str, optional): The random.org base URL. Defaults to RANDOM_ORG_URL.
 
     Returns:
-        int: The random number fetched from random.org.
+        list[int]: The random integers fetched from random.org.
 
     Raises:
         RuntimeError: If the request to random.org fails or returns an invalid response.
-        ValueError: If the response from random.org is not a valid float.
+        ValueError: If the response from random.org is not a list of valid ints.
     """
-    url = f"https://www.random.org/integers/?num=1&min=1&max={num_songs}&col=1&base=10&format=plain&rnd=new"
+    url = (f"{base_url or RANDOM_ORG_URL}/integers/?num={num}&min=0&max={RAW_RANGE - 1}"
+           "&col=1&base=10&format=plain&rnd=new")
+    http = session if session is not None else requests
 
     try:
         # Log the request to random.org
-        logger.info("Fetching random number from %s", url)
+        logger.info("Fetching %d random numbers from %s", num, url)
 
-        response = requests.get(url, timeout=5)
+        response = http.get(url, timeout=5)
 
         # Check if the request was successful
         response.raise_for_status()
 
-        random_number_str = response.text.strip()
+        random_number_strs = response.text.split()
 
         try:
-            random_number = int(random_number_str)
+            random_numbers = [int(value) for value in random_number_strs]
         except ValueError:
-            raise ValueError("Invalid response from random.org: %s" % random_number_str)
+            raise ValueError("Invalid response from random.org: %s" % response.text.strip())
+        if not random_numbers:
+            raise ValueError("Invalid response from random.org: %s" % response.text.strip())
 
-        logger.info("Received random number: %.3f", random_number)
-        return random_number
+        logger.info("Received %d random numbers", len(random_numbers))
+        return random_numbers
 
     except requests.exceptions.Timeout:
         logger.error("Request to random.org timed out.")
@@ -46,3 +82,173 @@ def get_random(num_songs: int) -> int:
     except requests.exceptions.RequestException as e:
         logger.error("Request to random.org failed: %s", e)
         raise RuntimeError("Request to random.org failed: %s" % e)
+
+
+class RandomIndexSource:
+    """
+    A buffer of raw random.org integers that serves random indexes for any catalog size.
+
+    Raw integers are uniform in [0, RAW_RANGE) and are mapped to [1, n] by
+    rejection sampling, so one bulk fetch serves many draws without modulo bias
+    regardless of n. When random.org is unavailable the draw falls back to the
+    local CSPRNG, unless the fallback is disabled.
+
+    Attributes:
+        batch_size (int): How many raw integers each fetch requests.
+        fallback (str): "local" to use the local CSPRNG on failure, "none" to raise.
+    """
+
+    def __init__(self, batch_size: int = RANDOM_BATCH_SIZE, fallback: str = RANDOM_FALLBACK,
+                 base_url: str = None, retry_after: float = RANDOM_RETRY_AFTER):
+        if not 1 <= batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"Invalid batch size: {batch_size}. Must be between 1 and {MAX_BATCH_SIZE}.")
+        if fallback not in ("local", "none"):
+            raise ValueError(f"Invalid fallback: {fallback}. Must be 'local' or 'none'.")
+        self.batch_size = batch_size
+        self.fallback = fallback
+        self.base_url = base_url
+        self.retry_after = retry_after
+        self.session = requests.Session()
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._next_retry = 0.0
+        self._stats = {
+            "draws": 0,
+            "remote_draws": 0,
+            "fallback_draws": 0,
+            "remote_calls": 0,
+            "failed_calls": 0,
+            "rejected": 0,
+        }
+
+    def _pop_index(self, n: int, limit: int) -> Optional[int]:
+        """Maps buffered raw integers to [1, n], skipping biased ones, until the buffer runs out. Must hold the lock."""
+        while self._buffer:
+            raw = self._buffer.popleft()
+            if raw < limit:
+                self._stats["remote_draws"] += 1
+                return raw % n + 1
+            self._stats["rejected"] += 1
+        return None
+
+    def _refill(self, blocking: bool) -> bool:
+        """
+        Fetches a batch into the buffer. Only one thread fetches at a time, and
+        the buffer lock is not held during the request, so draws from a full
+        buffer or from the fallback never wait on the network.
+
+        Returns:
+            bool: False if another thread is already fetching and blocking is False.
+        """
+        if not self._refill_lock.acquire(blocking=blocking):
+            return False
+        try:
+            with self._lock:
+                if self._buffer:
+                    # Another thread refilled while this one waited
+                    return True
+                self._stats["remote_calls"] += 1
+            try:
+                raws = fetch_random_integers(self.batch_size, session=self.session, base_url=self.base_url)
+            except (RuntimeError, ValueError):
+                with self._lock:
+                    self._stats["failed_calls"] += 1
+                    self._next_retry = time.monotonic() + self.retry_after
+                raise
+            with self._lock:
+                self._buffer.extend(raws)
+            return True
+        finally:
+            self._refill_lock.release()
+
+    def get(self, n: int) -> int:
+        """
+        Draws a uniform random int between 1 and n.
+
+        With the local fallback, a draw that finds the buffer empty while
+        another thread is fetching uses the local CSPRNG instead of waiting.
+
+        Args:
+            n (int): The upper bound, e.g. the number of songs in the catalog.
+
+        Returns:
+            int: The random int in [1, n].
+
+        Raises:
+            ValueError: If n is not positive, or the fallback is disabled and random.org returns garbage.
+            RuntimeError: If the fallback is disabled and the request to random.org fails.
+        """
+        if n < 1:
+            raise ValueError(f"Invalid range: {n} (must be a positive integer).")
+        # Largest multiple of n below RAW_RANGE; raw values at or above it would bias the low indexes
+        limit = RAW_RANGE - RAW_RANGE % n
+
+        with self._lock:
+            self._stats["draws"] += 1
+        try:
+            while True:
+                with self._lock:
+                    index = self._pop_index(n, limit)
+                    if index is not None:
+                        return index
+                    use_remote = self.fallback == "none" or time.monotonic() >= self._next_retry
+                if not use_remote or not self._refill(blocking=self.fallback == "none"):
+                    break
+        except (RuntimeError, ValueError) as e:
+            if self.fallback == "none":
+                raise
+            logger.error("Falling back to the local generator: %s", e)
+
+        with self._lock:
+            self._stats["fallback_draws"] += 1
+        return secrets.randbelow(n) + 1
+
+    def stats(self) -> dict:
+        """
+        Returns counters for draws served, remote calls made and remote calls saved.
+
+        Returns:
+            dict: The source statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buffered"] = len(self._buffer)
+        # Every remote draw used to cost one random.org call
+        stats["remote_calls_saved"] = max(stats["remote_draws"] - stats["remote_calls"], 0)
+        stats.update({"batch_size": self.batch_size, "fallback": self.fallback})
+        return stats
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_source() -> RandomIndexSource:
+    """Returns the process-wide random index source, creating it on first use."""
+    global _source
+    with _source_lock:
+        if _source is None:
+            _source = RandomIndexSource()
+        return _source
+
+def get_random_source_stats() -> dict:
+    """Returns the statistics of the process-wide random index source."""
+    return get_source().stats()
+
+@timed("random_duration_seconds")
+def get_random(num_songs: int) -> int:
+    """
+    Draws a random int between 1 and the number of songs in the catalog,
+    served from a buffer of bulk-fetched random.org numbers.
+
+    Returns:
+        int: The random number in [1, num_songs].
+
+    Raises:
+        RuntimeError: If the fallback is disabled and the request to random.org fails.
+        ValueError: If num_songs is not positive, or the fallback is disabled and random.org returns garbage.
+    """
+    random_number = get_source().get(num_songs)
+    logger.info("Drew random number: %d", random_number)
+    return random_number
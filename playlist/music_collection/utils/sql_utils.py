@@ -1,9 +1,13 @@
 from contextlib import contextmanager
 import logging
 import os
+import queue
 import sqlite3
+import threading
+import time
 
 from music_collection.utils.logger import configure_logger
+from music_collection.utils.metrics import observe
 
 
 logger = logging.getLogger(__name__)
@@ -13,6 +17,18 @@ configure_logger(logger)
 # load the db path from the environment with a default value
 DB_PATH = os.getenv("DB_PATH", "/app/sql/song_catalog.db")
 
+# pool sizing; a checkout waits up to DB_POOL_TIMEOUT seconds for a free connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+
+# applied once to every pooled connection right after it is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+)
+
 
 def check_database_connection():
     """Check the database connection
@@ -50,22 +66,243 @@ def check_table_exists(tablename: str):
         logger.error(error_message)
         raise Exception(error_message) from e
 
+
+class ConnectionPool:
+    """A bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily up to ``size``, configured once with
+    CONNECTION_PRAGMAS and validated with ``SELECT 1`` on every checkout.
+    Connections that fail validation are discarded and replaced.
+
+    Attributes:
+        db_path (str): The database file the pool connects to.
+        size (int): The maximum number of open connections.
+        timeout (float): Seconds a checkout waits for a free connection.
+    """
+
+    def __init__(self, db_path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        if size < 1:
+            raise ValueError(f"Invalid pool size: {size}. Must be at least 1.")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "discarded": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        logger.info("Opened pooled database connection to %s", self.db_path)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._opened -= 1
+            self._stats["discarded"] += 1
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Checks a connection out of the pool.
+
+        Returns:
+            sqlite3.Connection: A validated connection for exclusive use by the caller.
+
+        Raises:
+            sqlite3.OperationalError: If the pool is closed or no connection frees up in time.
+        """
+        start = time.perf_counter()
+        waited = False
+        while True:
+            if self._closed:
+                raise sqlite3.OperationalError("Connection pool is closed")
+
+            conn = None
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._opened < self.size
+                    if can_open:
+                        self._opened += 1
+                if can_open:
+                    try:
+                        conn = self._connect()
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._opened -= 1
+                        raise
+                else:
+                    waited = True
+                    remaining = self.timeout - (time.perf_counter() - start)
+                    try:
+                        conn = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        with self._lock:
+                            self._stats["timeouts"] += 1
+                        logger.error("Timed out waiting for a database connection after %.2fs", self.timeout)
+                        raise sqlite3.OperationalError("Timed out waiting for a database connection")
+
+            if self._is_healthy(conn):
+                break
+            logger.warning("Discarding unhealthy pooled database connection")
+            self._discard(conn)
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+            if waited:
+                self._stats["waits"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Returns a connection to the pool, rolling back any open transaction.
+
+        Args:
+            conn (sqlite3.Connection): A connection previously returned by acquire().
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+            return
+        self._idle.put_nowait(conn)
+
+    def close(self) -> None:
+        """Closes every idle connection; checked-out connections close on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    def stats(self) -> dict:
+        """Returns a snapshot of pool usage, including checkout wait times.
+
+        Returns:
+            dict: Pool size, open/idle/in-use counts, checkout and wait statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            opened = self._opened
+        idle = self._idle.qsize()
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        stats.update({"size": self.size, "open": opened, "idle": idle, "in_use": opened - idle})
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Returns the process-wide pool for DB_PATH, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+def get_pool_stats() -> dict:
+    """Returns the statistics of the process-wide connection pool."""
+    return get_pool().stats()
+
+def close_pool() -> None:
+    """Closes the process-wide pool; the next checkout opens a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_data_version():
+    """Returns a token that changes whenever any connection commits to DB_PATH.
+
+    A dedicated connection that never writes runs ``PRAGMA data_version``, so
+    commits made through the pool, other processes or the sqlite3 shell are
+    all seen. HTTP ETags are built from the token, so clients can tell whether
+    the catalog changed.
+
+    Returns:
+        int or None: The current data version, or None if the database cannot be opened.
+    """
+    global _watcher
+    with _watcher_lock:
+        try:
+            if _watcher is None or _watcher[0] != DB_PATH:
+                if _watcher is not None:
+                    _watcher[1].close()
+                    _watcher = None
+                # mode=rw never creates a missing database file
+                conn = sqlite3.connect(f"file:{DB_PATH}?mode=rw", uri=True, check_same_thread=False)
+                _watcher = (DB_PATH, conn)
+            return _watcher[1].execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning("Could not read the database data version: %s", str(e))
+            if _watcher is not None:
+                _watcher[1].close()
+                _watcher = None
+            return None
+
 @contextmanager
 def get_db_connection():
     """
-    Context manager for SQLite database connection.
+    Context manager for a pooled SQLite database connection.
 
     Yields:
-        sqlite3.Connection: The SQLite connection object.
+        sqlite3.Connection: The SQLite connection object, returned to the pool on exit.
     """
+    pool = get_pool()
     conn = None
+    start = 0
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = pool.acquire()
+        start = time.perf_counter_ns()
         yield conn
     except sqlite3.Error as e:
         logger.error("Database connection error: %s", str(e))
         raise e
     finally:
         if conn:
-            conn.close()
-            logger.info("Database connection closed.")
+            pool.release(conn)
+            observe("db_connection_duration_seconds", time.perf_counter_ns() - start)
+            logger.debug("Database connection returned to pool.")
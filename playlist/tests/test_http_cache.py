@@ -0,0 +1,100 @@
+import pytest
+from flask import Flask, jsonify, request
+
+from music_collection.utils import http_cache, json_utils
+from music_collection.utils.http_cache import conditional, make_etag
+from music_collection.utils.metrics import render_metrics, reset_metrics
+
+@pytest.fixture
+def client():
+    """Fixture for an app with one conditional route whose version and calls the test controls."""
+    http_cache.reset_http_cache()
+    reset_metrics()
+    app = Flask(__name__)
+    app.version = 1
+    app.calls = 0
+
+    @app.route('/board')
+    @conditional(lambda: app.version)
+    def board():
+        app.calls += 1
+        if app.version is None or app.version > 0:
+            return jsonify({'version': app.version})
+        return jsonify({'error': 'broken'}), 500
+
+    def feed_format():
+        return 'ndjson' if request.accept_mimetypes.best == 'application/x-ndjson' else 'json'
+
+    @app.route('/feed')
+    @conditional(lambda: app.version, representation=feed_format)
+    def feed():
+        return jsonify({'format': feed_format(), 'page': request.args.get('page')})
+
+    @app.route('/items')
+    @conditional(lambda: app.version)
+    def items():
+        return json_utils.array_response('items', list(range(100)), status='success')
+
+    client = app.test_client()
+    client.application = app
+    return client
+
+def test_not_modified(client):
+    """Test that a request with the current ETag is answered 304 without running the route."""
+    response = client.get('/board')
+    etag = response.headers['ETag']
+    assert etag == f'W/"{make_etag(1)}"'
+    assert response.headers['Last-Modified'] and response.headers['Cache-Control'] == "no-cache"
+
+    revalidated = client.get('/board', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.data == b""
+    assert revalidated.headers['ETag'] == etag
+    assert client.application.calls == 1
+
+    metrics = render_metrics()
+    assert 'http_not_modified_total{route="/board"} 1' in metrics
+    assert f'http_bytes_saved_total{{route="/board"}} {float(len(response.data))}' in metrics
+    assert 'http_cpu_seconds_saved_total{route="/board"}' in metrics
+
+def test_not_modified_streamed(client, monkeypatch):
+    """Test that a 304 counts the bytes a streamed response sent as saved."""
+    monkeypatch.setattr(json_utils, "JSON_STREAM_MIN_ITEMS", 10)
+    response = client.get('/items')
+    assert response.is_streamed and response.get_json()['items'] == list(range(100))
+
+    assert client.get('/items', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert f'http_bytes_saved_total{{route="/items"}} {float(len(response.data))}' in render_metrics()
+
+def test_changed_version(client):
+    """Test that a new version sends the full body with a new ETag and Last-Modified."""
+    etag = client.get('/board').headers['ETag']
+    client.application.version = 2
+
+    response = client.get('/board', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.get_json() == {'version': 2}
+    assert response.headers['ETag'] != etag
+    assert make_etag((2, 5)) == f"{http_cache.ETAG_EPOCH}-2-5"
+
+def test_no_version_or_error(client):
+    """Test that routes run unconditionally without a version, and errors get no ETag."""
+    client.application.version = None
+    assert 'ETag' not in client.get('/board').headers
+
+    client.application.version = 0
+    response = client.get('/board')
+    assert response.status_code == 500 and 'ETag' not in response.headers
+
+def test_representations(client):
+    """Test that each query string and negotiated format gets its own ETag, with Vary: Accept."""
+    ndjson = client.get('/feed', headers={'Accept': 'application/x-ndjson'})
+    assert ndjson.headers['Vary'] == "Accept"
+
+    as_json = client.get('/feed', headers={'If-None-Match': ndjson.headers['ETag']})
+    assert as_json.status_code == 200 and as_json.get_json()['format'] == 'json'
+    assert as_json.headers['ETag'] != ndjson.headers['ETag']
+    assert as_json.headers['Last-Modified'] == ndjson.headers['Last-Modified']
+
+    paged = client.get('/feed?page=2', headers={'If-None-Match': as_json.headers['ETag']})
+    assert paged.status_code == 200 and paged.headers['ETag'] != as_json.headers['ETag']
+    assert client.get('/feed?page=2', headers={'If-None-Match': paged.headers['ETag']}).status_code == 304
+    assert 'Vary' not in client.get('/board').headers
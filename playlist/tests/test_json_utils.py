@@ -0,0 +1,56 @@
+import json
+
+from flask import Flask, jsonify
+import pytest
+
+from music_collection.models.song_model import Song
+from music_collection.utils import json_utils
+from music_collection.utils.json_utils import FastJSONProvider, array_response, dumps, iter_array_chunks
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Fixture running a test with orjson and again with the standard library fallback."""
+    if request.param == "json":
+        monkeypatch.setattr(json_utils, "orjson", None)
+    elif json_utils.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+def test_dumps(encoder):
+    """Test that dumps encodes songs and dicts compactly with sorted keys, like jsonify."""
+    song = Song(1, "Artist", "Title", 2022, "Pop", 180)
+
+    assert json_utils.encoder_name() == encoder
+    assert dumps({"title": "Title", "count": 1, "tags": ["a"]}) == b'{"count":1,"tags":["a"],"title":"Title"}'
+    assert json.loads(dumps({"song": song})) == {
+        "song": {"id": 1, "artist": "Artist", "title": "Title", "year": 2022, "genre": "Pop", "duration": 180}}
+
+def test_iter_array_chunks(encoder):
+    """Test that the chunks join into the same document as encoding it at once."""
+    songs = [{"id": i, "title": f"Song {i}"} for i in range(7)]
+
+    chunks = list(iter_array_chunks({"status": "success"}, "songs", songs, chunk_size=3))
+    assert len(chunks) == 5
+    assert json.loads(b"".join(chunks)) == {"status": "success", "songs": songs}
+    assert b"".join(iter_array_chunks({}, "songs", [])) == b'{"songs":[]}\n'
+
+def test_array_response(encoder, monkeypatch):
+    """Test that only arrays past the threshold are streamed."""
+    monkeypatch.setattr(json_utils, "JSON_STREAM_MIN_ITEMS", 3)
+
+    small = array_response("songs", [1, 2], status="success")
+    assert not small.is_streamed and small.get_json() == {"status": "success", "songs": [1, 2]}
+    large = array_response("songs", [1, 2, 3], status="success")
+    assert large.is_streamed and large.mimetype == "application/json"
+    assert json.loads(b"".join(large.response)) == {"status": "success", "songs": [1, 2, 3]}
+
+def test_provider(encoder):
+    """Test that jsonify goes through the provider, and debug output is still indented."""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    with app.app_context():
+        assert jsonify({"song": Song(1, "Artist", "Title", 2022, "Pop", 180)}).get_json()["song"]["title"] == "Title"
+        app.debug = True
+        assert b'\n  "b": 1' in jsonify({"b": 1}).data
@@ -0,0 +1,46 @@
+import logging
+import pytest
+from unittest.mock import patch
+from music_collection.utils import logger as logger_utils
+from music_collection.utils.logger import RateLimitFilter, configure_logger, get_log_level, stop_logging
+
+def make_record(level=logging.INFO, lineno=10): #Making log records from one call site for testing
+    return logging.makeLogRecord({"name": "music_collection.test", "levelno": level, "pathname": "test.py",
+                                  "lineno": lineno, "msg": "Playing %s", "args": ("Hey Jude",)})
+
+def test_configure_logger_idempotent(): #Test that configuring a logger twice attaches one handler
+    logger = logging.getLogger("music_collection.tests.idempotent")
+    configure_logger(logger)
+    configure_logger(logger)
+
+    assert len(logger.handlers) == 1
+
+def test_records_written_by_listener(capsys): #Test that records reach stderr once the queue is flushed
+    stop_logging()
+    logger = logging.getLogger("music_collection.tests.listener")
+    configure_logger(logger)
+    logger.info("Now playing %s by %s", "Hey Jude", "The Beatles")
+    stop_logging()
+
+    assert "music_collection.tests.listener - INFO - Now playing Hey Jude by The Beatles" in capsys.readouterr().err
+
+def test_get_log_level(monkeypatch): #Test that the longest matching module prefix wins
+    monkeypatch.setattr(logger_utils, "LOG_LEVEL", "info")
+    monkeypatch.setattr(logger_utils, "LOG_LEVELS", "music_collection=WARNING, music_collection.models.playlist_model=ERROR")
+
+    assert get_log_level("music_collection.models.playlist_model") == "ERROR"
+    assert get_log_level("music_collection.models.song_model") == "WARNING"
+    assert get_log_level("music_collection_other") == "INFO"
+
+def test_rate_limit_filter(): #Test that records past the rate are dropped and counted
+    rate_filter = RateLimitFilter(rate=2)
+
+    with patch("music_collection.utils.logger.time.monotonic", return_value=100.0):
+        assert [rate_filter.filter(make_record()) for _ in range(5)] == [True, True, False, False, False]
+        assert rate_filter.filter(make_record(lineno=11)), "Other call sites have their own budget"
+        assert rate_filter.filter(make_record(level=logging.WARNING)), "Warnings should never be dropped"
+
+    record = make_record()
+    with patch("music_collection.utils.logger.time.monotonic", return_value=101.0):
+        assert rate_filter.filter(record)
+    assert record.getMessage() == "Playing Hey Jude (3 similar messages suppressed)"
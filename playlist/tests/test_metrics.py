@@ -0,0 +1,58 @@
+import pytest
+from music_collection.utils import metrics
+from music_collection.utils.metrics import LatencyHistogram, increment, observe, render_metrics, reset_metrics, timed
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Fixture that starts every test with no recorded metrics."""
+    reset_metrics()
+    yield
+    reset_metrics()
+
+def test_histogram_quantiles(): #Test that quantiles stay within the histogram's precision
+    histogram = LatencyHistogram()
+    for value in range(1, 100_001):
+        histogram.record(value * 1000)
+
+    values, count, total = histogram.snapshot()
+
+    assert count == 100_000
+    assert total == sum(range(1, 100_001)) * 1000
+    for quantile in metrics.QUANTILES:
+        assert values[quantile] == pytest.approx(quantile * 100_000_000, rel=2 ** -metrics.SIGNIFICANT_BITS)
+
+def test_histogram_small_values_exact(): #Test that values below the precision are kept exactly
+    histogram = LatencyHistogram()
+    for value in (3, 5, 7):
+        histogram.record(value)
+
+    assert histogram.snapshot((0.5, 1.0))[0] == {0.5: 5, 1.0: 7}
+
+def test_empty_histogram(): #Test that an empty histogram reports zeros
+    assert LatencyHistogram().snapshot() == ({0.5: 0, 0.95: 0, 0.99: 0}, 0, 0)
+
+def test_timed(): #Test that the decorator times calls that raise as well as calls that return
+    @timed("query_duration_seconds")
+    def get_song(fail=False):
+        if fail:
+            raise ValueError("Song not found")
+        return "Hey Jude"
+
+    assert get_song() == "Hey Jude"
+    with pytest.raises(ValueError):
+        get_song(fail=True)
+
+    assert 'query_duration_seconds_count{function="get_song"} 2' in render_metrics()
+
+def test_render_metrics(): #Test the Prometheus text format
+    observe("http_request_duration_seconds", 2_000_000, method="GET", route="/api/get-all-songs-from-catalog")
+    increment("http_requests_total", method="GET", route="/api/get-all-songs-from-catalog", status=200)
+    increment("http_requests_total", method="GET", route="/api/get-all-songs-from-catalog", status=200)
+
+    text = render_metrics()
+
+    assert "# TYPE http_request_duration_seconds summary" in text
+    assert 'http_request_duration_seconds{method="GET",route="/api/get-all-songs-from-catalog",quantile="0.99"} 0.002' in text
+    assert 'http_request_duration_seconds_sum{method="GET",route="/api/get-all-songs-from-catalog"} 0.002000000' in text
+    assert 'http_requests_total{method="GET",route="/api/get-all-songs-from-catalog",status="200"} 2' in text
+    assert text.endswith("\n")
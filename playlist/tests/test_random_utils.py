@@ -1,7 +1,11 @@
+import threading
+
 import pytest
 import requests
 
-from music_collection.utils.random_utils import get_random
+from music_collection.utils import random_utils
+from music_collection.utils.random_utils import RAW_RANGE, RandomIndexSource, fetch_random_integers, get_random
+from music_collection.utils.random_stub import RandomOrgStub
 
 
 RANDOM_NUMBER = 42
@@ -17,34 +21,139 @@ def mock_random_org(mocker):
     mocker.patch("requests.get", return_value=mock_response)
     return mock_response
 
+@pytest.fixture
+def mock_session(mocker):
+    """Fixture replacing the keep-alive session used by RandomIndexSource."""
+    session = mocker.Mock()
+    mocker.patch("music_collection.utils.random_utils.requests.Session", return_value=session)
+    return session
+
+def session_response(mocker, values):
+    response = mocker.Mock()
+    response.text = "\n".join(str(value) for value in values) + "\n"
+    return response
+
 
 def test_get_random(mock_random_org):
-    """Test retrieving a random number from random.org."""
-    result = get_random(NUM_SONGS)
+    """Test retrieving a batch of random numbers from random.org."""
+    result = fetch_random_integers(1)
 
     # Assert that the result is the mocked random number
-    assert result == RANDOM_NUMBER, f"Expected random number {RANDOM_NUMBER}, but got {result}"
+    assert result == [RANDOM_NUMBER], f"Expected random number {RANDOM_NUMBER}, but got {result}"
 
     # Ensure that the correct URL was called
-    requests.get.assert_called_once_with("https://www.random.org/integers/?num=1&min=1&max=100&col=1&base=10&format=plain&rnd=new", timeout=5)
+    requests.get.assert_called_once_with(f"https://www.random.org/integers/?num=1&min=0&max={RAW_RANGE - 1}&col=1&base=10&format=plain&rnd=new", timeout=5)
 
 def test_get_random_request_failure(mocker):
     """Simulate  a request failure."""
     mocker.patch("requests.get", side_effect=requests.exceptions.RequestException("Connection error"))
 
     with pytest.raises(RuntimeError, match="Request to random.org failed: Connection error"):
-        get_random(NUM_SONGS)
+        fetch_random_integers(1)
 
 def test_get_random_timeout(mocker):
     """Simulate  a timeout."""
     mocker.patch("requests.get", side_effect=requests.exceptions.Timeout)
 
     with pytest.raises(RuntimeError, match="Request to random.org timed out."):
-        get_random(NUM_SONGS)
+        fetch_random_integers(1)
 
 def test_get_random_invalid_response(mock_random_org):
     """Simulate  an invalid response (non-digit)."""
     mock_random_org.text = "invalid_response"
 
     with pytest.raises(ValueError, match="Invalid response from random.org: invalid_response"):
-        get_random(NUM_SONGS)
\ No newline at end of file
+        fetch_random_integers(1)
+
+def test_source_serves_many_draws_from_one_fetch(mocker, mock_session):
+    """Test that one bulk fetch serves draws for different catalog sizes."""
+    mock_session.get.return_value = session_response(mocker, [5, 17, 250, 999])
+    source = RandomIndexSource(batch_size=4, fallback="none")
+
+    results = [source.get(10), source.get(10), source.get(100), source.get(1000)]
+
+    assert results == [6, 8, 51, 1000]
+    assert mock_session.get.call_count == 1
+    stats = source.stats()
+    assert stats["remote_calls"] == 1
+    assert stats["remote_calls_saved"] == 3
+
+def test_source_rejects_biased_values(mocker, mock_session):
+    """Test that raw values in the biased tail are rejected instead of wrapped."""
+    # For n = 3, RAW_RANGE % 3 == 1, so RAW_RANGE - 1 is the single biased value
+    mock_session.get.return_value = session_response(mocker, [RAW_RANGE - 1, 4])
+    source = RandomIndexSource(batch_size=2, fallback="none")
+
+    assert source.get(3) == 2
+    assert source.stats()["rejected"] == 1
+
+def test_source_falls_back_to_local_generator(mock_session):
+    """Test that draws keep working while random.org is down."""
+    mock_session.get.side_effect = requests.exceptions.RequestException("Connection error")
+    source = RandomIndexSource(batch_size=10, fallback="local")
+
+    results = [source.get(NUM_SONGS) for _ in range(5)]
+
+    assert all(1 <= result <= NUM_SONGS for result in results)
+    stats = source.stats()
+    assert stats["fallback_draws"] == 5
+    assert stats["failed_calls"] == 1, "Expected failed fetches to back off instead of retrying every draw"
+
+def test_source_falls_back_while_another_thread_fetches(mocker, mock_session):
+    """Test that a draw finding the buffer empty during another thread's fetch falls back instead of waiting."""
+    fetching, release = threading.Event(), threading.Event()
+
+    def slow_get(*args, **kwargs):
+        fetching.set()
+        release.wait(5)
+        return session_response(mocker, [5, 7])
+    mock_session.get.side_effect = slow_get
+    source = RandomIndexSource(batch_size=2, fallback="local")
+
+    fetcher = threading.Thread(target=source.get, args=(10,))
+    fetcher.start()
+    assert fetching.wait(5)
+    assert 1 <= source.get(NUM_SONGS) <= NUM_SONGS
+    assert source.stats()["fallback_draws"] == 1
+    release.set()
+    fetcher.join(5)
+
+    assert source.get(10) == 8
+    assert source.stats()["remote_calls"] == 1
+
+def test_source_without_fallback_raises(mock_session):
+    """Test that a disabled fallback surfaces random.org errors."""
+    mock_session.get.side_effect = requests.exceptions.Timeout
+    source = RandomIndexSource(batch_size=10, fallback="none")
+
+    with pytest.raises(RuntimeError, match="Request to random.org timed out."):
+        source.get(NUM_SONGS)
+
+def test_get_random_invalid_range():
+    """Test that a non-positive catalog size is rejected."""
+    with pytest.raises(ValueError, match="Invalid range: 0"):
+        get_random(0)
+
+def test_get_random_uses_shared_source(mocker, mock_session):
+    """Test that get_random draws from the process-wide source."""
+    mock_session.get.return_value = session_response(mocker, [RANDOM_NUMBER - 1])
+    mocker.patch.object(random_utils, "_source", RandomIndexSource(batch_size=1, fallback="none"))
+
+    assert get_random(NUM_SONGS) == RANDOM_NUMBER
+    assert random_utils.get_random_source_stats()["remote_draws"] == 1
+
+@pytest.fixture
+def random_org_stub():
+    """Fixture running a local random.org stub for the duration of a test."""
+    stub = RandomOrgStub(seed=42).start()
+    yield stub
+    stub.stop()
+
+def test_source_against_stub(random_org_stub):
+    """Test that one request to the random.org stub serves a whole batch of draws."""
+    source = RandomIndexSource(batch_size=50, fallback="none", base_url=random_org_stub.url)
+
+    values = [source.get(NUM_SONGS) for _ in range(40)]
+
+    assert random_org_stub.requests == 1, "Expected a single bulk request"
+    assert all(1 <= value <= NUM_SONGS for value in values)
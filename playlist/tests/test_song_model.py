@@ -1,9 +1,12 @@
 from contextlib import contextmanager
+import copy
+import pickle
 import re
 import sqlite3
 
 import pytest
 
+from music_collection.models import song_model
 from music_collection.models.song_model import (
     Song,
     create_song,
@@ -44,6 +47,14 @@ def mock_cursor(mocker):
 
     mocker.patch("music_collection.models.song_model.get_db_connection", mock_get_db_connection)
 
+    # Start every test without cached live song ids
+    mocker.patch.object(song_model, "_live_song_ids", None)
+    mocker.patch.object(song_model, "_live_song_ids_max_id", None)
+
+    # Start every test without plays counted by an earlier one
+    mocker.patch.object(song_model, "_play_counts",
+                        song_model.WriteBehindCounters(song_model._write_play_counts, 1, 60, 1000))
+
     return mock_cursor  # Return the mock cursor so we can set expectations per test
 
 ######################################################
@@ -333,12 +344,9 @@ def test_get_all_songs_ordered_by_play_count(mock_cursor):
 def test_get_random_song(mock_cursor, mocker):
     """Test retrieving a random song from the catalog."""
 
-    # Simulate that there are multiple songs in the database
-    mock_cursor.fetchall.return_value = [
-        (1, "Artist A", "Song A", 2020, "Rock", 210, 10),
-        (2, "Artist B", "Song B", 2021, "Pop", 180, 20),
-        (3, "Artist C", "Song C", 2022, "Jazz", 200, 5)
-    ]
+    # Simulate that there are multiple live songs in the database (id, MAX(id))
+    mock_cursor.fetchall.return_value = [(1, 3), (2, 3), (3, 3)]
+    mock_cursor.fetchone.return_value = (2, "Artist B", "Song B", 2021, "Pop", 180, False, 3)
 
     # Mock random number generation to return the 2nd song
     mock_random = mocker.patch("music_collection.models.song_model.get_random", return_value=2)
@@ -346,7 +354,7 @@ def test_get_random_song(mock_cursor, mocker):
     # Call the get_random_song method
     result = get_random_song()
 
-    # Expected result based on the mock random number and fetchall return value
+    # Expected result based on the mock random number and fetchone return value
     expected_result = Song(2, "Artist B", "Song B", 2021, "Pop", 180)
 
     # Ensure the result matches the expected output
@@ -355,12 +363,41 @@ def test_get_random_song(mock_cursor, mocker):
     # Ensure that the random number was called with the correct number of songs
     mock_random.assert_called_once_with(3)
 
-    # Ensure the SQL query was executed correctly
-    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration, play_count FROM songs WHERE deleted = FALSE")
-    actual_query = normalize_whitespace(mock_cursor.execute.call_args[0][0])
+    # Ensure the live ids were loaded, then only the picked song was read by id
+    expected_ids_query = normalize_whitespace("SELECT id, (SELECT MAX(id) FROM songs) FROM songs WHERE deleted = FALSE ORDER BY id")
+    expected_song_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration, deleted, (SELECT MAX(id) FROM songs) FROM songs WHERE id = ?")
+    actual_queries = [normalize_whitespace(call[0][0]) for call in mock_cursor.execute.call_args_list]
 
-    # Assert that the SQL query was correct
-    assert actual_query == expected_query, "The SQL query did not match the expected structure."
+    assert actual_queries == [expected_ids_query, expected_song_query], "The SQL queries did not match the expected structure."
+    assert mock_cursor.execute.call_args[0][1] == (2,), "Expected the picked song to be read by its id."
+
+def test_get_random_song_reuses_live_ids(mock_cursor, mocker):
+    """Test that later random picks read a single song without reloading the catalog."""
+
+    mock_cursor.fetchall.return_value = [(1, 3), (2, 3), (3, 3)]
+    mock_cursor.fetchone.return_value = (3, "Artist C", "Song C", 2022, "Jazz", 200, False, 3)
+    mocker.patch("music_collection.models.song_model.get_random", return_value=3)
+
+    get_random_song()
+    get_random_song()
+
+    assert mock_cursor.fetchall.call_count == 1, "Expected the live song ids to be loaded once."
+    assert mock_cursor.execute.call_count == 3
+
+def test_get_random_song_stale_live_ids(mock_cursor, mocker):
+    """Test that a pick landing on a song deleted elsewhere reloads the live ids."""
+
+    mock_cursor.fetchall.side_effect = [[(1, 2), (2, 2)], [(1, 2)]]
+    mock_cursor.fetchone.side_effect = [
+        (2, "Artist B", "Song B", 2021, "Pop", 180, True, 2),
+        (1, "Artist A", "Song A", 2020, "Rock", 210, False, 2),
+    ]
+    mock_random = mocker.patch("music_collection.models.song_model.get_random", side_effect=[2, 1])
+
+    result = get_random_song()
+
+    assert result == Song(1, "Artist A", "Song A", 2020, "Rock", 210)
+    assert mock_random.call_args_list == [mocker.call(2), mocker.call(1)]
 
 def test_get_random_song_empty_catalog(mock_cursor, mocker):
     """Test retrieving a random song when the catalog is empty."""
@@ -368,15 +405,18 @@ def test_get_random_song_empty_catalog(mock_cursor, mocker):
     # Simulate that the catalog is empty
     mock_cursor.fetchall.return_value = []
 
+    # Mock random number generation so we can check it is never used
+    mock_random = mocker.patch("music_collection.models.song_model.get_random")
+
     # Expect a ValueError to be raised when calling get_random_song with an empty catalog
     with pytest.raises(ValueError, match="The song catalog is empty"):
         get_random_song()
 
     # Ensure that the random number was not called since there are no songs
-    mocker.patch("music_collection.models.song_model.get_random").assert_not_called()
+    mock_random.assert_not_called()
 
     # Ensure the SQL query was executed correctly
-    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration, play_count FROM songs WHERE deleted = FALSE")
+    expected_query = normalize_whitespace("SELECT id, (SELECT MAX(id) FROM songs) FROM songs WHERE deleted = FALSE ORDER BY id")
     actual_query = normalize_whitespace(mock_cursor.execute.call_args[0][0])
 
     # Assert that the SQL query was correct
@@ -423,3 +463,46 @@ def test_update_play_count_deleted_song(mock_cursor):
 
     # Ensure that no SQL query for updating play count was executed
     mock_cursor.execute.assert_called_once_with("SELECT deleted FROM songs WHERE id = ?", (1,))
+
+def test_update_play_count_write_behind(mock_cursor, mocker):
+    """Test that plays are counted in memory, merged into reads and written in one batch."""
+    mocker.patch.object(song_model, "STATS_WRITE_BEHIND", True)
+    mock_cursor.fetchone.return_value = (3, "Artist C", "Song C", 2022, "Jazz", 200, False)
+
+    for _ in range(6):
+        update_play_count(3)
+    mock_cursor.executemany.assert_not_called()
+
+    # Reads add the plays not written yet, and sort by the merged counts
+    mock_cursor.fetchall.return_value = [
+        (2, "Artist B", "Song B", 2021, "Pop", 180, 20),
+        (1, "Artist A", "Song A", 2020, "Rock", 210, 10),
+        (3, "Artist C", "Song C", 2022, "Jazz", 200, 5)
+    ]
+    songs = get_all_songs(sort_by_play_count=True)
+    assert [(song["id"], song["play_count"]) for song in songs] == [(2, 20), (3, 11), (1, 10)]
+
+    assert song_model.flush_play_counts() == 6
+    mock_cursor.executemany.assert_called_once_with("UPDATE songs SET play_count = play_count + ? WHERE id = ?", [(6, 3)])
+    assert song_model.get_play_count_stats()["flushed_events"] == 6
+
+    # A deleted song is still rejected
+    mock_cursor.fetchone.return_value = (3, "Artist C", "Song C", 2022, "Jazz", 200, True)
+    with pytest.raises(ValueError, match="Song with ID 3 has been deleted"):
+        update_play_count(3)
+
+def test_song_from_row():
+    """Test that songs built from trusted rows skip validation, while Song() still validates."""
+    song = song_model.song_from_row((1, "Artist Name", "Song Title", 2022, "Pop", 180, False))
+
+    assert song == Song(1, "Artist Name", "Song Title", 2022, "Pop", 180)
+    assert not hasattr(song, "__dict__"), "Songs should be slotted"
+    assert copy.copy(song) == song and pickle.loads(pickle.dumps(song)) == song
+    assert song_model.song_from_row((2, "Artist", "Old Song", 1900, "Jazz", 200)).year == 1900
+    with pytest.raises(ValueError, match="Year must be greater than 1900, got 1900"):
+        Song(2, "Artist", "Old Song", 1900, "Jazz", 200)
+
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = song_model.song_row_factory
+    assert conn.execute("SELECT 1, 'Artist Name', 'Song Title', 2022, 'Pop', 180").fetchone() == song
+    conn.close()
@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+
+import pytest
+
+from music_collection.utils import sql_utils
+from music_collection.utils.sql_utils import ConnectionPool, get_db_connection
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Fixture pointing the process-wide pool at a fresh database file."""
+    path = str(tmp_path / "song_catalog.db")
+    monkeypatch.setattr(sql_utils, "DB_PATH", path)
+    yield path
+    sql_utils.close_pool()
+
+def test_pool_reuses_connections(db_path):
+    """Test that consecutive checkouts reuse the same long-lived connection."""
+    pool = ConnectionPool(db_path, size=2)
+
+    conn_1 = pool.acquire()
+    pool.release(conn_1)
+    conn_2 = pool.acquire()
+
+    assert conn_1 is conn_2, "Expected the idle connection to be reused"
+    assert pool.stats()["open"] == 1
+    pool.close()
+
+def test_pool_applies_connection_pragmas(db_path):
+    """Test that pooled connections are opened in WAL mode."""
+    pool = ConnectionPool(db_path, size=1)
+    conn = pool.acquire()
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    pool.release(conn)
+    pool.close()
+
+def test_pool_replaces_unhealthy_connection(db_path):
+    """Test that a connection failing validation is discarded on checkout."""
+    pool = ConnectionPool(db_path, size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()  # Break the idle connection behind the pool's back
+
+    replacement = pool.acquire()
+
+    assert replacement is not conn
+    assert replacement.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()["discarded"] == 1
+    pool.close()
+
+def test_pool_rolls_back_on_release(db_path):
+    """Test that uncommitted work is rolled back before a connection is reused."""
+    pool = ConnectionPool(db_path, size=1)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE songs (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.execute("INSERT INTO songs (id) VALUES (1)")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 0
+    pool.release(conn)
+    pool.close()
+
+def test_pool_checkout_timeout(db_path):
+    """Test that a checkout fails once the pool is exhausted for too long."""
+    pool = ConnectionPool(db_path, size=1, timeout=0.05)
+    conn = pool.acquire()
+
+    with pytest.raises(sqlite3.OperationalError, match="Timed out waiting for a database connection"):
+        pool.acquire()
+
+    assert pool.stats()["timeouts"] == 1
+    pool.release(conn)
+    pool.close()
+
+def test_pool_records_wait_time(db_path):
+    """Test that a checkout blocked on a busy pool is counted as a wait."""
+    pool = ConnectionPool(db_path, size=1, timeout=2)
+    conn = pool.acquire()
+
+    timer = threading.Timer(0.05, pool.release, args=(conn,))
+    timer.start()
+    waited_conn = pool.acquire()
+    timer.join()
+
+    stats = pool.stats()
+    assert waited_conn is conn
+    assert stats["waits"] == 1
+    assert stats["max_wait_ms"] > 0
+    pool.release(waited_conn)
+    pool.close()
+
+def test_get_db_connection_uses_pool(db_path):
+    """Test that get_db_connection hands out pooled connections."""
+    with get_db_connection() as conn_1:
+        conn_1.execute("SELECT 1")
+    with get_db_connection() as conn_2:
+        conn_2.execute("SELECT 1")
+
+    assert conn_1 is conn_2
+    assert sql_utils.get_pool_stats()["checkouts"] == 2
+
+def test_data_version_changes_on_commit(db_path):
+    """Test that the data version moves when a pooled connection commits."""
+    with get_db_connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+    before = sql_utils.get_data_version()
+
+    assert sql_utils.get_data_version() == before, "Expected a stable version without writes"
+    with get_db_connection() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.commit()
+
+    assert sql_utils.get_data_version() != before
+
+def test_data_version_without_database(tmp_path, monkeypatch):
+    """Test that a missing database gives no version and is not created."""
+    path = tmp_path / "missing.db"
+    monkeypatch.setattr(sql_utils, "DB_PATH", str(path))
+
+    assert sql_utils.get_data_version() is None
+    assert not path.exists()